@@ -4,7 +4,14 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 
-from utils.data_loader import load_and_process_finance_data
+from utils.data_loader import FINANCE_DATA_DIR, available_rounds
+from utils.data_registry import NO_DATA_MESSAGE, current_rounds, load_data
+from utils.fragments import page_section
+from utils.data_watcher import data_reload_notice
+from utils.round_window import round_window_selector
+from utils.lazy_tabs import table_previews
+from utils.long_series import long_series_figure
+from utils.value_labels import add_value_labels, format_compact
 from utils.constants_passer import SITE_EMOJI
 
 # :::::::::::::::::::::::::::::::::: PAGE CONFIGURATION :::::::::::::::::::::::::::::::::: 
@@ -21,35 +28,23 @@ st.set_page_config(
 st.title(":tangerine: GQR2 Team 75 Dashboard")
 st.divider()
 
-# ::::::::: READING THE DATAFRAME FROM data_loader.py :::::::::::
-RAW_FINANCE_DF = load_and_process_finance_data()[0]
-PROCESSED_FINANCE_DF = load_and_process_finance_data()[1]
+data_reload_notice()
+round_window_selector()
 
 # :::::::::::::::::::::::::::::::::: DATA PLOTS AND TABLES :::::::::::::::::::::::::::::::::: 
 st.subheader("Finance")
 
-def finance_info_section():
-
-    # Helper function to format the annotation text with "k" for thousands and "M" for millions
-    def format_value(value):
-        # Determine if the original value is negative
-        sign = "-" if value < 0 else ""
-        # Work with the absolute value and then reapply the sign if necessary
-        abs_value = abs(value)
-        if abs_value >= 1_000_000:
-            value_text = f"{sign}{abs_value/1_000_000:.1f}M"  # Format in millions
-        elif abs_value >= 1_000:
-            value_text = f"{sign}{abs_value/1_000:.1f}k"  # Format in thousands
-        else:
-            value_text = f"{sign}{abs_value:.1f}"  # No formatting needed for values less than 1000
-        return value_text
+@page_section('finance info', data = ['finance processed'])
+def finance_info_section(data):
+    PROCESSED_FINANCE_DF = data['finance processed']
 
     def line_plot(val):
 
         # ::::::::: FILTERING THE DATAFRAME :::::::::
-        main_df = PROCESSED_FINANCE_DF.copy()
-        main_df['Round'] = pd.to_numeric(main_df['Round'])
-        main_df[val] = pd.to_numeric(main_df[val])
+        main_df = PROCESSED_FINANCE_DF.assign(**{
+            'Round': pd.to_numeric(PROCESSED_FINANCE_DF['Round']),
+            val: pd.to_numeric(PROCESSED_FINANCE_DF[val]),
+        })
 
         # ::::::::: PLOTTING THE VALUE IN A LINE PLOT :::::::::::
         if val == "ROI":
@@ -68,27 +63,9 @@ def finance_info_section():
         fig.update_traces(line=dict(width=4, color='orange'), mode='lines+markers', marker=dict(size=8, color='grey'))
 
         # Annotations with rounded values
-        annotations = []
-        for i, row in main_df.iterrows():
-            # Use the helper function to format the annotation text
-            value_text = f"<b>{format_value(row[val])}</b>"
-            annotations.append(
-                dict(
-                    x=row['Round'],
-                    y=row[val],
-                    xref='x',
-                    yref='y',
-                    text=value_text,
-                    showarrow=False,
-                    font=dict(size=12),
-                    xanchor='center',
-                    yanchor='bottom',
-                    yshift=10
-                )
-            )
-        fig.update_layout(annotations=annotations)
+        add_value_labels(fig, main_df['Round'], main_df[val], format_compact(main_df[val]))
 
-        st.plotly_chart(fig, theme = "streamlit", use_container_width=True)
+        st.plotly_chart(long_series_figure(fig), theme = "streamlit", use_container_width=True)
 
         # st.write(main_df.columns)
         # st.write(main_df)
@@ -109,6 +86,7 @@ finance_info_section()
 st.divider()
 st.subheader("Current Investment Breakdown")
 
+@page_section('investment breakdown')
 def investment_brakedown_section():
     
     columns_to_select = [
@@ -123,13 +101,15 @@ def investment_brakedown_section():
     def sankey_chart():
 
         # ::::::::: FILTERING THE DATAFRAME :::::::::
-        main_df = PROCESSED_FINANCE_DF.copy()
-        
-        # Find the maximum value in the "Round" column
-        max_round_value = main_df["Round"].max()
-
-        # Filter the DataFrame for rows where "Round" equals max_round_value
-        main_df = main_df[main_df["Round"] == max_round_value]
+        # The latest round of the report inside the round window; only that round is read and processed
+        window = current_rounds()
+        report_rounds = [round_number for round_number in available_rounds([FINANCE_DATA_DIR]) if window is None or round_number in window]
+        if not report_rounds:
+            st.info(NO_DATA_MESSAGE)
+            return
+        max_round_value = report_rounds[-1]
+
+        main_df = load_data(['finance processed'], rounds = [max_round_value])['finance processed']
         
     
         # ::::::::: PLOTTING THE VALUES IN A SANKEY CHART :::::::::::
@@ -174,5 +154,9 @@ investment_brakedown_section()
 
 # :::::::::::::::::::::::: TABLES UTILIZED :::::::::::::::::::::::: 
 st.divider()
-with st.expander("Finance Report data preview"):
-    st.write(RAW_FINANCE_DF)
\ No newline at end of file
+
+@page_section('tables')
+def tables_section():
+    table_previews({"Finance Report": 'finance raw'}, key = 'table_preview', title = "Finance Report data preview")
+
+tables_section()
\ No newline at end of file
@@ -0,0 +1,71 @@
+# Compares the old row-wise apply for the Transport% KPI with the vectorized utils.kpis on a synthetic
+# Supplier - Component table of 1M rows (about 1/5 of the purchase values are 0).
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_kpis [--rows 1000000] [--repeat 3]
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.kpis import KPI_RATIOS, compute_kpi
+
+
+# ::::::::: SYNTHETIC TABLE :::::::::
+def build_table(rows, seed = 0):
+    rng = np.random.default_rng(seed)
+
+    columns = {}
+    for numerator_col, denominator_col in KPI_RATIOS.values():
+        columns[numerator_col] = rng.integers(0, 10_000, rows).astype(float)
+        columns[denominator_col] = rng.integers(0, 5, rows) * rng.integers(1, 50_000, rows).astype(float)
+
+    return pd.DataFrame(columns)
+
+# ::::::::: KPI PATHS :::::::::
+# What pages/2_💶Purchasing.py used to do
+def transport_percentage_apply(df):
+    def calculate_transport_percentage(row):
+        if row['Purchase value previous round'] == 0:
+            return 0
+        else:
+            return row['Transport costs previous round'] / row['Purchase value previous round']
+
+    return df.apply(calculate_transport_percentage, axis = 1)
+
+def transport_percentage_vectorized(df):
+    return compute_kpi(df, 'Transport%')
+
+def time_it(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type = int, default = 1_000_000)
+    parser.add_argument('--repeat', type = int, default = 3)
+    args = parser.parse_args()
+
+    df = build_table(args.rows)
+
+    # The row-wise path takes long enough that one run is plenty
+    apply_time, apply_result = time_it(lambda: transport_percentage_apply(df), 1)
+    vectorized_time, vectorized_result = time_it(lambda: transport_percentage_vectorized(df), args.repeat)
+
+    # Both paths have to produce exactly the same KPI
+    np.testing.assert_allclose(apply_result.to_numpy(dtype = float), vectorized_result.to_numpy())
+
+    print(f"{args.rows:,} rows")
+    print(f"{'path':<14}{'time':>14}")
+    print(f"{'row-wise':<14}{apply_time:>13.3f}s")
+    print(f"{'vectorized':<14}{vectorized_time:>13.3f}s")
+    print(f"speedup: {apply_time / vectorized_time:.0f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# Compares the old per-tab loading path (one pd.read_excel per tab) with the single-pass parse_workbook
+# on a synthetic copy of TFC_MAIN_DATA with 100x more rounds.
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_main_tables [--scale 100] [--repeat 3]
+
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from utils.data_loader import MAIN_DATA_DIR, parse_workbook
+
+
+# ::::::::: SYNTHETIC WORKBOOK :::::::::
+# Every tab is repeated `scale` times, each copy shifted to its own block of rounds
+def build_scaled_workbook(path, scale):
+    sheets = parse_workbook(MAIN_DATA_DIR)
+
+    with pd.ExcelWriter(path, engine = 'openpyxl') as writer:
+        for sheet_name, sheet_df in sheets.items():
+            if sheet_df.empty:
+                scaled_df = sheet_df
+            else:
+                rounds_per_copy = sheet_df['Round'].max() - sheet_df['Round'].min() + 1
+                copies = []
+                for i in range(scale):
+                    copy_df = sheet_df.copy()
+                    copy_df['Round'] = copy_df['Round'] + i * rounds_per_copy
+                    copies.append(copy_df)
+                scaled_df = pd.concat(copies, ignore_index = True)
+
+            scaled_df.to_excel(writer, sheet_name = sheet_name, index = False)
+
+    return {sheet_name: len(sheet_df) * (scale if not sheet_df.empty else 0) for sheet_name, sheet_df in sheets.items()}
+
+# ::::::::: LOADING PATHS :::::::::
+def load_per_tab(path, sheet_names):
+    return {sheet_name: pd.read_excel(path, sheet_name = sheet_name) for sheet_name in sheet_names}
+
+def load_single_pass(path, sheet_names):
+    return parse_workbook(path, sheet_names)
+
+def time_it(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', type = int, default = 100)
+    parser.add_argument('--repeat', type = int, default = 3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'TFC_MAIN_DATA_scaled.xlsx')
+
+        start = time.perf_counter()
+        row_counts = build_scaled_workbook(path, args.scale)
+        print(f"Built {path} ({sum(row_counts.values()):,} rows, {os.path.getsize(path) / 1e6:.1f} MB) in {time.perf_counter() - start:.1f}s")
+
+        sheet_names = list(row_counts)
+
+        per_tab_time, per_tab_tables = time_it(lambda: load_per_tab(path, sheet_names), args.repeat)
+        single_pass_time, single_pass_tables = time_it(lambda: load_single_pass(path, sheet_names), args.repeat)
+
+        # Both paths have to produce exactly the same frames
+        for sheet_name in sheet_names:
+            pd.testing.assert_frame_equal(per_tab_tables[sheet_name], single_pass_tables[sheet_name])
+
+    print(f"{'path':<14}{'best of ' + str(args.repeat):>14}")
+    print(f"{'per tab':<14}{per_tab_time:>13.2f}s")
+    print(f"{'single pass':<14}{single_pass_time:>13.2f}s")
+    print(f"speedup: {per_tab_time / single_pass_time:.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+# Runs every dashboard page headlessly with Streamlit's AppTest and reports, per page and dataset:
+# - wall time of the first (cold) run and of the following (warm) runs
+# - how that time splits into the load / aggregate / figure / render phases
+# - peak memory of the process running the page
+# - the data every section declared and what loading it cost (utils.data_registry.dependency_report)
+# as JSON, so two runs (before and after a change or a data refresh) can be compared.
+#
+# Every page runs in its own Python process, so the cold run really starts with empty caches and the peak
+# memory belongs to that page alone. --data-dir can be given more than once (e.g. the bundled data and a scaled
+# copy of it); each folder is used through GSC_DATA_DIR. --synthetic-scale N generates a dataset N times the bundled
+# one (benchmarks.synthetic_data) and runs the pages on it too.
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_pages [--data-dir data] [--synthetic-scale 10] [--page 1_Home.py] [--warm-runs 3] [--output results.json]
+#   python -m benchmarks.bench_pages --compare baseline.json [--tolerance 0.25]
+
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+PAGES = ['1_Home.py'] + sorted(glob.glob(os.path.join('pages', '*.py')))
+PHASES = ['load', 'aggregate', 'figure', 'render']
+
+# ::::::::: PHASE SAMPLER :::::::::
+# A background thread looks at the stack of the thread running the page every SAMPLE_INTERVAL seconds and
+# puts the sample in one phase, checking the frames between the page code and the innermost call:
+# - load:      inside utils.data_loader.read_workbook or WorkbookSheets.load (reading / parsing workbook sheets)
+# - figure:    inside plotly (building, validating and serializing figures)
+# - render:    inside streamlit (turning tables and widgets into messages)
+# - aggregate: everything else the page does (pandas / numpy work in the page and in utils)
+# Each phase gets its share of the samples times the wall time of the run.
+SAMPLE_INTERVAL = 0.001
+
+_PLOTLY_DIR = os.sep + 'plotly' + os.sep
+_STREAMLIT_DIR = os.sep + 'streamlit' + os.sep
+_DATA_LOADER_FILE = os.path.join('utils', 'data_loader.py')
+_LOAD_FUNCTIONS = {'read_workbook', 'load', '_parse_all'}
+
+def _classify(frame, page_path):
+    in_plotly = in_streamlit = False
+
+    while frame is not None:
+        filename = frame.f_code.co_filename
+
+        if os.path.abspath(filename) == page_path:
+            return 'figure' if in_plotly else 'render' if in_streamlit else 'aggregate'
+        if frame.f_code.co_name in _LOAD_FUNCTIONS and filename.endswith(_DATA_LOADER_FILE):
+            return 'load'
+
+        in_plotly = in_plotly or _PLOTLY_DIR in filename
+        in_streamlit = in_streamlit or _STREAMLIT_DIR in filename
+        frame = frame.f_back
+
+    return None  # the page isn't running in this thread
+
+class PhaseSampler:
+    def __init__(self, page):
+        self.page_path = os.path.abspath(page)
+        self.samples = dict.fromkeys(PHASES, 0)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                phase = _classify(frame, self.page_path)
+                if phase is not None:
+                    self.samples[phase] += 1
+
+    def __enter__(self):
+        self.samples = dict.fromkeys(PHASES, 0)
+        self._stop.clear()
+        self._thread = threading.Thread(target = self._sample, daemon = True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def phase_seconds(self, wall_time):
+        total = sum(self.samples.values())
+        if total == 0:
+            return dict.fromkeys(PHASES, None)
+        return {phase: wall_time * count / total for phase, count in self.samples.items()}
+
+# ::::::::: ONE PAGE (child process) :::::::::
+# The high water mark of this process alone; ru_maxrss is carried over through fork + exec on Linux, so it would
+# report the parent's peak when that is bigger
+def _peak_rss_mb():
+    try:
+        with open('/proc/self/status', encoding = 'ascii') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+def _timed_run(app, sampler):
+    with sampler:
+        start = time.perf_counter()
+        app.run()
+        wall_time = time.perf_counter() - start
+
+    return {
+        'seconds': wall_time,
+        'phases': sampler.phase_seconds(wall_time),
+        'errors': [str(exception.value) for exception in app.exception],
+    }
+
+def run_page(page, warm_runs, timeout):
+    from streamlit.testing.v1 import AppTest
+    from utils.data_registry import dependency_report
+
+    # Every run is a new session of the same process: the warm runs see the data and figure caches the cold run
+    # filled, like the next visitor of a running dashboard
+    sampler = PhaseSampler(page)
+    cold = _timed_run(AppTest.from_file(page, default_timeout = timeout), sampler)
+    warm = [_timed_run(AppTest.from_file(page, default_timeout = timeout), sampler) for _ in range(warm_runs)]
+
+    return {
+        'page': page,
+        'cold': cold,
+        'warm': warm,
+        'warm_best_seconds': min((run['seconds'] for run in warm), default = None),
+        'peak_rss_mb': _peak_rss_mb(),
+        'data': dependency_report(),
+    }
+
+# ::::::::: ALL PAGES (parent process) :::::::::
+def _run_page_process(page, data_dir, warm_runs, timeout):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_path = os.path.join(tmp_dir, 'result.json')
+        command = [
+            sys.executable, '-m', 'benchmarks.bench_pages',
+            '--child', page, '--child-output', output_path,
+            '--warm-runs', str(warm_runs), '--timeout', str(timeout),
+        ]
+        process = subprocess.run(command, env = {**os.environ, 'GSC_DATA_DIR': data_dir}, capture_output = True, text = True)
+
+        if process.returncode != 0 or not os.path.exists(output_path):
+            return {'page': page, 'error': process.stderr.strip().splitlines()[-1:] or ['no result']}
+
+        with open(output_path, encoding = 'utf-8') as f:
+            return json.load(f)
+
+def _environment():
+    import pandas
+    import plotly
+    import streamlit
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'streamlit': streamlit.__version__,
+        'pandas': pandas.__version__,
+        'plotly': plotly.__version__,
+        'data_loader_mode': os.environ.get('GSC_DATA_LOADER_MODE', 'snapshot'),
+    }
+
+# datasets: {label: data folder}; the label is what the results (and --compare) know the dataset by
+def run_benchmark(datasets, pages, warm_runs, timeout):
+    results = []
+    for label, data_dir in datasets.items():
+        for page in pages:
+            result = _run_page_process(page, data_dir, warm_runs, timeout)
+            result['data_dir'] = label
+            results.append(result)
+            print(_summary_line(result), file = sys.stderr)
+
+    return {'time': time.time(), 'environment': _environment(), 'results': results}
+
+def _format_seconds(seconds):
+    return f"{seconds:8.2f}s" if seconds is not None else f"{'-':>9}"
+
+def _summary_line(result):
+    label = f"{result['data_dir']}: {result['page']}"
+    if 'error' in result:
+        return f"{label:<50} failed: {' '.join(result['error'])}"
+
+    phases = result['cold']['phases']
+    phase_text = ' '.join(f"{phase} {phases[phase]:.2f}s" for phase in PHASES if phases[phase] is not None)
+    errors = ' (page raised an exception)' if result['cold']['errors'] else ''
+    return (
+        f"{label:<50} cold {_format_seconds(result['cold']['seconds'])} warm {_format_seconds(result['warm_best_seconds'])}"
+        f" peak {result['peak_rss_mb'] or 0:7.0f}MB  [{phase_text}]{errors}"
+    )
+
+# ::::::::: REGRESSION CHECK :::::::::
+# Pages (per dataset) whose cold or best warm time grew by more than `tolerance` (0.25 = 25%) since the baseline
+def compare_results(baseline, current, tolerance):
+    baseline_results = {(result['data_dir'], result['page']): result for result in baseline['results']}
+
+    regressions = []
+    for result in current['results']:
+        old_result = baseline_results.get((result['data_dir'], result['page']))
+        if old_result is None or 'error' in result or 'error' in old_result:
+            continue
+
+        for name, old_seconds, new_seconds in [
+            ('cold', old_result['cold']['seconds'], result['cold']['seconds']),
+            ('warm', old_result['warm_best_seconds'], result['warm_best_seconds']),
+        ]:
+            if old_seconds and new_seconds and new_seconds > old_seconds * (1 + tolerance):
+                regressions.append({
+                    'data_dir': result['data_dir'],
+                    'page': result['page'],
+                    'run': name,
+                    'baseline_seconds': old_seconds,
+                    'seconds': new_seconds,
+                })
+
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data-dir', action = 'append', help = 'folder with the workbooks, can be repeated (default: data)')
+    parser.add_argument('--synthetic-scale', type = int, action = 'append', help = 'also run on a generated dataset SCALE times the bundled one (see benchmarks.synthetic_data), can be repeated')
+    parser.add_argument('--seed', type = int, default = 0, help = 'seed of the generated datasets')
+    parser.add_argument('--page', action = 'append', help = 'page script to run, can be repeated (default: every page)')
+    parser.add_argument('--warm-runs', type = int, default = 3)
+    parser.add_argument('--timeout', type = float, default = 300)
+    parser.add_argument('--output', help = 'write the JSON results here instead of to stdout')
+    parser.add_argument('--compare', help = 'baseline JSON results to check the new results against')
+    parser.add_argument('--tolerance', type = float, default = 0.25)
+    parser.add_argument('--child', help = argparse.SUPPRESS)
+    parser.add_argument('--child-output', help = argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, os.getcwd())
+        with open(args.child_output, 'w', encoding = 'utf-8') as f:
+            json.dump(run_page(args.child, args.warm_runs, args.timeout), f)
+        return
+
+    datasets = {data_dir: data_dir for data_dir in args.data_dir or ([] if args.synthetic_scale else ['data'])}
+
+    with tempfile.TemporaryDirectory() as synthetic_dir:
+        for scale in args.synthetic_scale or []:
+            # In its own process, so generating the dataset doesn't add to the memory of this one (and its children)
+            data_dir = os.path.join(synthetic_dir, f'x{scale}')
+            subprocess.run(
+                [sys.executable, '-m', 'benchmarks.synthetic_data', data_dir, '--scale', str(scale), '--seed', str(args.seed), '--snapshots'],
+                check = True, stdout = subprocess.DEVNULL
+            )
+            datasets[f'synthetic x{scale} (seed {args.seed})'] = data_dir
+
+        results = run_benchmark(datasets, args.page or PAGES, args.warm_runs, args.timeout)
+
+    if args.output:
+        with open(args.output, 'w', encoding = 'utf-8') as f:
+            json.dump(results, f, indent = 2)
+    else:
+        print(json.dumps(results, indent = 2))
+
+    if args.compare:
+        with open(args.compare, encoding = 'utf-8') as f:
+            regressions = compare_results(json.load(f), results, args.tolerance)
+
+        for regression in regressions:
+            print(
+                f"slower: {regression['data_dir']}: {regression['page']} ({regression['run']})"
+                f" {regression['baseline_seconds']:.2f}s -> {regression['seconds']:.2f}s",
+                file = sys.stderr
+            )
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
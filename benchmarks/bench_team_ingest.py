@@ -0,0 +1,59 @@
+# Compares ingesting a folder of teams one workbook after the other with the process pool of utils.team_ingest.
+# Every team gets its own synthetic dataset (see benchmarks.synthetic_data, one seed per team).
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_team_ingest [--teams 8] [--scale 1] [--workers N]
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from benchmarks.synthetic_data import generate_dataset, scaled_config
+from utils.data_dirs import team_dir, team_snapshot_dir
+from utils.team_ingest import INGEST_WORKERS, ingest_teams, read_team_index
+
+
+def build_teams(teams_dir, teams, scale):
+    for number in range(teams):
+        generate_dataset(team_dir(f"team{number + 1:02d}", teams_dir), seed = number, **scaled_config(scale))
+
+# Ingests from scratch (no snapshots yet) and returns (seconds, {team: {file: hash}})
+def time_ingest(teams_dir, workers):
+    shutil.rmtree(team_snapshot_dir(teams_dir), ignore_errors = True)
+
+    summary = ingest_teams(teams_dir, workers = workers)
+    failed = [result for result in summary['files'] if result['status'] == 'failed']
+    if failed:
+        raise RuntimeError(f"{len(failed)} workbooks failed, e.g. {failed[0]['path']}: {failed[0]['error']}")
+
+    index = read_team_index(teams_dir)
+    return summary['seconds'], {team: {file_name: known['hash'] for file_name, known in files.items()} for team, files in index.items()}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--teams', type = int, default = 8)
+    parser.add_argument('--scale', type = int, default = 1)
+    parser.add_argument('--workers', type = int, default = INGEST_WORKERS)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as teams_dir:
+        start = time.perf_counter()
+        build_teams(teams_dir, args.teams, args.scale)
+        size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(teams_dir) for name in names)
+        print(f"Built {args.teams} teams ({size / 1e6:.1f} MB of workbooks) in {time.perf_counter() - start:.1f}s")
+
+        serial_time, serial_hashes = time_ingest(teams_dir, 1)
+        pool_time, pool_hashes = time_ingest(teams_dir, args.workers)
+
+        # Both have to end up with the same snapshots for every team
+        assert serial_hashes == pool_hashes
+
+    print(f"{'ingestion':<14}{'seconds':>10}")
+    print(f"{'serial':<14}{serial_time:>9.2f}s")
+    print(f"{f'{args.workers} workers':<14}{pool_time:>9.2f}s")
+    print(f"speedup: {serial_time / pool_time:.1f}x (on {os.cpu_count()} cores)")
+
+if __name__ == '__main__':
+    main()
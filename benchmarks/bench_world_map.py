@@ -0,0 +1,107 @@
+# Compares the old per-supplier world map (two Scattergeo traces per supplier) with the batched
+# utils.world_map.build_world_map_figure: figure build time and JSON size against the number of suppliers.
+# The suppliers are the ones of SUPPLIERS_DATA repeated with a small jitter on their position.
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_world_map [--suppliers 10 100 1000] [--repeat 3]
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from utils.constants_passer import COMPONENT_COLORS
+from utils.data_loader import load_suppliers_data
+from utils.world_map import build_world_map_figure
+
+
+# ::::::::: SYNTHETIC SUPPLIERS :::::::::
+def build_suppliers(n_suppliers, seed = 0):
+    suppliers_df = load_suppliers_data()
+    rng = np.random.default_rng(seed)
+
+    map_df = suppliers_df.sample(n_suppliers, replace = True, random_state = seed).reset_index(drop = True)
+    return map_df.assign(
+        Name = map_df['Name'] + ' ' + map_df.index.astype(str),
+        Latitude = map_df['Latitude'] + rng.uniform(-2, 2, n_suppliers),
+        Longitude = map_df['Longitude'] + rng.uniform(-2, 2, n_suppliers),
+    )
+
+# ::::::::: MAP PATHS :::::::::
+# What pages/2_💶Purchasing.py used to do (geo and legend layout left out, they are the same for both)
+def build_world_map_per_row(map_df, supply_colors):
+    fig = go.Figure()
+
+    fig.add_trace(go.Scattergeo(lon=[4.8952], lat=[52.3676], text="Netherlands", mode="markers",
+                                marker=dict(size=10, color='blue', opacity=0.7, symbol="circle"), name="Netherlands"))
+
+    for index, row in map_df.iterrows():
+        fig.add_trace(go.Scattergeo(lon=[row['Longitude'], 4.8952], lat=[row['Latitude'], 52.3676], mode='lines',
+                                    line=dict(width=2, color='rgb(249, 190, 71, 0.5)', dash='dashdot'), showlegend=False))
+
+    added_supplies = {}
+    for index, row in map_df.iterrows():
+        supply = row['Supply']
+        text_sup = f"Name: {row['Name']}<br>" \
+            f"Supply: {row['Supply']}<br>" \
+            f"Country: {row['Country']}<br>" \
+            f"Qlty: {row['Qlty']} <br>"\
+            f"Deliveries: {row['Deliveries']}<br>"\
+            f"AVG order size: {row['AVG_order_size']}<br>"\
+            f"TansP mode: {row['TransP_mode']}<br>"\
+            f"Trade unit: {row['Trade_unit']}<br>"
+        first = supply not in added_supplies
+        added_supplies[supply] = True
+
+        fig.add_trace(go.Scattergeo(lon=[row['Longitude']], lat=[row['Latitude']], text=text_sup, mode="markers",
+                                    marker=dict(size=10, color=supply_colors.get(supply, "grey"), opacity=0.8 if first else 0.7,
+                                                symbol="circle", line=dict(color='black', width=1)),
+                                    name=supply if first else None, showlegend=first))
+
+    return fig
+
+# Every marker as (lon, lat, hover text, colour, opacity), to check both maps draw the same thing
+def markers(fig):
+    points = []
+    for trace in fig.data:
+        if trace.mode != 'markers':
+            continue
+        texts = [trace.text] * len(trace.lon) if isinstance(trace.text, str) else trace.text
+        opacities = np.broadcast_to(trace.marker.opacity, len(trace.lon))
+        for lon, lat, text, opacity in zip(trace.lon, trace.lat, texts, opacities):
+            points.append((round(lon, 6), round(lat, 6), text, trace.marker.color, float(opacity)))
+    return sorted(points)
+
+def time_it(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--suppliers', type = int, nargs = '+', default = [10, 100, 1000])
+    parser.add_argument('--repeat', type = int, default = 3)
+    args = parser.parse_args()
+
+    print(f"{'suppliers':>10}{'path':>10}{'traces':>9}{'build':>10}{'to_json':>10}{'JSON size':>12}")
+    for n_suppliers in args.suppliers:
+        map_df = build_suppliers(n_suppliers)
+
+        figures = {}
+        for path, build in [('per row', build_world_map_per_row), ('batched', build_world_map_figure)]:
+            build_time, fig = time_it(lambda: build(map_df, COMPONENT_COLORS), args.repeat)
+            json_time, fig_json = time_it(fig.to_json, args.repeat)
+            figures[path] = fig
+
+            print(f"{n_suppliers:>10}{path:>10}{len(fig.data):>9}{build_time:>9.3f}s{json_time:>9.3f}s{len(fig_json) / 1e3:>10.0f}kB")
+
+        # Both paths have to draw exactly the same markers
+        assert markers(figures['per row']) == markers(figures['batched'])
+
+if __name__ == '__main__':
+    main()
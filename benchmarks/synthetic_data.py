@@ -0,0 +1,277 @@
+# Writes a synthetic copy of the dashboard inputs (TFC_MAIN_DATA, Suppliers_NEW and FinanceReport workbooks) with
+# the same file names, sheet names, columns and dtypes as the bundled ones, but any number of rounds, components,
+# suppliers, customers and products, for scaling tests of the pages.
+#
+# The bundled entities come first (the pages and constants_passer refer to some of them by name), the extra ones
+# are called 'Component 10', 'Supplier 12', ... Every generated row copies a row of the bundled data (same entity
+# position modulo the bundled entity count, same round position modulo the bundled rounds) with seeded noise on its
+# numbers, so the values stay in realistic ranges: shares stay within 0..1, integer columns stay integers.
+#
+# Run from the repository root:
+#   python -m benchmarks.synthetic_data OUTPUT_DIR [--rounds 6] [--components 9] [--suppliers 11] [--customers 4]
+#       [--products 8] [--seed 0] [--snapshots]
+# and point the dashboard at it with GSC_DATA_DIR=OUTPUT_DIR (or: python -m benchmarks.bench_pages --data-dir OUTPUT_DIR).
+# --snapshots also writes the Arrow snapshots (see utils.snapshot_store), so no page has to parse the workbooks.
+
+import argparse
+import hashlib
+import itertools
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.data_loader import FINANCE_DATA_DIR, MAIN_DATA_DIR, SUPPLIERS_DATA_DIR, parse_workbook
+from utils.snapshot_store import write_snapshot
+
+
+# Relative spread of the generated numbers around the bundled ones
+NOISE = 0.1
+FIRST_ROUND = -2
+
+# ::::::::: DATASET SIZE :::::::::
+# The bundled data: 6 rounds (-2 .. 3), 9 components, 11 suppliers, 4 customers and 8 products
+BUNDLED_CONFIG = {'rounds': 6, 'components': 9, 'suppliers': 11, 'customers': 4, 'products': 8}
+
+# Every count (and the number of rounds) times `scale`
+def scaled_config(scale):
+    return {name: count * scale for name, count in BUNDLED_CONFIG.items()}
+
+# ::::::::: KEY COLUMNS :::::::::
+# The key columns of every sheet and the entity each one holds. None keeps the bundled values of that column
+# (e.g. the two bottling lines), the sheet then gets them for every generated entity.
+MAIN_TABLE_KEYS = {
+    'Component': {'Component': 'component'},
+    'Supplier': {'Supplier': 'supplier', 'Component': 'component'},
+    'Supplier - Component': {'Supplier': 'supplier', ' Component': 'component'},
+    'Bottling line': {'Bottling line': None},
+    'Mixers': {'Mixer': None},
+    'Customer': {'Customer': 'customer'},
+    'Customer - Product': {'Customer': 'customer', ' Product': 'product'},
+    'Product': {'Product': 'product'},
+    'Warehouse, Salesarea': {'Warehouse': None, ' Salesarea': None},
+    'Carrier - Warehouse': {'Carrier': None, ' Warehouse': None},
+    'Salesarea - Customer - Product': {'Salesarea': None, ' Customer': 'customer', ' Product': 'product'},
+    'Distributor': {'Distributor': None},
+    'Product - Warehouse': {'Product': 'product', ' Warehouse': None},
+}
+
+SUPPLIER_KEYS = {'Name': 'supplier', 'Supply': 'component'}
+
+# Finance report line items that exist once per customer / supplier
+FINANCE_ENTITY_PREFIXES = {
+    'Realized revenue - Contracted sales revenue - Contracted sales revenue - ': 'customer',
+    'Realized revenue - Bonus or penalties - Contracted sales revenue - ': 'customer',
+    'Gross margin - Cost of goods sold - Purchase value - ': 'supplier',
+}
+
+# Moved by a few degrees instead of scaled
+JITTERED_COLUMNS = {'Latitude': 2.0, 'Longitude': 2.0}
+
+# ::::::::: ENTITIES :::::::::
+def _entity_names(bundled_names, count, label):
+    extra = [f"{label} {number}" for number in range(len(bundled_names) + 1, count + 1)]
+    return (list(bundled_names) + extra)[:count]
+
+def build_entities(config, main_sheets):
+    components = _entity_names(main_sheets['Component']['Component'].unique(), config['components'], 'Component')
+    customers = _entity_names(main_sheets['Customer']['Customer'].unique(), config['customers'], 'Customer')
+    products = _entity_names(main_sheets['Product']['Product'].unique(), config['products'], 'Product')
+    suppliers = _entity_names(main_sheets['Supplier']['Supplier'].unique(), config['suppliers'], 'Supplier')
+
+    # Combinations as many per customer as in the bundled data (2 - 3 products per customer), spread over the products
+    bundled_pairs = main_sheets['Customer - Product'][['Customer', ' Product']].drop_duplicates()
+    products_per_customer = min(len(products), max(1, round(len(bundled_pairs) / bundled_pairs['Customer'].nunique())))
+
+    combinations = {
+        ('component',): [(component,) for component in components],
+        ('customer',): [(customer,) for customer in customers],
+        ('product',): [(product,) for product in products],
+        ('supplier',): [(supplier,) for supplier in suppliers],
+        # Every supplier delivers one component
+        ('supplier', 'component'): [(supplier, components[i % len(components)]) for i, supplier in enumerate(suppliers)],
+        ('customer', 'product'): [
+            (customer, products[(i * products_per_customer + j) % len(products)])
+            for i, customer in enumerate(customers)
+            for j in range(products_per_customer)
+        ],
+    }
+
+    # Only the entities that aren't in the bundled data get their own finance report line items
+    new_entities = {
+        'customer': customers[main_sheets['Customer']['Customer'].nunique():],
+        'supplier': suppliers[main_sheets['Supplier']['Supplier'].nunique():],
+    }
+
+    return combinations, new_entities
+
+# ::::::::: SHEETS :::::::::
+def _noisy(values, rng):
+    return values * rng.lognormal(0.0, NOISE, values.shape)
+
+def _generate_values(template_df, template_positions, rng):
+    generated = {}
+
+    for col in template_df.columns:
+        values = template_df[col].to_numpy()[template_positions]
+        template_col = template_df[col]
+
+        if col in JITTERED_COLUMNS:
+            values = values + rng.uniform(-JITTERED_COLUMNS[col], JITTERED_COLUMNS[col], len(values))
+        elif pd.api.types.is_integer_dtype(template_col):
+            values = np.round(_noisy(values.astype(float), rng)).astype(template_col.dtype)
+        elif pd.api.types.is_float_dtype(template_col):
+            values = _noisy(values, rng)
+            # Shares (every bundled value within 0 .. 1) stay shares
+            if template_col.notna().any() and template_col.min() >= 0 and template_col.max() <= 1:
+                values = np.clip(values, 0, 1)
+
+        generated[col] = values
+
+    return generated
+
+# One row per (key combination, round). `keys` maps the key columns to their entity (see MAIN_TABLE_KEYS).
+def generate_sheet(template_df, keys, entities, rounds, rng, round_major = False):
+    if template_df.empty:
+        return template_df.copy()
+
+    key_cols = list(keys)
+    fixed_cols = [col for col in key_cols if keys[col] is None]
+    entity_cols = [col for col in key_cols if keys[col] is not None]
+
+    # Key combinations of the bundled sheet (first appearance order) and their rows, sorted by round
+    template_df = template_df.reset_index(drop = True)
+    template_groups = list(template_df.groupby(key_cols, sort = False, dropna = False).indices.values())
+    template_groups = [group[np.argsort(template_df['Round'].to_numpy()[group], kind = 'stable')] for group in template_groups]
+
+    # Generated key combinations: the entities crossed with the bundled values of the fixed columns
+    fixed_combinations = list(template_df[fixed_cols].drop_duplicates().itertuples(index = False, name = None)) if fixed_cols else [()]
+    entity_combinations = entities[tuple(keys[col] for col in entity_cols)] if entity_cols else [()]
+    combinations = [
+        dict(zip(fixed_cols + entity_cols, fixed + entity))
+        for fixed, entity in itertools.product(fixed_combinations, entity_combinations)
+    ]
+
+    if round_major:
+        combination_indices = np.tile(np.arange(len(combinations)), len(rounds))
+        round_indices = np.repeat(np.arange(len(rounds)), len(combinations))
+    else:
+        combination_indices = np.repeat(np.arange(len(combinations)), len(rounds))
+        round_indices = np.tile(np.arange(len(rounds)), len(combinations))
+
+    # The template row of every generated row: same combination position and round position (both cyclic)
+    group_lengths = np.array([len(group) for group in template_groups])
+    group_starts = np.concatenate([[0], np.cumsum(group_lengths)[:-1]])
+    template_group = combination_indices % len(template_groups)
+    template_positions = np.concatenate(template_groups)[group_starts[template_group] + round_indices % group_lengths[template_group]]
+
+    generated = _generate_values(template_df, template_positions, rng)
+    for col in key_cols:
+        generated[col] = np.array([combination[col] for combination in combinations], dtype = object)[combination_indices]
+    generated['Round'] = np.asarray(rounds)[round_indices]
+
+    return pd.DataFrame(generated, columns = template_df.columns)
+
+def generate_main_tables(main_sheets, entities, rounds, rng):
+    return {
+        sheet_name: generate_sheet(sheet_df, MAIN_TABLE_KEYS[sheet_name], entities, rounds, rng)
+        for sheet_name, sheet_df in main_sheets.items()
+    }
+
+def generate_suppliers(suppliers_df, entities, rounds, rng):
+    # The supplier sheet only starts at round 0 and lists all suppliers of a round together
+    supplier_rounds = [round_number for round_number in rounds if round_number >= suppliers_df['Round'].min()]
+    return generate_sheet(suppliers_df, SUPPLIER_KEYS, entities, supplier_rounds, rng, round_major = True)
+
+# One row per line item, one column per round; the per customer / supplier line items get a row for every entity
+def generate_finance_report(finance_df, new_entities, rounds, rng):
+    line_items = finance_df['Round'].tolist()
+    bundled_rounds = list(finance_df.columns[1:])
+    template_values = finance_df[bundled_rounds].to_numpy(dtype = float)
+
+    rows = list(range(len(line_items)))
+    names = list(line_items)
+    for prefix, entity in FINANCE_ENTITY_PREFIXES.items():
+        positions = [position for position, name in enumerate(line_items) if name.startswith(prefix)]
+        if not positions:
+            continue
+        extra = new_entities[entity]
+
+        # New line items go right after the bundled ones of the same kind
+        insert_at = names.index(line_items[positions[-1]]) + 1
+        rows[insert_at:insert_at] = [positions[i % len(positions)] for i in range(len(extra))]
+        names[insert_at:insert_at] = [prefix + name for name in extra]
+
+    round_positions = [i % len(bundled_rounds) for i in range(len(rounds))]
+    values = _noisy(template_values[np.ix_(rows, round_positions)], rng)
+
+    report_df = pd.DataFrame(values, columns = rounds)
+    report_df.insert(0, 'Round', pd.Series(names, dtype = object))
+    return report_df
+
+# ::::::::: WRITING :::::::::
+def _write_workbook(path, sheets):
+    with pd.ExcelWriter(path, engine = 'openpyxl') as writer:
+        for sheet_name, sheet_df in sheets.items():
+            sheet_df.to_excel(writer, sheet_name = sheet_name, index = False)
+
+def _write_snapshot(path, snapshot_dir):
+    with open(path, 'rb') as f:
+        file_hash = hashlib.sha1(f.read()).hexdigest()
+    # Snapshot what the dashboard would parse, not the frames in memory (the Excel round trip can change dtypes)
+    return write_snapshot(path, file_hash, parse_workbook(path), snapshot_dir)
+
+def generate_dataset(output_dir, rounds = 6, components = 9, suppliers = 11, customers = 4, products = 8, seed = 0, snapshots = False):
+    config = {'rounds': rounds, 'components': components, 'suppliers': suppliers, 'customers': customers, 'products': products}
+    rng = np.random.default_rng(seed)
+    round_numbers = list(range(FIRST_ROUND, FIRST_ROUND + rounds))
+
+    main_sheets = parse_workbook(MAIN_DATA_DIR)
+    entities, new_entities = build_entities(config, main_sheets)
+
+    workbooks = {
+        MAIN_DATA_DIR: generate_main_tables(main_sheets, entities, round_numbers, rng),
+        SUPPLIERS_DATA_DIR: {
+            sheet_name: generate_suppliers(sheet_df, entities, round_numbers, rng)
+            for sheet_name, sheet_df in parse_workbook(SUPPLIERS_DATA_DIR).items()
+        },
+        FINANCE_DATA_DIR: {
+            sheet_name: generate_finance_report(sheet_df, new_entities, round_numbers, rng)
+            for sheet_name, sheet_df in parse_workbook(FINANCE_DATA_DIR).items()
+        },
+    }
+
+    os.makedirs(output_dir, exist_ok = True)
+
+    row_counts = {}
+    for source_path, sheets in workbooks.items():
+        path = os.path.join(output_dir, os.path.basename(source_path))
+        _write_workbook(path, sheets)
+        if snapshots:
+            _write_snapshot(path, os.path.join(output_dir, '.snapshots'))
+        row_counts[path] = sum(len(sheet_df) for sheet_df in sheets.values())
+
+    return row_counts
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('output_dir')
+    for name, count in BUNDLED_CONFIG.items():
+        parser.add_argument(f'--{name}', type = int, default = count)
+    parser.add_argument('--scale', type = int, help = 'every count above times SCALE')
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--snapshots', action = 'store_true')
+    args = parser.parse_args()
+
+    config = scaled_config(args.scale) if args.scale else {name: getattr(args, name) for name in BUNDLED_CONFIG}
+
+    start = time.perf_counter()
+    row_counts = generate_dataset(args.output_dir, seed = args.seed, snapshots = args.snapshots, **config)
+
+    for path, row_count in row_counts.items():
+        print(f"{path}: {row_count:,} rows, {os.path.getsize(path) / 1e6:.1f} MB")
+    print(f"generated in {time.perf_counter() - start:.1f}s ({', '.join(f'{name} {count}' for name, count in config.items())})")
+
+if __name__ == '__main__':
+    main()
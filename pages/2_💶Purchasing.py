@@ -4,9 +4,14 @@ import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 
-from utils.data_loader import load_and_process_finance_data
-from utils.data_loader import load_suppliers_data
-from utils.data_loader import read_main_table_tabs
+from utils.kpis import add_kpis
+from utils.world_map import world_map_figure
+from utils.supplier_report import supplier_report_html
+from utils.lazy_tabs import lazy_tabs, table_previews
+from utils.value_labels import add_value_labels, format_rounded
+from utils.fragments import page_section
+from utils.data_watcher import data_reload_notice
+from utils.round_window import round_window_selector
 
 from utils.constants_passer import COMPONENT_COLORS, SITE_EMOJI
 
@@ -23,20 +28,10 @@ st.set_page_config(
 st.title("💶 Purchasing")
 st.divider()
 
-# ::::::::: READING THE DATAFRAME FROM data_loader.py AND CONSTANTS :::::::::::
-# SOME REASON INCLUDED THIS PROBABLY IMPORTANT
-RAW_FINANCE_DF = load_and_process_finance_data()[0]
-PROCESSED_FINANCE_DF = load_and_process_finance_data()[1]
+data_reload_notice()
+round_window_selector()
 
-# FOR THE WORLDWIDE SUPPLIERS SECTION
-MANUAL_SUPPLIER_DF = load_suppliers_data()
-
-# FOR IMPORTANT KPI'S SECTION
-SUPPLIER_COMPONENT_DF = read_main_table_tabs('Supplier - Component')
-COMPONENT_DF = read_main_table_tabs('Component')
-
-# FOR THE COMPONENT KPI'S SECTION
-SUPPLIER_DF = read_main_table_tabs('Supplier')
+# ::::::::: DATA AND CONSTANTS :::::::::::
 
 component_colors = COMPONENT_COLORS
 supply_colors = component_colors
@@ -44,239 +39,22 @@ supply_colors = component_colors
 # :::::::::::::::::::::::::::::::::: DATA PLOTS AND TABLES :::::::::::::::::::::::::::::::::: 
 
 # :::::::::::::::: WORLD MAP AND ROUND SUPPLIER REPORT ::::::::::::::::
-def wrld_map_and_suplr_report_section():
+@page_section('world map and supplier report', data = ['manual suppliers'])
+def wrld_map_and_suplr_report_section(data):
+    MANUAL_SUPPLIER_DF = data['manual suppliers']
     
 # :::::::::::::::: WORLD MAP ::::::::::::::::
-    def world_map(data_df):
-        # Create a DataFrame
-        map_df = pd.DataFrame(data_df)
-
-
-        # Plotly figure setup
-        fig = go.Figure()
-
-        # Update geos and layout
-        fig.update_geos(
-            showcountries=True,
-            projection_type="equirectangular",
-            showcoastlines=True,
-            countrycolor="rgba(0, 0, 0, 0.2)", 
-            coastlinecolor="rgba(0, 0, 0, 0.2)",
-            showland=True,
-            landcolor = "rgba(218, 223, 233, 0.4)"
-
-        )
-        fig.update_layout(height=500, margin={"r": 0, "t": 0, "l": 0, "b": 10})
-
-        fig.update_layout(
-            legend=dict(
-                orientation='h',    # Horizontal orientation
-                yanchor='bottom',   # Anchor to bottom of the plot
-                y=0,             # Adjust this value to position the legend further down
-                xanchor='left',     # Anchor to right side
-                x=0                 # Anchor to right side of the plot
-            )
-        )
-
-        # Add a dot for the Netherlands
-        fig.add_trace(
-            go.Scattergeo(
-                lon=[4.8952],  # Longitude of the Netherlands
-                lat=[52.3676],  # Latitude of the Netherlands
-                text="Netherlands",
-                mode="markers",
-                marker=dict(
-                    size=10,
-                    color='blue',  # Color of the Netherlands dot
-                    opacity=0.7,
-                    symbol="circle"
-                ),
-                name="Netherlands"
-            )
-        )
-
-        # Plot each product on the map and add arrows to the Netherlands
-        for index, row in map_df.iterrows():
-
-            # Add arrows from each location to the Netherlands
-            fig.add_trace(
-                go.Scattergeo(
-                    lon=[row['Longitude'], 4.8952],
-                    lat=[row['Latitude'], 52.3676],
-                    mode='lines',
-                    line=dict(
-                        width=2, 
-                        color='rgb(249, 190, 71, 0.5)', 
-                        dash='dashdot'
-                    ),
-                    showlegend=False
-                )
-            )
-
-            
-        added_supplies = {}
-
-        for index, row in map_df.iterrows():
-            supply = row['Supply']
-            
-            text_sup = f"Name: {row['Name']}<br>" \
-                f"Supply: {row['Supply']}<br>" \
-                f"Country: {row['Country']}<br>" \
-                f"Qlty: {row['Qlty']} <br>"\
-                f"Deliveries: {row['Deliveries']}<br>"\
-                f"AVG order size: {row['AVG_order_size']}<br>"\
-                f"TansP mode: {row['TransP_mode']}<br>"\
-                f"Trade unit: {row['Trade_unit']}<br>"
-
-            # Check if the supply has already been added to the legend
-            if supply not in added_supplies:
-                added_supplies[supply] = True  # Mark the supply as added
-                
-                fig.add_trace(
-                    go.Scattergeo(
-                        lon=[row['Longitude']],
-                        lat=[row['Latitude']],
-                        text=text_sup,
-                        mode="markers",
-                        marker=dict(
-                            size=10,
-                            color=supply_colors.get(row['Supply'], "grey"),
-                            opacity=0.8,
-                            symbol="circle",
-                            line=dict(color='black', width=1)
-                        ),
-                        name=row['Supply']  # Use the supply instead of row['Name']
-                    )
-                )
-            else:
-                # Add a trace without adding to the legend for subsequent occurrences of the same supply
-                fig.add_trace(
-                    go.Scattergeo(
-                        lon=[row['Longitude']],
-                        lat=[row['Latitude']],
-                        text=text_sup,
-                        mode="markers",
-                        marker=dict(
-                            size=10,
-                            color=supply_colors.get(row['Supply'], "grey"),
-                            opacity=0.7,
-                            symbol="circle",
-                                line=dict(color='black', width=1)
-                        ),
-                        showlegend=False  # Do not add to legend
-                    )
-                )
-
+    def world_map(round_number):
+        # A handful of traces however many suppliers there are, built once per round (see utils/world_map.py)
+        fig = world_map_figure(round_number)
 
         # Display the map
         st.plotly_chart(fig, theme="streamlit", use_container_width=True)
 
 # :::::::::::::::: ROUND SUPPLIER REPORT ::::::::::::::::
-    def supplier_report(df):
-        css_styles = """
-                <style>
-                    .column1 {
-                        background-color: rgb(244, 245, 247);
-                        text-align: left;
-                        border-radius: 10px;
-                        padding-left: 20px;
-                        margin-top: 40px;
-                        padding-bottom: 10px;
-                    }
-
-                    .column1 h4 {
-                        color: rgb(0, 0, 0, 1);
-                        padding-top: 10px;
-                    }
-
-                    table {
-                        width: 100%;
-                        border: none!important;
-                    }
-
-
-                    th {
-                        text-align: center;
-                        font-size: 14px;
-                    }
-
-                    tr {
-                        height: 10px;
-                        font-size: 14px;
-                    }
-
-                    table, td, th{
-                        border: none!important;
-                    }
-
-                    td, th {
-                        border: none;
-                        padding-top: 1px!important;
-
-                    }
-
-                    p {
-                        margin: 0;
-                    }
-
-                    .right-align {
-                        text-align: right;
-                    }
-
-                    .left-align {
-                        text-align: left;
-                    }
-
-                    .center-align {
-                        text-align: center;
-                    }
-
-                    .bold {
-                        font-weight: bold;
-                    }
-
-                    .monospace {
-                        font-family: 'Consolas', monospace;
-                    }
-
-                </style>
-            """
-
-        table_header = "<div class='column1'><div style='margin-bottom: -35px;'><h4 class='bold monospace'>Round supplier report</h4></div><br><div style='margin-bottom:-10px; margin-top: -4px; padding-right: 20px; padding-top: -5px;'><table cellspacing='0' cellpadding='0'><tr><th class='bold left-align'>Trade unit</th><th class='bold right-align'>Order size</th><th class='bold right-align'>Purchases</th><th class='bold right-align'>Purchase value</th><th class='bold right-align'>Transport costs</th></tr>"
-
-        color_mapping = {
-            'Pack1L': 'rgb(135, 110, 168)',
-            'PET': 'rgb(92, 154, 207)',
-            'Orange': 'rgb(245, 158, 52)',
-            'Mango': 'rgb(165, 213, 89)',
-            'Vitamin C': 'rgb(249, 121, 125)',
-            'Açaí': 'rgb(199, 146, 234)'
-        }
-
-        #  Adding the "," to the numbers for better readability
-        df['AVG_order_size'] = df['AVG_order_size'].apply(lambda x: f"{x:,}")
-        df['Deliveries'] = df['Deliveries'].apply(lambda x: f"{x:,}")
-        df['Purchase value'] = df['Purchase value'].apply(lambda x: f"{x:,}")
-        df['Transport costs'] = df['Transport costs'].apply(lambda x: f"{x:,}")
-
-        table_rows = ""
-        current_trade_unit = None
-        for index, row in df.iterrows():
-            if row['Trade_unit'] != current_trade_unit:
-                table_rows += f"<tr><th class='bold left-align'>{row['Trade_unit']}</th></tr>"
-                item_info = df.loc[df['Trade_unit'] == row['Trade_unit'], ['Supply', 'AVG_order_size', 'Deliveries', 'Purchase value', 'Transport costs']]
-                for _, item_row in item_info.iterrows():
-                    item_color = color_mapping.get(item_row['Supply'], 'black')  # Default color if not found in the mapping
-                    table_rows += f"<tr><td class='right-align monospace' style='font-weight: bold; color: {item_color};'>{item_row['Supply']}</td><td class='right-align monospace'>{item_row['AVG_order_size']}</td><td class='right-align monospace'>{item_row['Deliveries']}</td><td class='right-align monospace'>{item_row['Purchase value']}</td><td class='right-align monospace'>{item_row['Transport costs']}</td></tr>"
-                current_trade_unit = row['Trade_unit']
- 
-        table_footer = "</table></div></div>"
-
-        # # Construct the complete HTML table
-        table_html = f"{css_styles}{table_header}{table_rows}{table_footer}"
-
-        # Display the HTML table in Streamlit using markdown
-        st.markdown(table_html, unsafe_allow_html=True)
+    def supplier_report(round_number):
+        # Rendered once per round and data version (see utils/supplier_report.py)
+        st.markdown(supplier_report_html(round_number), unsafe_allow_html=True)
     
     def display_quant_per_unit():
         st.markdown(
@@ -296,46 +74,36 @@ def wrld_map_and_suplr_report_section():
 
     st.subheader("Worldwide Suppliers")
     # ::::::::::: DYNAMIC TABS :::::::::::
-    # Suppose you have a variable that determines the number of rounds
-    number_of_rounds = MANUAL_SUPPLIER_DF['Round'].nunique()  
-
-    # Create a list of tab labels dynamically
-    tab_labels = [f"Round {i}" for i in range(number_of_rounds)]
+    # One tab per round of the suppliers data inside the round window
+    supplier_rounds = sorted(MANUAL_SUPPLIER_DF['Round'].unique().tolist())
 
-    # Use a list comprehension to create tabs dynamically
-    tabs = st.tabs(tab_labels)
+    def round_tab(i):
+        col1, col2 = st.columns(2, gap = "small")
 
-    for i, tab in enumerate(tabs):
-        with tab:
-            
-            col1, col2 = st.columns(2, gap = "small")
+        with col1:
+            world_map(i)
 
-            with col1:
-                round_data = MANUAL_SUPPLIER_DF[MANUAL_SUPPLIER_DF['Round'] == i]
-                world_map(round_data)
+        with col2:
+            supplier_report(i)
+            display_quant_per_unit()
 
-            with col2:
-                round_report_data = MANUAL_SUPPLIER_DF[MANUAL_SUPPLIER_DF['Round'] == i]
-                supplier_report(round_report_data)
-                display_quant_per_unit()
+    # Only the selected round is built and rendered
+    lazy_tabs(supplier_rounds, round_tab, key = 'supplier_round_tab', format_func = lambda i: f"Round {i}")
                 
 wrld_map_and_suplr_report_section()
 
 # :::::::::::::::: IMPORTANT KPIS ::::::::::::::::
-def important_kpi_section():
+@page_section('important kpi', data = ['finance wide', 'Component', 'Supplier - Component'])
+def important_kpi_section(data):
+    FINANCE_WIDE_DF = data['finance wide']
+    COMPONENT_DF = data['Component']
+    SUPPLIER_COMPONENT_DF = data['Supplier - Component']
     
     st.divider()
     st.subheader("Important KPI's")
 
     def raw_material_costs_plot():
-        main_df = RAW_FINANCE_DF.copy().T.reset_index()
-        main_df.columns = main_df.iloc[0]
-        main_df = main_df.drop(main_df.index[0])
-
-        # Filter duplicate columns based on the first occurrence
-        main_df = main_df.loc[:, ~main_df.columns.duplicated()]
-
-        filt_df = main_df[['Round', 'Gross margin - Cost of goods sold - Purchase value', 'Realized revenue']]
+        filt_df = FINANCE_WIDE_DF[['Gross margin - Cost of goods sold - Purchase value', 'Realized revenue']].reset_index()
         
         filt_df['Raw_mat_costs'] = (filt_df['Gross margin - Cost of goods sold - Purchase value'] / filt_df['Realized revenue']) * 100
 
@@ -376,34 +144,12 @@ def important_kpi_section():
             height = 400
         )
 
-        annotations = []
-        for i, row in filt_df.iterrows():
-            raw_mat_costs_rounded = round(row['Raw_mat_costs'], 1)
-            annotations.append(
-                dict(
-                    x=row['Round'],
-                    y=row['Raw_mat_costs'],
-                    xref='x',
-                    yref='y',
-                    text=f'<b>{str(raw_mat_costs_rounded)}%</b>',
-                    showarrow=False,
-                    font=dict(
-                        size=12,
-                    ),  
-                    xanchor='center',  # Center text horizontally on marker
-                    yanchor='bottom',  # Position text above the marker
-                    yshift=10  # Adjust vertical position
-                )
-            )
-
-        # Add annotations to the plot
-        for annotation in annotations:
-            fig.add_annotation(annotation)
+        add_value_labels(fig, filt_df['Round'], filt_df['Raw_mat_costs'], format_rounded(filt_df['Raw_mat_costs'], 1), suffix = '%')
 
         st.plotly_chart(fig, theme = "streamlit", use_container_width=True)
 
     def line_plot(col_name, plot_name):
-        main_df = COMPONENT_DF.copy()
+        main_df = COMPONENT_DF
 
         df_agg = main_df.groupby(['Component','Round'], as_index = False)[col_name].sum()
         
@@ -473,44 +219,13 @@ def important_kpi_section():
                             ),  # Modify color and style as needed
             )
         
-        annotations = []
-        for i, row in avg_per_round.iterrows():
-            avg_rounded = round(row['AVG'], 2)
-            annotations.append(
-                dict(
-                    x=row['Round'],
-                    y=row['AVG'],
-                    xref='x',
-                    yref='y',
-                    text=f'<b>{str(avg_rounded)}%</b>',
-                    showarrow=False,
-                    font=dict(
-                        size=12,
-                    ),  
-                    xanchor='center',  # Center text horizontally on marker
-                    yanchor='bottom',  # Position text above the marker
-                    yshift=10  # Adjust vertical position
-                )
-            )
-
-        # Add annotations to the plot
-        for annotation in annotations:
-            fig.add_annotation(annotation)
+        add_value_labels(fig, avg_per_round['Round'], avg_per_round['AVG'], format_rounded(avg_per_round['AVG'], 2), suffix = '%')
 
         st.plotly_chart(fig, theme = "streamlit", use_container_width=True)
 
     def avg_transport_costs():
-        main_df = SUPPLIER_COMPONENT_DF.copy()
-        
-        def calculate_transport_percentage(row):
-            if row['Purchase value previous round'] == 0:
-                return 0
-            else:
-                return row['Transport costs previous round'] / row['Purchase value previous round']
-
-        
-        # Apply the function row-wise to create a new column 'Transport%'
-        main_df['Transport%'] = main_df.apply(calculate_transport_percentage, axis=1)
+        # Transport costs as a fraction of the purchase value (0 when nothing was purchased)
+        main_df = add_kpis(SUPPLIER_COMPONENT_DF, ['Transport%'])
 
         # Group by 'Round' and calculate the average 'Transport%' per round
         avg_transport_per_round = main_df.groupby('Round')['Transport%'].mean().reset_index()
@@ -553,29 +268,7 @@ def important_kpi_section():
                             ),  # Modify color and style as needed
         )
 
-        annotations = []
-        for i, row in avg_transport_per_round.iterrows():
-            avg_rounded = round(row['Transport%'], 2)
-            annotations.append(
-                dict(
-                    x=row['Round'],
-                    y=row['Transport%'],
-                    xref='x',
-                    yref='y',
-                    text=f'<b>{str(avg_rounded)}%</b>',
-                    showarrow=False,
-                    font=dict(
-                        size=12,
-                    ),  
-                    xanchor='center',  # Center text horizontally on marker
-                    yanchor='bottom',  # Position text above the marker
-                    yshift=10  # Adjust vertical position
-                )
-            )
-
-        # Add annotations to the plot
-        for annotation in annotations:
-            fig.add_annotation(annotation)
+        add_value_labels(fig, avg_transport_per_round['Round'], avg_transport_per_round['Transport%'], format_rounded(avg_transport_per_round['Transport%'], 2), suffix = '%')
 
         st.plotly_chart(fig, theme = "streamlit", use_container_width=True)
 
@@ -594,13 +287,16 @@ important_kpi_section()
 
 # :::::::::::::::: COMPONENT KPIS PER ROUND ::::::::::::::::
 
-def component_kpi_section():
+@page_section('component kpi', data = ['Component', 'Supplier'])
+def component_kpi_section(data):
+    COMPONENT_DF = data['Component']
+    SUPPLIER_DF = data['Supplier']
 
     st.divider()
     st.subheader("Component KPI's per round")
 
     def plot_bar_charts_group(data, col_name, plot_name, mode):
-        df = data.copy()
+        df = data
 
         df_agg = df.groupby(['Component', 'Round'], as_index = False)[col_name].sum()
 
@@ -620,7 +316,7 @@ def component_kpi_section():
                     x=data['Round'],
                     y=data[col_name],
                     name=component,
-                    marker=dict(color=component_colors[component])
+                    marker=dict(color=component_colors.get(component))
                 )
             )
 
@@ -730,7 +426,7 @@ def component_kpi_section():
         st.plotly_chart(fig, theme="streamlit", use_container_width=True)
 
     def plot_bar_charts_group2(data, col_name, plot_name, mode):
-        df = data.copy()
+        df = data
 
         df_agg = df.groupby(['Component', 'Round']).agg({col_name: 'mean'}).reset_index()
         df_agg[col_name] *= 100
@@ -742,7 +438,7 @@ def component_kpi_section():
                     x=data['Round'],
                     y=data[col_name],
                     name=component,
-                    marker=dict(color=component_colors[component])
+                    marker=dict(color=component_colors.get(component))
                 )
             )
 
@@ -847,14 +543,14 @@ component_kpi_section()
 
 # :::::::::::::::::::::::: TABLES UTILIZED :::::::::::::::::::::::: 
 st.divider()
-with st.expander("Finance Table"):
-    st.write(RAW_FINANCE_DF)
-
-with st.expander("Supplier Table"):
-    st.write(SUPPLIER_DF)
 
-with st.expander("Component Table"):
-    st.write(COMPONENT_DF)
+@page_section('tables')
+def tables_section():
+    table_previews({
+        "Finance Table": 'finance raw',
+        "Supplier Table": 'Supplier',
+        "Component Table": 'Component',
+        "Supplier - Component Table": 'Supplier - Component',
+    }, key = 'table_preview')
 
-with st.expander("Supplier - Component Table"):
-    st.write(SUPPLIER_COMPONENT_DF)
+tables_section()
@@ -4,7 +4,11 @@ import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 
-from utils.data_loader import read_main_table_tabs
+from utils.lazy_tabs import lazy_tabs, table_previews
+from utils.fragments import page_section
+from utils.data_watcher import data_reload_notice
+from utils.round_window import round_window_selector
+from utils.data_registry import load_data, uses_data
 from utils.constants_passer import SITE_EMOJI
 
 # ::::::::::::::::: PAGE CONFIGURATION ::::::::::::::::: 
@@ -21,23 +25,20 @@ st.set_page_config(
 st.title("⚙️ Operations")
 st.divider()
 
-# ::::::::: READING THE DATAFRAME FROM data_loader.py :::::::::::
-WAREH_SALES_AREA_DF = read_main_table_tabs('Warehouse, Salesarea')
-PRODUCT_WAREH_DF = read_main_table_tabs('Product - Warehouse')
-MIXERS_DF = read_main_table_tabs('Mixers')
-BOTTLING_LINE_DF = read_main_table_tabs('Bottling line')
-PRODUCTS_DF = read_main_table_tabs('Product')
+data_reload_notice()
+round_window_selector()
 
 # :::::::::::::::::::::::::::::::::: DATA PLOTS AND TABLES :::::::::::::::::::::::::::::::::: 
 
 # :::::::::::::::: WAREHOUSING SECTION ::::::::::::::::
-def warehousing_section():
+@page_section('warehousing', data = ['Warehouse, Salesarea'])
+def warehousing_section(data):
+    WAREH_SALES_AREA_DF = data['Warehouse, Salesarea']
     
     st.subheader("Warehousing")
 
     def cube_util_plot():
-        main_df = WAREH_SALES_AREA_DF.copy()
-        main_df['Cube utilization (%)'] = main_df['Cube utilization (%)'] * 100
+        main_df = WAREH_SALES_AREA_DF.assign(**{'Cube utilization (%)': WAREH_SALES_AREA_DF['Cube utilization (%)'] * 100})
 
         fig = go.Figure()
 
@@ -71,8 +72,10 @@ def warehousing_section():
         # Show the plot
         st.plotly_chart(fig, theme="streamlit", use_container_width=True)
 
-    def plot_stock_vs_demand_bars():
-        main_df = PRODUCT_WAREH_DF.copy()
+    # Only on the overview tab, so the table is only loaded when that tab is shown
+    @uses_data('Product - Warehouse')
+    def plot_stock_vs_demand_bars(data):
+        main_df = data['Product - Warehouse']
 
         # Grouping by 'Round' and summing the values
         grouped_df = main_df.groupby('Round').agg({'Demand per week (value)': 'sum', 'Stock value': 'sum'}).reset_index()
@@ -128,11 +131,12 @@ def warehousing_section():
     # Function for plotting the gauge plot for warehouses
     def plot_cube_util_gauge(round_val, wh_name):
         
-        main_df = WAREH_SALES_AREA_DF.copy()
+        # Only the round's rows are read (see utils.data_loader.query_rounds)
+        main_df = load_data(['Warehouse, Salesarea'], rounds = [round_val])['Warehouse, Salesarea']
         
         # st.code(wh_name)
-        # Filter the DataFrame for the specified warehouse and round
-        filtered_df = main_df[(main_df['Warehouse'] == wh_name) & (main_df['Round'] == round_val)]
+        # Filter the DataFrame for the specified warehouse
+        filtered_df = main_df[main_df['Warehouse'] == wh_name]
 
         # Extract cube utilization percentage
         cube_utilization = filtered_df['Cube utilization (%)'].values[0]
@@ -190,56 +194,62 @@ def warehousing_section():
 
     tab_labels = ["Overview"] + [f"Round {round_val}" for round_val in unique_values]
 
-    tabs = st.tabs(tab_labels)
+    def warehousing_tab(tab_label):
+        if tab_label == "Overview":
+            col1, col2 = st.columns(2, gap = "small")
 
-    with tabs[0]:
-        
-        col1, col2 = st.columns(2, gap = "small")
+            with col1:
+                cube_util_plot()
 
-        with col1:
-            cube_util_plot()
+            with col2:
+                plot_stock_vs_demand_bars()
 
-        with col2:
-            plot_stock_vs_demand_bars()
+            return
 
-    for round_val, tab, in zip(unique_values, tabs[1:]):
-        
-        with tab:    
-            # Cube utilization text
-            st.markdown(
-                f"""
-                <div class="column1" style="background-color: #e9ecef; text-align: center; border-radius: 10px; padding: 0;">
-                    <div style="margin-bottom: -15px;"><h4 style = "color: black;">Cube utilization (%) |  Round {round_val}</h4></div>
-                </div>
-                """,
-                unsafe_allow_html=True
-            )
+        round_val = unique_values[tab_labels.index(tab_label) - 1]
 
-            col1, col2, col3 = st.columns(3, gap = "small")
+        # Cube utilization text
+        st.markdown(
+            f"""
+            <div class="column1" style="background-color: #e9ecef; text-align: center; border-radius: 10px; padding: 0;">
+                <div style="margin-bottom: -15px;"><h4 style = "color: black;">Cube utilization (%) |  Round {round_val}</h4></div>
+            </div>
+            """,
+            unsafe_allow_html=True
+        )
 
-            with col1:
-                plot_cube_util_gauge(round_val, 'Raw materials warehouse')
+        col1, col2, col3 = st.columns(3, gap = "small")
 
-            with col2:
-                plot_cube_util_gauge(round_val, 'Tank yard')
+        with col1:
+            plot_cube_util_gauge(round_val, 'Raw materials warehouse')
+
+        with col2:
+            plot_cube_util_gauge(round_val, 'Tank yard')
 
-            with col3:
-                plot_cube_util_gauge(round_val, 'Finished goods warehouse')
+        with col3:
+            plot_cube_util_gauge(round_val, 'Finished goods warehouse')
+
+    # Only the selected tab is built and rendered
+    lazy_tabs(tab_labels, warehousing_tab, key = 'warehousing_tab')
 
 warehousing_section()
 
 
 # :::::::::::::::: BOTTLING AND MIXING SECTION ::::::::::::::::
 
-def mixers_fillers_section():
+@page_section('mixers and fillers', data = ['Mixers', 'Bottling line'])
+def mixers_fillers_section(data):
+    MIXERS_DF = data['Mixers']
+    BOTTLING_LINE_DF = data['Bottling line']
     
     st.divider()
     st.subheader("Bottling and mixing")
 
     def plot_bottling_line_usage(round_number, bottling_line):
 
-        main_df = BOTTLING_LINE_DF.copy()
-        filtered_data = main_df[(main_df['Bottling line'] == bottling_line) & (main_df['Round'] == round_number)]
+        # Only the round's rows are read (see utils.data_loader.query_rounds)
+        main_df = load_data(['Bottling line'], rounds = [round_number])['Bottling line']
+        filtered_data = main_df[main_df['Bottling line'] == bottling_line]
 
         # st.write(filtered_data)  # Display filtered DataFrame
 
@@ -285,7 +295,7 @@ def mixers_fillers_section():
         st.plotly_chart(fig, theme="streamlit", use_container_width=True)
 
     def plot_avg_lot_size_per_round():
-        main_df = MIXERS_DF.copy()
+        main_df = MIXERS_DF
         avg_lot_size_per_round = main_df.groupby('Round')['Average lot size'].mean().reset_index()
 
         fig = go.Figure( 
@@ -327,14 +337,14 @@ def mixers_fillers_section():
         unique_values = BOTTLING_LINE_DF['Round'].unique()
         tab_labels = [f"Round {round_val}" for round_val in unique_values]
         
-        tabs = st.tabs(tab_labels)
+        def bottling_tab(round_val):
+            plot_bottling_line_usage(round_val, 'Swiss Fill 1')
+
+            if round_val == 3:
+                plot_bottling_line_usage(round_val, 'Cup Canon 1.3 TDX')
 
-        for round_val, tab, in zip(unique_values, tabs):
-            with tab:
-                plot_bottling_line_usage(round_val, 'Swiss Fill 1')
-                
-                if round_val == 3:
-                    plot_bottling_line_usage(round_val, 'Cup Canon 1.3 TDX')
+        # Only the selected round is built and rendered
+        lazy_tabs(unique_values, bottling_tab, key = 'bottling_round_tab', format_func = lambda round_val: f"Round {round_val}")
 
     with col2:
         plot_avg_lot_size_per_round()
@@ -344,17 +354,14 @@ mixers_fillers_section()
 # :::::::::::::::::::::::: TABLES UTILIZED :::::::::::::::::::::::: 
 st.divider()
 
-with st.expander("Warehouse, Salesarea Table"):
-    st.write(WAREH_SALES_AREA_DF)
-
-with st.expander("Product - Warehouse Table"):
-    st.write(PRODUCT_WAREH_DF)
-
-with st.expander("Mixers Table"):
-    st.write(MIXERS_DF)
-
-with st.expander("Bottling line Table"):
-    st.write(BOTTLING_LINE_DF)
-
-with st.expander("Product Table"):
-    st.write(PRODUCTS_DF)
\ No newline at end of file
+@page_section('tables')
+def tables_section():
+    table_previews({
+        "Warehouse, Salesarea Table": 'Warehouse, Salesarea',
+        "Product - Warehouse Table": 'Product - Warehouse',
+        "Mixers Table": 'Mixers',
+        "Bottling line Table": 'Bottling line',
+        "Product Table": 'Product',
+    }, key = 'table_preview')
+
+tables_section()
\ No newline at end of file
@@ -4,8 +4,12 @@ import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 
-from utils.data_loader import load_and_process_finance_data
-from utils.data_loader import read_main_table_tabs
+from utils.lazy_tabs import lazy_tabs, table_previews
+from utils.value_labels import add_value_labels, format_fixed, format_plain, value_annotations
+from utils.fragments import page_section
+from utils.data_watcher import data_reload_notice
+from utils.round_window import round_window_selector
+from utils.long_series import long_series_figure
 
 from utils.constants_passer import SITE_EMOJI, ROUND_COLORS, PRODUCT_COLORS, SALES_OBSOLETE_PROD, SALES_SERVICE_LEVEL
 
@@ -22,13 +26,10 @@ st.set_page_config(
 st.title("🧾 Sales")
 st.divider()
 
-# ::::::::: READING THE DATAFRAME FROM data_loader.py AND CONSTANTS :::::::::::
-RAW_FINANCE_DF = load_and_process_finance_data()[0]
+data_reload_notice()
+round_window_selector()
 
-CUSTOMERS_DF = read_main_table_tabs('Customer')
-SUPPLIERS_DF = read_main_table_tabs('Supplier')
-PRODUCT_DF = read_main_table_tabs('Product')
-CUSTOMER_PRODUCT_DF = read_main_table_tabs('Customer - Product')
+# ::::::::: DATA AND CONSTANTS :::::::::::
 
 round_colors = ROUND_COLORS
 product_colors = PRODUCT_COLORS
@@ -38,7 +39,9 @@ data_service_level = SALES_SERVICE_LEVEL
 # :::::::::::::::::::::::::::::::::: DATA PLOTS AND TABLES :::::::::::::::::::::::::::::::::: 
 
 # :::::::::::::::: IMPORTANT KPIS ::::::::::::::::
-def important_kpis_section():
+@page_section('important kpis', data = ['finance wide'])
+def important_kpis_section(data):
+    FINANCE_WIDE_DF = data['finance wide']
     
     def static_plot(data, title):
         # Create a trace for the line chart
@@ -57,27 +60,8 @@ def important_kpis_section():
             yaxis=dict(title='')
         )
 
-        # Create annotations to display values next to markers
-        annotations = []
-        for i, value in enumerate(data['values']):
-            annotations.append(
-                dict(
-                    x=data['rounds'][i],
-                    y=value,
-                    xref='x',
-                    yref='y',
-                    text=f'<b>{str(value)}</b>',
-                    showarrow=False,
-                    font=dict(
-                        size=12,
-                    ),  
-                    xanchor='center',  # Center text horizontally on marker
-                    yanchor='bottom',  # Position text above the marker
-                    yshift=10  # Adjust vertical position
-                )
-            )
-
-        layout['annotations'] = annotations
+        # Values next to the markers
+        layout['annotations'] = value_annotations(data['rounds'], data['values'], format_plain(data['values']))
 
         # Combine trace and layout to create the figure
         fig = go.Figure(
@@ -95,18 +79,11 @@ def important_kpis_section():
         st.plotly_chart(fig, theme="streamlit", use_container_width=True)
 
     def finance_plot(val, plot_title):
-        main_df = RAW_FINANCE_DF.copy().T.reset_index()
-        main_df.columns = main_df.iloc[0]
-        main_df = main_df.drop(0)
-
-        main_df = main_df[['Round', val]]
+        main_df = FINANCE_WIDE_DF[[val]].reset_index()
         main_df.columns = ['Round', val]
 
         # st.write(main_df)
 
-        main_df['Round'] = pd.to_numeric(main_df['Round'])
-        main_df[val] = pd.to_numeric(main_df[val])
-
         if val == "ROI":
             main_df[val] = main_df[val] * 100
 
@@ -123,25 +100,7 @@ def important_kpis_section():
         fig.update_traces(line=dict(width=4, color='orange'), mode='lines+markers', marker=dict(size=8, color='grey'))
 
         # Annotations with rounded values
-        annotations = []
-        for i, row in main_df.iterrows():
-            value_text = f"<b>{row[val]:.1f}</b>"  # Formatting the value to one decimal place
-            annotations.append(
-                dict(
-                    x=row['Round'],
-                    y=row[val],
-                    xref='x',
-                    yref='y',
-                    text=value_text,
-                    showarrow=False,
-                    font=dict(size=12),
-                    xanchor='center',
-                    yanchor='bottom',
-                    yshift=10
-                )
-            )
-
-        fig.update_layout(annotations=annotations)
+        add_value_labels(fig, main_df['Round'], main_df[val], format_fixed(main_df[val], 1))
 
         st.plotly_chart(fig, theme = "streamlit", use_container_width=True)
 
@@ -159,12 +118,14 @@ important_kpis_section()
 
 
 # :::::::::::::::: SERVICE LEVEL ::::::::::::::::
-def service_level_section():
+@page_section('service level', data = ['Customer'])
+def service_level_section(data):
+    CUSTOMERS_DF = data['Customer']
     st.divider() 
     st.subheader('Service Level')
 
     def section_line_plots(col_name, title):
-        main_df = CUSTOMERS_DF.copy()
+        main_df = CUSTOMERS_DF
 
         df_agg = main_df.groupby(['Customer', 'Round'], as_index = False)[col_name].sum()
 
@@ -200,7 +161,7 @@ def service_level_section():
                     )
             )
 
-        st.plotly_chart(fig, theme = "streamlit", use_container_width=True)
+        st.plotly_chart(long_series_figure(fig), theme = "streamlit", use_container_width=True)
        
     col1, col2 = st.columns(2, gap = "small")
 
@@ -215,12 +176,14 @@ def service_level_section():
 service_level_section()
 
 # :::::::::::::::: COMPONENTS ::::::::::::::::
-def components_section():
+@page_section('components', data = ['Supplier'])
+def components_section(data):
+    SUPPLIERS_DF = data['Supplier']
     st.divider()
     st.subheader('Components')
 
     def section_bar_plots(col_name, plot_name):
-        main_df = SUPPLIERS_DF.copy()
+        main_df = SUPPLIERS_DF
 
         df_agg = main_df.groupby(['Round', 'Component']).agg({col_name: 'mean'}).reset_index()
         df_agg[col_name] *= 100
@@ -237,7 +200,7 @@ def components_section():
                     y = data[col_name],
                     name = round,
                     marker = dict(
-                        color = round_colors[round]
+                        color = round_colors.get(round)
                     ),
                 )
             )
@@ -284,12 +247,14 @@ def components_section():
 components_section()
 
 # :::::::::::::::: PRODUCTS ::::::::::::::::
-def products_section():
+@page_section('products', data = ['Product'])
+def products_section(data):
+    PRODUCT_DF = data['Product']
     st.divider()
     st.subheader('Products')
 
     def product_section_bar_plots(col_name, plot_name):
-        main_df = PRODUCT_DF.copy()
+        main_df = PRODUCT_DF
 
         df_agg = main_df.groupby(['Round', 'Product']).agg({col_name: 'mean'}).reset_index()
         df_agg[col_name] *= 100
@@ -306,7 +271,7 @@ def products_section():
                     y = data[col_name],
                     name = round,
                     marker = dict(
-                        color = round_colors[round]
+                        color = round_colors.get(round)
                     ),
                 )
 
@@ -353,12 +318,15 @@ products_section()
 
 # :::::::::::::::: CUSTOMERS ::::::::::::::::
 
-def customers_section():
+@page_section('customers', data = ['Customer', 'Customer - Product'])
+def customers_section(data):
+    CUSTOMERS_DF = data['Customer']
+    CUSTOMER_PRODUCT_DF = data['Customer - Product']
     st.divider()
     st.subheader('Customers')
 
     def customer_section_bar_plots(cust_name, col_name, plot_name):
-        main_df = CUSTOMER_PRODUCT_DF.copy()
+        main_df = CUSTOMER_PRODUCT_DF
         main_df = main_df[main_df['Customer'] == cust_name]
 
         df_agg = main_df.groupby(['Customer', ' Product', 'Round']).agg({col_name: 'mean'}).reset_index()
@@ -376,7 +344,7 @@ def customers_section():
                     y = data[col_name],
                     name = round,
                     marker = dict(
-                        color = round_colors[round]
+                        color = round_colors.get(round)
                     ),
                 )
 
@@ -414,25 +382,25 @@ def customers_section():
 
     tab_labels = [f"{customer}" for customer in customers]
 
-    tabs = st.tabs(tab_labels)
+    def customer_tab(customer_name):
+        # st.write(f"customer: {customer_name}")
+        customer_section_bar_plots(customer_name,'Additional sales as a result of promotions (%)', f'Additional sales as a result of promotions (%) | {customer_name}')
 
-    for customer_name, tab in zip(customers, tabs):
-        with tab:
-            # st.write(f"customer: {customer_name}")
-            customer_section_bar_plots(customer_name,'Additional sales as a result of promotions (%)', f'Additional sales as a result of promotions (%) | {customer_name}')
+    # Only the selected customer is built and rendered
+    lazy_tabs(tab_labels, customer_tab, key = 'customer_tab')
 
 customers_section()
 
 # :::::::::::::::::::::::: TABLES UTILIZED :::::::::::::::::::::::: 
 st.divider() 
-with st.expander("Customers Table"):
-    st.write(CUSTOMERS_DF)
-
-with st.expander("Supplier Table"):
-    st.write(SUPPLIERS_DF)
 
-with st.expander("Product Table"):
-    st.write(PRODUCT_DF)
+@page_section('tables')
+def tables_section():
+    table_previews({
+        "Customers Table": 'Customer',
+        "Supplier Table": 'Supplier',
+        "Product Table": 'Product',
+        "Customer - Product Table": 'Customer - Product',
+    }, key = 'table_preview')
 
-with st.expander("Customer - Product Table"):
-    st.write(CUSTOMER_PRODUCT_DF)
+tables_section()
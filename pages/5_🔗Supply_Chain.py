@@ -5,8 +5,19 @@ import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
 
-from utils.data_loader import load_and_process_finance_data
-from utils.data_loader import read_main_table_tabs
+from utils.data_loader import FINANCE_DATA_DIR, MAIN_DATA_DIR
+from utils.data_loader import line_item_subtree
+from utils.data_registry import current_rounds, register_source
+from utils.aggregations import entity_round_cube, cube_rounds, cube_slice, entity_round_tensor, tensor_frame, tensor_rounds
+from utils.kpis import add_kpis
+from utils.round_deltas import cached_round_deltas
+from utils.figure_cache import figure_cache, plotly_chart
+from utils.fragments import page_section
+from utils.data_watcher import data_reload_notice
+from utils.round_window import round_window_selector
+from utils.lazy_tabs import table_previews
+from utils.long_series import long_series_figure
+from utils.value_labels import format_plain, value_annotations
 
 from utils.constants_passer import SITE_EMOJI, COMPONENT_COLORS, PRODUCT_COLORS, SUPPLY_CHAIN_STOCK_COMPONENTS_WEEKS_DATA, SUPPLY_CHAIN_STOCK_PRODUCT_WEEKS_DATA
 
@@ -24,13 +35,32 @@ st.set_page_config(
 st.title("🔗 Supply Chain")
 st.divider()
 
-# ::::::::: READING THE DATAFRAME FROM data_loader.py :::::::::::
-
-COMPONENT_DF = read_main_table_tabs('Component')
-PRODUCTS_DF = read_main_table_tabs('Product')
-FINANCE_DF = load_and_process_finance_data()[0]
+data_reload_notice()
+round_window_selector()
 
-ROUND_TEXT = ['-2', '-1', '0', '1', '2', '3', '4', '5', '6']
+# ::::::::: READING THE DATAFRAME FROM data_loader.py :::::::::::
+# Every measure summed per (component | product, round), with round totals and shares, computed once per data version
+# and cut to the round window
+register_source('component cube', lambda data: cube_rounds(entity_round_cube('Component', 'Component'), current_rounds()), needs = ['Component'])
+register_source('product cube', lambda data: cube_rounds(entity_round_cube('Product', 'Product'), current_rounds()), needs = ['Product'])
+
+# FOR THE COMPONENT TABLE: (component x measure x round) sums, one tab per component in the data
+COMPONENT_TABLE_MEASURES = [
+    'Order lines previous round',
+    'Purchase value previous round',
+    'Transport costs previous round',
+    'Purchase price',
+    'Order size',
+    'Stock (weeks)',
+    'Stock value',
+    'Component availability (%)',
+    'Bias',
+]
+register_source(
+    'component tensor',
+    lambda data: tensor_rounds(entity_round_tensor('Component', 'Component', COMPONENT_TABLE_MEASURES, decimals = 2), current_rounds()),
+    needs = ['Component']
+)
 
 component_colors = COMPONENT_COLORS
 product_colors = PRODUCT_COLORS
@@ -40,20 +70,19 @@ stock_product_weeks_data = SUPPLY_CHAIN_STOCK_PRODUCT_WEEKS_DATA
 # :::::::::::::::::::::::::::::::::: DATA PLOTS AND TABLES :::::::::::::::::::::::::::::::::: 
 
 # :::::::::::::::: FINANCES ::::::::::::::::
-def finances_section():
+@page_section('finances', data = ['finance wide', 'finance line items', 'component cube', 'product cube'])
+def finances_section(data):
+    FINANCE_WIDE_DF = data['finance wide']
+    FINANCE_LINE_ITEMS = data['finance line items']
+    COMPONENT_CUBE = data['component cube']
+    PRODUCT_CUBE = data['product cube']
     
+    @figure_cache(FINANCE_DATA_DIR)
     def investment_expenses_plot(keyword):
-        main_df = FINANCE_DF.copy().T.reset_index()
-        main_df.columns = main_df.iloc[0]   # Setting the first row as column names
-        main_df = main_df.drop(0)           # Drop the first two rows
-        
-        # Filter duplicate columns based on the first occurrence
-        main_df = main_df.loc[:, ~main_df.columns.duplicated()]
+        # The keyword line item and all of its sub items
+        positions, _ = line_item_subtree(FINANCE_LINE_ITEMS, keyword)
 
-        selected_cols = [col for col in main_df.columns if keyword in col]
-
-        # Filter the DataFrame to get columns associated with the keyword
-        keyword_data = main_df[selected_cols]
+        keyword_data = FINANCE_WIDE_DF.iloc[:, positions]
         # Remove 'Investment - Investment - Fixed' from the keyword_data DataFrame
         keyword_data = keyword_data.drop(columns=['Investment - Investment - Fixed'])
 
@@ -61,7 +90,7 @@ def finances_section():
         keyword_data_for_viz = keyword_data.drop(columns=['Investment'])
 
         # Calculate percentage contribution of each investment type to the total investment
-        total_investment = keyword_data['Investment'].values.astype(float)
+        total_investment = keyword_data['Investment'].values
         percentage_data = keyword_data_for_viz.div(total_investment, axis=0) * 100
 
         # Extracting legend labels based on the characters after the last '-' character
@@ -86,7 +115,7 @@ def finances_section():
          
         fig.update_xaxes(
             tickvals=percentage_data.index, 
-            ticktext=ROUND_TEXT
+            ticktext=[str(round_number) for round_number in percentage_data.index]
         )
 
         fig.update_layout(
@@ -113,23 +142,18 @@ def finances_section():
                 )
         )
 
-        st.plotly_chart(fig, theme = "streamlit", use_container_width=True)
+        return fig
 
+    @figure_cache((MAIN_DATA_DIR, 'Component'), (MAIN_DATA_DIR, 'Product'))
     def stock_value_components_vs_products_plot():
         
-        main_df = COMPONENT_DF.copy()
-        main_df_2 = PRODUCTS_DF.copy()
-
-        round_values = main_df['Round'].tolist()
-        round_values = sorted(list(set(round_values)))
+        round_values = COMPONENT_CUBE['round_total'].index.tolist()
         # st.write(round_values)
 
-        df_agg = main_df.groupby(['Component', 'Round'], as_index = False)['Stock value'].sum()
-        df_agg = df_agg.groupby(['Round'], as_index = False)['Stock value'].sum()
+        df_agg = COMPONENT_CUBE['round_total'][['Stock value']].reset_index()
         df_agg['Category'] = 'Component' 
 
-        df_agg_2 = main_df_2.groupby(['Product', 'Round'], as_index = False)['Stock value'].sum()
-        df_agg_2 = df_agg_2.groupby(['Round'], as_index = False)['Stock value'].sum()
+        df_agg_2 = PRODUCT_CUBE['round_total'][['Stock value']].reset_index()
         df_agg_2['Category'] = 'Product' 
 
         combined_df = pd.concat([df_agg, df_agg_2], ignore_index=True)
@@ -194,15 +218,15 @@ def finances_section():
                 )
         )
 
-        st.plotly_chart(fig, theme = "streamlit", use_container_width=True)
+        return fig
     
     col1, col2 = st.columns(2, gap = "small")
 
     with col1:
-        investment_expenses_plot('Investment')
+        plotly_chart(investment_expenses_plot('Investment'), use_container_width=True)
         
     with col2:
-        stock_value_components_vs_products_plot()
+        plotly_chart(stock_value_components_vs_products_plot(), use_container_width=True)
 
 
 st.subheader("Finances")
@@ -214,24 +238,15 @@ st.divider()
 
 # :::::::::::::::: COMPONENTS ::::::::::::::::
 
-def components_section():
+@page_section('components', data = ['component cube'])
+def components_section(data):
+    COMPONENT_CUBE = data['component cube']
     
+    @figure_cache((MAIN_DATA_DIR, 'Component'))
     def stock_value_components():
-        main_df = COMPONENT_DF.copy()
-
-    
-        df_agg = main_df.groupby(['Component', 'Round'], as_index = False)['Stock value'].sum()
-        df_agg['Color'] = df_agg['Component'].map(lambda x: component_colors.get(x))
-        # st.write(df_agg)
-
-        raw_total_per_round = main_df.groupby(['Round'], as_index = False)['Stock value'].sum()
-        # st.write(raw_total_per_round)
-
-        # Merge the DataFrames on the 'Round' column
-        merged_df = df_agg.merge(raw_total_per_round, on='Round', suffixes=('_component', '_total'))
-
-        # Calculate the percentage
-        merged_df['Stock value %'] = (merged_df['Stock value_component'] / merged_df['Stock value_total']) * 100
+        # Stock value of each component as a percentage of the round's total
+        merged_df = cube_slice(COMPONENT_CUBE, ['Stock value'], view = 'share')
+        merged_df.columns = ['Component', 'Round', 'Stock value %']
 
         # Display the resulting DataFrame
         # st.write(merged_df)
@@ -245,7 +260,7 @@ def components_section():
                     # stackgroup='zero',  # Adding stackgroup for stacking the areas
                     fill='tozeroy',   # Filling the area to the x-axis
                     name=component,
-                    line=dict(color=component_colors[component])
+                    line=dict(color=component_colors.get(component))
                 )
             )
 
@@ -265,8 +280,9 @@ def components_section():
                 showlegend=True
         )
 
-        st.plotly_chart(fig, theme = "streamlit", use_container_width=True)
+        return fig
 
+    @figure_cache()
     def stock_components_weeks():
         
         data = stock_components_weeks_data
@@ -287,27 +303,8 @@ def components_section():
             yaxis=dict(title='Values')
         )
 
-        # Create annotations to display values next to markers
-        annotations = []
-        for i, value in enumerate(data['values']):
-            annotations.append(
-                dict(
-                    x=data['rounds'][i],
-                    y=value,
-                    xref='x',
-                    yref='y',
-                    text=f'<b>{str(value)}</b>',
-                    showarrow=False,
-                    font=dict(
-                        size=12,
-                    ),  
-                    xanchor='center',  # Center text horizontally on marker
-                    yanchor='bottom',  # Position text above the marker
-                    yshift=10  # Adjust vertical position
-                )
-            )
-
-        layout['annotations'] = annotations
+        # Values next to the markers
+        layout['annotations'] = value_annotations(data['rounds'], data['values'], format_plain(data['values']))
 
         # Combine trace and layout to create the figure
         fig = go.Figure(
@@ -320,13 +317,10 @@ def components_section():
             marker=dict(size=8, color = 'grey')
         )
 
-        st.plotly_chart(fig, theme="streamlit", use_container_width=True)
+        return fig
 
     def line_plot():
-        main_df = COMPONENT_DF.copy()
-
-        df_agg = main_df.groupby(['Component', 'Round'], as_index = False)['Stock value'].sum()
-        df_agg['Color'] = df_agg['Component'].map(lambda x: component_colors.get(x))
+        df_agg = cube_slice(COMPONENT_CUBE, ['Stock value'])
 
         # sum_stock_weeks = df_agg.groupby(['Round'])
 
@@ -340,8 +334,8 @@ def components_section():
                     y=data['Stock value'],
                     mode='lines+markers',  # To display both lines and markers
                     name=component,
-                    line=dict(color=component_colors[component], width = 4),
-                    marker=dict(color=component_colors[component], size = 8)
+                    line=dict(color=component_colors.get(component), width = 4),
+                    marker=dict(color=component_colors.get(component), size = 8)
                 )
             )
 
@@ -366,16 +360,12 @@ def components_section():
             textfont=dict(size=13)
         )
 
-        st.plotly_chart(fig, theme="streamlit", use_container_width=True)
+        st.plotly_chart(long_series_figure(fig), theme="streamlit", use_container_width=True)
 
+    @figure_cache((MAIN_DATA_DIR, 'Component'))
     def combined_plot():
-        main_df = COMPONENT_DF.copy()
-
-        df_agg_bar = main_df.groupby(['Component', 'Round'], as_index=False)['Stock (weeks)'].sum()
-        df_agg_bar['Color'] = df_agg_bar['Component'].map(lambda x: component_colors.get(x))
-
-        df_agg_line = main_df.groupby(['Component', 'Round'], as_index=False)['Stock value'].sum()
-        df_agg_line['Color'] = df_agg_line['Component'].map(lambda x: component_colors.get(x))
+        df_agg_bar = cube_slice(COMPONENT_CUBE, ['Stock (weeks)'])
+        df_agg_line = cube_slice(COMPONENT_CUBE, ['Stock value'])
 
         # Create the grouped bar plot
         fig = go.Figure()
@@ -384,7 +374,7 @@ def components_section():
                 x=data['Round'],
                 y=data['Stock (weeks)'],
                 name=component,
-                marker=dict(color=component_colors[component]),
+                marker=dict(color=component_colors.get(component)),
                 text=data['Stock (weeks)'],
                 # textposition='inside',
                 texttemplate='<b>%{y:.3s}</b>',
@@ -410,7 +400,7 @@ def components_section():
                 mode='lines+markers',
                 name=component,
                 line=dict(
-                    color=component_colors[component], 
+                    color=component_colors.get(component), 
                     width=4),
                 marker=dict(
                     color='#4a4e69', 
@@ -438,13 +428,11 @@ def components_section():
             yaxis2=dict(title='Stock value', side='right', overlaying='y', showgrid=False),  # Secondary y-axis for line chart
         )
 
-        st.plotly_chart(fig, theme="streamlit", use_container_width=True)
+        return fig
 
+    @figure_cache((MAIN_DATA_DIR, 'Component'))
     def avg_cost_of_delivery_plot():
-        main_df = COMPONENT_DF.copy()
-
-        trans_df = main_df.groupby(['Component', 'Round'], as_index = False)[['Transport costs previous round', 'Order lines previous round']].sum()
-        trans_df['Delivery cost'] = trans_df['Transport costs previous round'] / trans_df['Order lines previous round']
+        trans_df = add_kpis(cube_slice(COMPONENT_CUBE, ['Transport costs previous round', 'Order lines previous round']), ['Delivery cost'])
 
         # st.write(trans_df)
         color_map = {component: component_colors.get(component, '#000000') for component in trans_df['Component'].unique()}
@@ -466,149 +454,95 @@ def components_section():
         )
 
 
-        st.plotly_chart(fig, theme="streamlit", use_container_width=True)
-
-    def component_table_section():
-        def component_info_table(component):
-            
-            SELECTED_THRESHOLD = slider_threshold
-            main_df = COMPONENT_DF.copy()
-            main_df = main_df.round(2)
-
-            # st.write(main_df)
-
-            df_agg = main_df.groupby(['Component', 'Round'], as_index = False)[[
-                'Order lines previous round',
-                'Purchase value previous round',
-                'Transport costs previous round',
-                'Purchase price',
-                'Order size',
-                'Stock (weeks)',
-                'Stock value',
-                'Component availability (%)',
-                'Bias']].sum()
-            
-            component_df = df_agg.loc[df_agg['Component'] == component].T.reset_index()
-            component_df = component_df.drop(0) 
-            component_df.columns = component_df.iloc[0]
-            component_df = component_df.drop(1)
-
-            # Get the length of the DataFrame
-            num_rows = len(component_df)
-
-            # Replace all values in 'Round' column except for the last row
-            component_df.loc[:num_rows, 'Round'] = '(\u2193) ' + component_df.loc[:num_rows, 'Round']
-            component_df['Round'] = component_df['Round'].replace(['Bias'], '(\u2191\u2193) Bias')
+        return fig
 
-            numeric_columns = component_df.columns[1:]
-            component_df[numeric_columns] = component_df[numeric_columns].astype(float)
-
-            def change_color(value, previous_value):
-                if pd.isnull(previous_value) or not isinstance(value, (int, float)):
-                    return ''
-
-                try:
-                    value = float(value)
-                    previous_value = float(previous_value)
-
-                    if previous_value == 0:
-                        return 'background-color: rgba(0, 255, 0, 0.4)'
-
-                    percentage = ((value - previous_value) / previous_value) * 100
-
-                    if percentage > SELECTED_THRESHOLD:
-                        return 'background-color: rgba(255, 77, 109, 0.4)'  # Red color
-                    elif percentage < -SELECTED_THRESHOLD:
-                        return 'background-color: rgba(0, 255, 0, 0.4)'  # Green color
-
-                # st.write(f"Percentage: `{percentage}` | Value: `{value}` | Previous value: `{previous_value}`")
-                except ValueError:
-                    pass  # Handles non-convertible values without causing an error
-
-                return ''
+    col1, col2 = st.columns(2, gap = "small")
 
-            
-            styler = component_df.style.apply(
-                lambda row: [
-                    change_color(value, previous) for value, previous in zip(row, row.shift(1))
-                ], 
-                axis=1
-            )
+    with col1:
+        plotly_chart(stock_components_weeks(), use_container_width=True)
+        pass
 
-            st.dataframe(
-                styler.format({-2: '{:.10}', -1: '{:.10}', 0: '{:.10}', 1: '{:.10}', 2: '{:.10}', 3: '{:.10}'}),
-                use_container_width=True
-            ) 
-
-        tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8, tab9 = st.tabs([
-            'Orange',
-            'Mango',
-            'PET',
-            'Pack 1L',
-            'Vitamin C',
-            'Açaí',
-            'Bag',
-            'Capsule (orange)',
-            'Capsule (red)'
-        ])
+    with col2:
+        plotly_chart(stock_value_components(), use_container_width=True)
 
-        slider_threshold = st.select_slider(
-            'Select a threshold',
-            options = [5, 15, 25, 35, 45, 55, 65, 75, 85, 95],
-            value = 15
-        )
+    plotly_chart(combined_plot(), use_container_width=True)
+    plotly_chart(avg_cost_of_delivery_plot(), use_container_width=True)
 
-        with tab1:
-            component_info_table('Orange') 
+# The threshold slider lives here, so the table has a section (and a timing) of its own
+@page_section('component table', data = ['component tensor'])
+def component_table_section(data):
+    COMPONENT_TENSOR = data['component tensor']
 
-        with tab2:
-            component_info_table('Mango')
+    # All components at once, (Component, measure) x Round; the colours of every tab are computed from it
+    # in one go and kept per threshold. It has every round, so the first round of the window is still compared
+    # with the round before it.
+    def component_round_table(sheets):
+        return tensor_frame(entity_round_tensor('Component', 'Component', COMPONENT_TABLE_MEASURES, decimals = 2))
 
-        with tab3:
-            component_info_table('PET')
+    def component_info_table(component):
         
-        with tab4:
-            component_info_table('Pack 1L')
-
-        with tab5:
-            component_info_table('Vitamin C') 
-
-        with tab6:
-            component_info_table('Açaí')
+        SELECTED_THRESHOLD = slider_threshold
+
+        # The component's measure x round slice of the tensor (no copy), from the first to the last round it has
+        # data for, with the measure names in front
+        component_values = COMPONENT_TENSOR['values'][COMPONENT_TENSOR['entities'].index(component)]
+        rounds_with_data = np.flatnonzero(~np.isnan(component_values).all(axis = 0))
+        if len(rounds_with_data) == 0:
+            st.write(f"No data for {component} in the selected rounds")
+            return
+        round_span = slice(rounds_with_data[0], rounds_with_data[-1] + 1)
+        component_rounds = COMPONENT_TENSOR['rounds'][round_span]
+
+        component_df = pd.DataFrame(
+            component_values[:, round_span],
+            index = pd.RangeIndex(2, 2 + len(COMPONENT_TABLE_MEASURES)),  # Row numbers as the table always showed them
+            columns = component_rounds,
+            copy = False,
+        )
+        component_df.insert(0, 'Round', [
+            '(\u2191\u2193) Bias' if measure == 'Bias' else '(\u2193) ' + measure for measure in COMPONENT_TABLE_MEASURES
+        ])
 
-        with tab7:
-            component_info_table('Bag')
+        # Red when a measure went up more than the threshold since the previous round, green when it went down
+        delta_css = cached_round_deltas(MAIN_DATA_DIR, 'component table', component_round_table, SELECTED_THRESHOLD)
 
-        with tab8:
-            component_info_table('Capsule (orange)')
-        
-        with tab9:
-            component_info_table('Capsule (red)')
+        cell_css = pd.DataFrame('', index = component_df.index, columns = component_df.columns)
+        cell_css[component_rounds] = delta_css.loc[component, component_rounds].to_numpy()
 
+        styler = component_df.style.apply(lambda _: cell_css, axis = None)
 
-    col1, col2 = st.columns(2, gap = "small")
+        st.dataframe(
+            styler.format({-2: '{:.10}', -1: '{:.10}', 0: '{:.10}', 1: '{:.10}', 2: '{:.10}', 3: '{:.10}'}),
+            use_container_width=True
+        ) 
 
-    with col1:
-        stock_components_weeks()
-        pass
+    components = COMPONENT_TENSOR['entities']
+    tabs = st.tabs(components)
 
-    with col2:
-        stock_value_components()
+    slider_threshold = st.select_slider(
+        'Select a threshold',
+        options = [5, 15, 25, 35, 45, 55, 65, 75, 85, 95],
+        value = 15
+    )
 
-    combined_plot()
-    avg_cost_of_delivery_plot()
-    component_table_section()
+    for component, tab in zip(components, tabs):
+        with tab:
+            component_info_table(component)
 
 st.subheader("Components")
 with st.expander("Components Section"):    
     components_section()
+    component_table_section()
 
 st.divider()
 
 # :::::::::::::::: PRODUCTION ::::::::::::::::
 
-def production_section():
+@page_section('production', data = ['product cube'])
+def production_section(data):
+    PRODUCT_CUBE = data['product cube']
 
+    @figure_cache()
     def stock_products_weeks():
         
         data = stock_product_weeks_data
@@ -629,27 +563,8 @@ def production_section():
             yaxis=dict(title='Values')
         )
 
-        # Create annotations to display values next to markers
-        annotations = []
-        for i, value in enumerate(data['values']):
-            annotations.append(
-                dict(
-                    x=data['rounds'][i],
-                    y=value,
-                    xref='x',
-                    yref='y',
-                    text=f'<b>{str(value)}</b>',
-                    showarrow=False,
-                    font=dict(
-                        size=12,
-                    ),  
-                    xanchor='center',  # Center text horizontally on marker
-                    yanchor='bottom',  # Position text above the marker
-                    yshift=10  # Adjust vertical position
-                )
-            )
-
-        layout['annotations'] = annotations
+        # Values next to the markers
+        layout['annotations'] = value_annotations(data['rounds'], data['values'], format_plain(data['values']))
 
         # Combine trace and layout to create the figure
         fig = go.Figure(
@@ -662,21 +577,13 @@ def production_section():
             marker=dict(size=8, color = 'grey')
         )
 
-        st.plotly_chart(fig, theme="streamlit", use_container_width=True)
+        return fig
 
+    @figure_cache((MAIN_DATA_DIR, 'Product'))
     def stock_value_products():
-        main_df = PRODUCTS_DF.copy()
-
-        df_agg = main_df.groupby(['Product', 'Round'], as_index = False)['Stock value'].sum()
-        df_agg['Color'] = df_agg['Product'].map(lambda x: product_colors.get(x))
-
-        raw_total_per_round = main_df.groupby(['Round'], as_index = False)['Stock value'].sum()
-        # st.write(raw_total_per_round)
-
-        merged_df = df_agg.merge(raw_total_per_round, on='Round', suffixes=('_product', '_total'))
-
-        # Calculate the percentage
-        merged_df['Stock value %'] = (merged_df['Stock value_product'] / merged_df['Stock value_total']) * 100
+        # Stock value of each product as a percentage of the round's total
+        merged_df = cube_slice(PRODUCT_CUBE, ['Stock value'], view = 'share')
+        merged_df.columns = ['Product', 'Round', 'Stock value %']
 
         # st.write(merged_df)
 
@@ -689,7 +596,7 @@ def production_section():
                     # stackgroup='zero',  # Adding stackgroup for stacking the areas
                     fill='tozeroy',   # Filling the area to the x-axis
                     name=product,
-                    line=dict(color=product_colors[product])
+                    line=dict(color=product_colors.get(product))
                 )
             )
 
@@ -711,17 +618,14 @@ def production_section():
                 showlegend=True
         )
 
-        st.plotly_chart(fig, theme = "streamlit", use_container_width=True)
+        return fig
 
+    @figure_cache((MAIN_DATA_DIR, 'Product'))
     def combined_plot_2():
-        main_df = PRODUCTS_DF.copy()
-
-        df_agg_bar = main_df.groupby(['Product', 'Round'], as_index = False)['Production plan adherence (%)'].sum()
+        df_agg_bar = cube_slice(PRODUCT_CUBE, ['Production plan adherence (%)'])
         df_agg_bar['Production plan adherence (%)'] *= 100
-        df_agg_bar['Color'] = df_agg_bar['Product'].map(lambda x: product_colors.get(x))
 
-        df_agg_line = main_df.groupby(['Product', 'Round'], as_index = False)['Production batches previous round'].sum()
-        df_agg_line['Color'] = df_agg_line['Product'].map(lambda x: product_colors.get(x))
+        df_agg_line = cube_slice(PRODUCT_CUBE, ['Production batches previous round'])
 
 
         # Grouped Bar plot
@@ -731,7 +635,7 @@ def production_section():
                     x=data['Round'],
                     y=data['Production plan adherence (%)'],
                     name=product,
-                    marker=dict(color=product_colors[product])
+                    marker=dict(color=product_colors.get(product))
                 )
             )
 
@@ -753,7 +657,7 @@ def production_section():
                     mode='lines+markers',  # To display both lines and markers
                     name=product,
                     line=dict(
-                        color=product_colors[product], 
+                        color=product_colors.get(product), 
                         width = 4),
                     marker=dict(
                         color='#4a4e69', 
@@ -782,13 +686,11 @@ def production_section():
             yaxis2=dict(title='Product batches previous round', side='right', overlaying='y', showgrid=False), 
         )
 
-        st.plotly_chart(fig, theme="streamlit", use_container_width=True)
+        return fig
 
+    @figure_cache((MAIN_DATA_DIR, 'Product'))
     def gross_margin_week_plot():
-        main_df = PRODUCTS_DF.copy()
-
-        df_agg = main_df.groupby(['Product', 'Round'], as_index = False)['Gross margin per week'].sum()
-        df_agg['Color'] = df_agg['Product'].map(lambda x: product_colors.get(x))
+        df_agg = cube_slice(PRODUCT_CUBE, ['Gross margin per week'])
 
         fig = go.Figure()
         for product, data in df_agg.groupby('Product'):
@@ -797,7 +699,7 @@ def production_section():
                     y=data['Gross margin per week'],
                     mode='lines+markers', 
                     name=product,
-                    line=dict(color=product_colors[product], width = 4),
+                    line=dict(color=product_colors.get(product), width = 4),
                     marker=dict(color='#4a4e69', size = 8)
                 )
             )
@@ -823,13 +725,11 @@ def production_section():
             textfont=dict(size=13)
         )
 
-        st.plotly_chart(fig, theme="streamlit", use_container_width=True)
+        return long_series_figure(fig)
 
+    @figure_cache((MAIN_DATA_DIR, 'Product'))
     def obsoletes_per_week_plot():
-        main_df = PRODUCTS_DF.copy()
-
-        df_agg = main_df.groupby(['Product', 'Round'], as_index = False)['Obsoletes per week (value)'].sum()
-        df_agg['Color'] = df_agg['Product'].map(lambda x: product_colors.get(x))
+        df_agg = cube_slice(PRODUCT_CUBE, ['Obsoletes per week (value)'])
 
         fig = go.Figure()
         for product, data in df_agg.groupby('Product'):
@@ -837,7 +737,7 @@ def production_section():
                     x=data['Round'],
                     y=data['Obsoletes per week (value)'],
                     name=product,
-                    marker=dict(color=product_colors[product])
+                    marker=dict(color=product_colors.get(product))
                 )
             )
 
@@ -868,13 +768,11 @@ def production_section():
                 )
         )
 
-        st.plotly_chart(fig, theme="streamlit", use_container_width=True)
+        return fig
 
+    @figure_cache((MAIN_DATA_DIR, 'Product'))
     def demand_units_per_orderline_plot():
-        main_df = PRODUCTS_DF.copy()
-
-        df_agg = main_df.groupby(['Product', 'Round'], as_index = False)[['Demand per week (units)', 'Order lines per week']].sum()
-        df_agg['Demand units per orderline'] = df_agg['Demand per week (units)'] / df_agg['Order lines per week']
+        df_agg = add_kpis(cube_slice(PRODUCT_CUBE, ['Demand per week (units)', 'Order lines per week']), ['Demand units per orderline'])
         df_agg['Color'] = df_agg['Product'].map(lambda x: product_colors.get(x))
 
         fig = go.Figure(
@@ -901,20 +799,20 @@ def production_section():
                 )
         )
 
-        st.plotly_chart(fig, theme="streamlit", use_container_width=True)
+        return fig
 
     col1, col2 = st.columns(2, gap = "small")
 
     with col1:
-        stock_products_weeks()
+        plotly_chart(stock_products_weeks(), use_container_width=True)
     
     with col2:
-        stock_value_products()
+        plotly_chart(stock_value_products(), use_container_width=True)
 
-    combined_plot_2()
-    gross_margin_week_plot()
-    obsoletes_per_week_plot()
-    demand_units_per_orderline_plot()
+    plotly_chart(combined_plot_2(), use_container_width=True)
+    plotly_chart(gross_margin_week_plot(), use_container_width=True)
+    plotly_chart(obsoletes_per_week_plot(), use_container_width=True)
+    plotly_chart(demand_units_per_orderline_plot(), use_container_width=True)
 
 st.subheader("Production")
 with st.expander("Production Section"):    
@@ -924,11 +822,12 @@ st.divider()
 
 # :::::::::::::::: TABLES UTILIZED ::::::::::::::::
 
-with st.expander("Component Table"):
-    st.write(COMPONENT_DF)
-
-with st.expander("Product Table"):
-    st.write(PRODUCTS_DF)
+@page_section('tables')
+def tables_section():
+    table_previews({
+        "Component Table": 'Component',
+        "Product Table": 'Product',
+        "Finances Table": 'finance raw',
+    }, key = 'table_preview')
 
-with st.expander("Finances Table"):
-    st.write(FINANCE_DF)
\ No newline at end of file
+tables_section()
\ No newline at end of file
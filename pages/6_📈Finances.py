@@ -4,7 +4,13 @@ import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 
-from utils.data_loader import load_and_process_finance_data
+from utils.data_loader import find_line_item, line_item_subtree
+from utils.data_registry import uses_data
+from utils.fragments import page_section
+from utils.data_watcher import data_reload_notice
+from utils.round_window import round_window_selector
+from utils.lazy_tabs import table_previews
+from utils.long_series import long_series_figure
 from utils.constants_passer import ROUND_VALUES, SITE_EMOJI
 
 # ::::::::::::::::: PAGE CONFIGURATION ::::::::::::::::: 
@@ -21,30 +27,27 @@ st.set_page_config(
 st.title("📈 Finances")
 st.divider()
 
-# ::::::::: READING THE DATAFRAME FROM data_loader.py :::::::::::
-
-FINANCE_DF = load_and_process_finance_data()[0]
+data_reload_notice()
+round_window_selector()
 
+# ::::::::: READING THE DATAFRAME FROM data_loader.py :::::::::::
 ROUND_VALUES = ROUND_VALUES
 
 # :::::::::::::::::::::::::::::::::: DATA PLOTS AND TABLES :::::::::::::::::::::::::::::::::: 
 
 # :::::::::::::::: HELPER FUNCTIONS :::::::::::::::: 
 
-def plot_data(val_1, val_2):
-    main_df = FINANCE_DF.copy().T.reset_index()
-    main_df.columns = main_df.iloc[0]  # Set the first row as column names
-    main_df = main_df.drop(0)  # Drop the first row
+@uses_data('finance wide', 'finance line items')
+def plot_data(data, val_1, val_2):
+    FINANCE_WIDE_DF = data['finance wide']
+    FINANCE_LINE_ITEMS = data['finance line items']
+    # Every revenue line item below val_1, plus the val_2 line item
+    positions, labels = line_item_subtree(FINANCE_LINE_ITEMS, f'Realized revenue - {val_1}')
+    val_2_position, val_2_label = find_line_item(FINANCE_LINE_ITEMS, val_2)
 
-    selected_columns = [col for col in main_df.columns if val_1 in col]
-    selected_columns += [val_2]  # Include the additional column
+    main_df = FINANCE_WIDE_DF.iloc[:, positions + [val_2_position]].reset_index()  # Select 'Round' and the specified columns
 
-    main_df = main_df[['Round'] + selected_columns]  # Select 'Round' and the specified columns
-
-    main_df.columns = ['Round'] + [col.split(' - ')[-1] for col in selected_columns]  # Rename columns for clarity
-
-    for col in main_df.columns[1:]:
-        main_df[col] = pd.to_numeric(main_df[col])
+    main_df.columns = ['Round'] + labels + [val_2_label]  # Rename columns for clarity
 
     fig = px.line(
         main_df,
@@ -76,26 +79,18 @@ def plot_data(val_1, val_2):
 
 
 
-    st.plotly_chart(fig, theme = "streamlit", use_container_width=True)
+    st.plotly_chart(long_series_figure(fig), theme = "streamlit", use_container_width=True)
 
-def plot_data_2(val):
-    main_df = FINANCE_DF.copy().T.reset_index()
-    main_df.columns = main_df.iloc[0]  # Set the first row as column names
-    main_df = main_df.drop(0)  # Drop the first two rows
-
-
-    main_df = main_df[['Round', val]]  # Select the 'Round' and the specified value column
+@uses_data('finance wide')
+def plot_data_2(data, val):
+    FINANCE_WIDE_DF = data['finance wide']
+    main_df = FINANCE_WIDE_DF[[val]].reset_index()  # Select the 'Round' and the specified value column
     main_df.columns = ['Round', val]   # Rename the columns for clarity
 
     # st.write(main_df)
 
-    main_df['Round'] = pd.to_numeric(main_df['Round'])
-    main_df[val] = pd.to_numeric(main_df[val])
-
-    # st.write(main_df)
-
     if val == "ROI":
-        main_df[val] = pd.to_numeric(main_df[val])*100
+        main_df[val] = main_df[val] * 100
 
     # Generate a random color sequence
     # color_palette = random.sample(px.colors.qualitative.Plotly, 4)
@@ -117,12 +112,12 @@ def plot_data_2(val):
         line=dict(width=4, color = 'orange'), 
         mode='lines+markers', marker=dict(size=8, color = 'grey'))
 
-    st.plotly_chart(fig, theme = "streamlit", use_container_width=True)
+    st.plotly_chart(long_series_figure(fig), theme = "streamlit", use_container_width=True)
 
-def plot_data_bar(val):
-    main_df = FINANCE_DF.copy().T.reset_index()
-    main_df.columns = main_df.iloc[0]  # Set the first row as column names
-    main_df = main_df.drop(0)  # Drop the first row
+@uses_data('finance wide')
+def plot_data_bar(data, val):
+    FINANCE_WIDE_DF = data['finance wide']
+    main_df = FINANCE_WIDE_DF[['Gross margin - Cost of goods sold - Purchase value']].reset_index()
 
     # Replace spaces and special characters in column names for easy plotting
     main_df.columns = main_df.columns.str.replace(' ', '_').str.replace('-', '_')
@@ -130,10 +125,10 @@ def plot_data_bar(val):
     # Plotting the Gross margin - Cost of goods sold - Purchase value across rounds
     fig = px.bar(
         main_df, 
-        x=main_df.index, 
+        x='Round', 
         y='Gross_margin___Cost_of_goods_sold___Purchase_value',
         title='Gross Margin - COGS - Purchase Value across Rounds',
-        labels={'index': 'Round', 'Gross_margin___Cost_of_goods_sold___Purchase_value': 'Value'}
+        labels={'Gross_margin___Cost_of_goods_sold___Purchase_value': 'Value'}
     )
 
     fig.update_layout(xaxis_title='Round', yaxis_title='Value')
@@ -163,23 +158,16 @@ def plot_data_h_bar(data, name):
     fig.update_layout(yaxis={'categoryorder': 'total ascending'}, xaxis_title='Value')
     st.plotly_chart(fig, theme = "streamlit", use_container_width=True)
 
-def plot_op_prof(keyword):
-
-    main_df = FINANCE_DF.copy().transpose()
-    main_df.columns = main_df.iloc[0]
-    main_df = main_df.drop(main_df.index[0])
-    
-    # Filter duplicate columns based on the first occurrence
-    main_df = main_df.loc[:, ~main_df.columns.duplicated()]
-
-    selected_cols = [col for col in main_df.columns if keyword in col]
+# `label` is the name in the chart title (by default the line item itself)
+@uses_data('finance wide', 'finance line items')
+def plot_op_prof(data, keyword, label = None):
+    FINANCE_WIDE_DF = data['finance wide']
+    FINANCE_LINE_ITEMS = data['finance line items']
 
-    # st.write(selected_cols)
-    # Filter the DataFrame to get columns associated with the keyword
-    keyword_data = main_df[selected_cols]
+    # The indirect cost item and all of its sub items, with the last part of their names as legend labels
+    positions, legend_labels = line_item_subtree(FINANCE_LINE_ITEMS, f'Operating profit - Indirect cost - {keyword}')
 
-    # Extracting legend labels based on the characters after the last '-' character
-    legend_labels = [col.split(' - ')[-1] for col in keyword_data.columns]
+    keyword_data = FINANCE_WIDE_DF.iloc[:, positions]
 
     # Create a Plotly figure
     fig = go.Figure()
@@ -201,7 +189,7 @@ def plot_op_prof(keyword):
     fig.update_layout(
         xaxis_title='Round',
         yaxis_title='Operating Profit',
-        title=f'Operating Profit for {keyword}',
+        title=f'Operating Profit for {label or keyword}',
         legend=dict(
             orientation='h',
             yanchor='top',
@@ -211,25 +199,17 @@ def plot_op_prof(keyword):
         )
     )
 
-    st.plotly_chart(fig, theme = "streamlit", use_container_width=True)
+    st.plotly_chart(long_series_figure(fig), theme = "streamlit", use_container_width=True)
 
-def plot_invest(keyword):
+@uses_data('finance wide', 'finance line items')
+def plot_invest(data, keyword):
+    FINANCE_WIDE_DF = data['finance wide']
+    FINANCE_LINE_ITEMS = data['finance line items']
     
-    main_df = FINANCE_DF.copy().transpose()
-    main_df.columns = main_df.iloc[0]
-    main_df = main_df.drop(main_df.index[0])
-    
-    # Filter duplicate columns based on the first occurrence
-    main_df = main_df.loc[:, ~main_df.columns.duplicated()]
-
-    selected_cols = [col for col in main_df.columns if keyword in col]
-
-    # st.write(selected_cols)
-    # Filter the DataFrame to get columns associated with the keyword
-    keyword_data = main_df[selected_cols]
+    # The keyword line item and all of its sub items, with the last part of their names as legend labels
+    positions, legend_labels = line_item_subtree(FINANCE_LINE_ITEMS, keyword)
 
-    # Extracting legend labels based on the characters after the last '-' character
-    legend_labels = [col.split(' - ')[-1] for col in keyword_data.columns]
+    keyword_data = FINANCE_WIDE_DF.iloc[:, positions]
 
     # Create a Plotly figure
     fig = go.Figure()
@@ -265,6 +245,7 @@ def plot_invest(keyword):
 
 # :::::::::::::::: REVENUE :::::::::::::::: 
 
+@page_section('revenue')
 def revenue_section():
     st.subheader("Revenue")
 
@@ -285,6 +266,7 @@ revenue_section()
 
 # :::::::::::::::: OPERATING PROFIT :::::::::::::::: 
 
+@page_section('operating profit')
 def operating_profit_section():
     
     st.subheader("Operating profit")
@@ -292,7 +274,7 @@ def operating_profit_section():
     col1, col2 = st.columns(2, gap = "small")
 
     with col1:
-        plot_op_prof('Overhead')
+        plot_op_prof('Overhead costs', 'Overhead')
         plot_op_prof('Distribution costs')
         
 
@@ -309,6 +291,7 @@ operating_profit_section()
 
 # :::::::::::::::: INVESTMENT :::::::::::::::: 
 
+@page_section('investment')
 def investment_section():
     st.subheader("Investment")
 
@@ -318,5 +301,9 @@ investment_section()
 
 # :::::::::::::::: TABLES UTILIZED ::::::::::::::::
 st.divider()
-with st.expander("Finances Table"):
-    st.write(FINANCE_DF)
\ No newline at end of file
+
+@page_section('tables')
+def tables_section():
+    table_previews({"Finances Table": 'finance raw'}, key = 'table_preview')
+
+tables_section()
\ No newline at end of file
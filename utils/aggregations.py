@@ -0,0 +1,118 @@
+import pandas as pd
+import numpy as np
+
+from utils.data_loader import MAIN_DATA_DIR, cached_view, partitioned_view
+
+
+# ::::::::: ENTITY x ROUND AGGREGATION CUBE :::::::::
+# Most charts sum a main-data tab per (entity, round), e.g. groupby(['Component', 'Round']).sum() for one measure.
+# The cube does that once for every numeric measure of the tab in a single groupby and keeps it per data version:
+# - 'sum':         index (entity, Round), one column per numeric measure
+# - 'round_total': index Round, every measure summed over all entities of that round
+# - 'share':       'sum' as a percentage of its round's total
+# The sums are computed per round partition (see partitioned_view), so a new round only sums its own rows.
+def entity_round_sums(table_df, entity_col):
+    measures = [col for col in table_df.select_dtypes('number').columns if col != 'Round']
+    return table_df.groupby([entity_col, 'Round'])[measures].sum()
+
+def cube_from_sums(sums):
+    round_total = sums.groupby(level = 'Round').sum()
+    share = sums.div(round_total, level = 'Round') * 100
+
+    return {'sum': sums, 'round_total': round_total, 'share': share}
+
+def build_entity_round_cube(table_df, entity_col):
+    return cube_from_sums(entity_round_sums(table_df, entity_col))
+
+# Partitions are whole rounds, so their (entity, Round) groups never overlap
+def _combine_sums(parts):
+    if len(parts) == 1:
+        return parts[0]
+    return pd.concat(parts).sort_index()
+
+def entity_round_cube(tab_name, entity_col):
+    return cached_view(
+        MAIN_DATA_DIR,
+        f"cube:{tab_name}:{entity_col}",
+        lambda sheets: cube_from_sums(_combine_sums(partitioned_view(
+            sheets, tab_name, f"cube sums:{entity_col}", lambda table_df: entity_round_sums(table_df, entity_col)
+        )))
+    )
+
+# The cube of some rounds only (None: all of them), e.g. the dashboard's round window
+def cube_rounds(cube, rounds):
+    if rounds is None:
+        return cube
+    return {name: view[view.index.get_level_values('Round').isin(rounds)] for name, view in cube.items()}
+
+# Flat (entity, Round, measures...) frame for plotting, like groupby(..., as_index = False) gave
+def cube_slice(cube, measures, view = 'sum'):
+    return cube[view][measures].reset_index()
+
+# ::::::::: ENTITY x MEASURE x ROUND TENSOR :::::::::
+# The per-round sums of some measures as one read-only float array of shape (entity, measure, round):
+# - 'values':   the array; values[i] is entity i's measure x round table, a view into it (no copy)
+# - 'entities': in order of first appearance in the tab
+# - 'measures', 'rounds'
+# Entities without data for a round get NaN there.
+# Like the cube, the sums are computed per round partition and put together afterwards.
+def tensor_sums(table_df, entity_col, measures, decimals = None):
+    sums = table_df.groupby([entity_col, 'Round'])[measures].sum()
+    if decimals is not None:
+        sums = sums.round(decimals)
+
+    return {
+        'sums': sums,
+        'entities': list(table_df[entity_col].dropna().unique()),
+        'rounds': table_df['Round'].unique().tolist(),
+    }
+
+def tensor_from_sums(parts, entity_col, measures):
+    entities = list(dict.fromkeys(entity for part in parts for entity in part['entities']))
+    rounds = sorted(set(round_number for part in parts for round_number in part['rounds']))
+    sums = _combine_sums([part['sums'] for part in parts])
+
+    full_index = pd.MultiIndex.from_product([entities, rounds], names = [entity_col, 'Round'])
+    values = sums.reindex(full_index).to_numpy(dtype = float).reshape(len(entities), len(rounds), len(measures))
+    values = np.ascontiguousarray(values.transpose(0, 2, 1))
+    values.flags.writeable = False
+
+    return {'values': values, 'entities': entities, 'measures': list(measures), 'rounds': rounds}
+
+def build_entity_measure_round_tensor(table_df, entity_col, measures, decimals = None):
+    return tensor_from_sums([tensor_sums(table_df, entity_col, measures, decimals)], entity_col, measures)
+
+def entity_round_tensor(tab_name, entity_col, measures, decimals = None):
+    return cached_view(
+        MAIN_DATA_DIR,
+        f"tensor:{tab_name}:{entity_col}:{'|'.join(measures)}:{decimals}",
+        lambda sheets: tensor_from_sums(partitioned_view(
+            sheets,
+            tab_name,
+            f"tensor sums:{entity_col}:{'|'.join(measures)}:{decimals}",
+            lambda table_df: tensor_sums(table_df, entity_col, measures, decimals)
+        ), entity_col, measures)
+    )
+
+# The tensor of some rounds only (None: all of them)
+def tensor_rounds(tensor, rounds):
+    if rounds is None:
+        return tensor
+
+    positions = [position for position, round_number in enumerate(tensor['rounds']) if round_number in rounds]
+    values = tensor['values'][:, :, positions]
+    values.flags.writeable = False
+
+    return {**tensor, 'values': values, 'rounds': [tensor['rounds'][position] for position in positions]}
+
+# The whole tensor as an (entity, measure) x round frame, sharing its memory
+def tensor_frame(tensor):
+    values = tensor['values']
+    n_entities, n_measures, n_rounds = values.shape
+
+    return pd.DataFrame(
+        values.reshape(n_entities * n_measures, n_rounds),
+        index = pd.MultiIndex.from_product([tensor['entities'], tensor['measures']]),
+        columns = tensor['rounds'],
+        copy = False,
+    )
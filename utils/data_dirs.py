@@ -0,0 +1,27 @@
+import os
+
+
+# ::::::::: DATA FOLDERS :::::::::
+# Where the dashboard finds its three workbooks and keeps what it derives from them:
+# - GSC_DATA_DIR: the folder with the workbooks (default data/, e.g. a scaled benchmark dataset instead)
+# - GSC_TEAMS_DIR + GSC_TEAM: multi-team mode, a folder with one sub folder of workbooks per team (see
+#   utils.team_ingest); the dashboard shows the team GSC_TEAM. The Arrow snapshots of all teams share
+#   <teams dir>/.snapshots, so a team whose workbooks were ingested ahead of time starts without parsing any Excel.
+# The round store (utils.round_store) always belongs to one data folder.
+TEAMS_DIR = os.environ.get('GSC_TEAMS_DIR')
+TEAM = os.environ.get('GSC_TEAM')
+
+def team_dir(team, teams_dir = TEAMS_DIR):
+    return os.path.join(teams_dir, team)
+
+def team_snapshot_dir(teams_dir = TEAMS_DIR):
+    return os.path.join(teams_dir, '.snapshots')
+
+if TEAMS_DIR and TEAM:
+    DATA_DIR = team_dir(TEAM)
+    SNAPSHOT_DIR = team_snapshot_dir()
+else:
+    DATA_DIR = os.environ.get('GSC_DATA_DIR', 'data')
+    SNAPSHOT_DIR = os.path.join(DATA_DIR, '.snapshots')
+
+ROUND_STORE_DIR = os.path.join(DATA_DIR, '.rounds')
@@ -1,58 +1,771 @@
 import pandas as pd
+import numpy as np
 import os
+import io
+import glob
+import hashlib
+import itertools
+import threading
+import time
+import zipfile
+from collections import OrderedDict, deque
+from collections.abc import Mapping
 
+from utils.data_dirs import DATA_DIR
+from utils.snapshot_store import load_snapshot, read_manifest, write_snapshot
+from utils.round_store import SchemaError, drop_store_entry, filter_rounds, manifest_path, read_store_sheet, sheet_partitions, sheet_round_labels
+from utils.round_store import store_entry, store_rounds, write_rounds
 
-# ::::::::: READING THE DATAFRAME ALSO PREPROCSSING IT :::::::::::
 
-# ::::::::: FINANCE DATA :::::::::
-def load_and_process_finance_data():
+FINANCE_DATA_DIR = os.path.join(DATA_DIR, 'FinanceReport_r1.xlsx')
+SUPPLIERS_DATA_DIR = os.path.join(DATA_DIR, 'Suppliers_NEW.xlsx')
+MAIN_DATA_DIR = os.path.join(DATA_DIR, 'TFC_MAIN_DATA_R-2to1.xlsx')
+
+# 'snapshot' serves sheets from the Arrow snapshots (written on first parse, see utils.data_dirs for where they live),
+# 'excel' always parses the xlsx files
+DATA_LOADER_MODE = os.environ.get('GSC_DATA_LOADER_MODE', 'snapshot')
+
+# ::::::::: READ-ONLY SHARED FRAMES :::::::::
+# Cached frames are shared by every page and every session. With pandas copy-on-write every frame a page derives
+# from them (slices, .assign(), shallow copies) is a lazy view that only gets copied when it is written to, so the
+# pages never need a defensive .copy(). On top of that the cached frames are frozen: their buffers are read-only,
+# so code that writes into shared data directly (e.g. through .to_numpy()) raises a ValueError.
+pd.set_option('mode.copy_on_write', True)
+
+def _is_writeable(values):
+    # A read-only view of writeable memory can be switched back; memory-mapped snapshot columns cannot
+    try:
+        values.flags.writeable = True
+    except ValueError:
+        return False
+    return True
+
+def freeze_frame(df):
+    arrays = []
+    for position in range(df.shape[1]):
+        values = df.iloc[:, position].to_numpy()
+        if _is_writeable(values):
+            values = values.copy()
+            values.flags.writeable = False
+        arrays.append(values)
+
+    frozen_df = pd.DataFrame(dict(enumerate(arrays)), index = df.index, copy = False)
+    frozen_df.columns = df.columns
+
+    return frozen_df
+
+# Freezes a cached view: a frame, or the frames of a dict of them
+def freeze(view):
+    if isinstance(view, pd.DataFrame):
+        return freeze_frame(view)
+    if isinstance(view, dict):
+        return {key: freeze(value) if isinstance(value, pd.DataFrame) else value for key, value in view.items()}
+    return view
+
+# What callers get from the cache: a shallow (copy-on-write) copy, so they can't even add columns to the shared one
+def share(view):
+    if isinstance(view, pd.DataFrame):
+        return view.copy(deep = False)
+    if isinstance(view, dict):
+        return {key: share(value) if isinstance(value, pd.DataFrame) else value for key, value in view.items()}
+    return view
+
+# ::::::::: WORKBOOK CACHE :::::::::
+# Workbooks live here for the whole process, so every session and every rerun shares them.
+# Each entry remembers the (mtime, size) and content hash of the file it was read from:
+#   { path: {'stat': (mtime_ns, size), 'hash': sha1, 'sheets': WorkbookSheets} }
+# A sheet is only loaded the first time someone asks for it, so a page never pays for the tabs it doesn't use.
+_WORKBOOK_CACHE = {}
+_WORKBOOK_CACHE_LOCK = threading.Lock()
+_CACHE_STATS = {'hits': 0, 'misses': 0, 'reloads': 0}
+
+# Views derived from a workbook (tidy tables, aggregates, ...) are cached next to it, together with the workbook
+# hash they were built from and the sheets the build read (see _SheetAccess):
+#   { (path, view_name): {'hash': sha1, 'access': _SheetAccess, 'view': view} }
+# When a new version of the workbook comes in, only the views that read a changed sheet are dropped (see reload_workbook).
+_DERIVED_CACHE = {}
+
+# Only one workbook version is swapped in at a time; while that happens the paths are in _RELOADING and readers
+# keep getting the version that is still in the cache
+_RELOAD_LOCK = threading.Lock()
+_RELOADING = set()
+
+def _file_stat_key(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+# A workbook can also be served from the round store (see RoundStoreSheets), so ingesting a round moves the key too
+def _source_stat_key(path):
+    stat_keys = []
+    for source_path in (path, manifest_path()):
+        try:
+            stat_keys.append(_file_stat_key(source_path))
+        except FileNotFoundError:
+            stat_keys.append(None)
+
+    if stat_keys == [None, None]:
+        raise FileNotFoundError(path)
+
+    return tuple(stat_keys)
+
+def _hash_bytes(data):
+    return hashlib.sha1(data).hexdigest()
+
+def _file_hash(path):
+    with open(path, 'rb') as f:
+        return _hash_bytes(f.read())
+
+# Content hash of a sheet: two versions of a workbook with the same values in a sheet give the same hash, no matter
+# what else changed in the file
+def frame_hash(df):
+    digest = hashlib.sha1(repr((list(df.columns), [str(dtype) for dtype in df.dtypes])).encode())
+    digest.update(pd.util.hash_pandas_object(df, index = True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+# Opens the workbook a single time in openpyxl's read-only (streaming) mode and materializes every requested
+# sheet from that one handle, so shared strings and styles are inflated once instead of once per sheet
+def parse_workbook(source, sheet_names = None):
+    with pd.ExcelFile(source, engine = 'openpyxl') as workbook:
+        if sheet_names is None:
+            sheet_names = workbook.sheet_names
 
-    RAW_FINANCE_DF = pd.read_excel('data/FinanceReport_r1.xlsx')
-
-    # Function to rename duplicates. For each duplicate, it appends an underscore and a counter to the name.
-    def rename_duplicates( old_columns ):
-        counts = {}
-        new_columns = []
-        for col in old_columns:
-            if col in counts:
-                counts[col] += 1
-                new_name = f"{col}_{counts[col]}"
-                new_columns.append(new_name)
+        return {sheet_name: workbook.parse(sheet_name) for sheet_name in sheet_names}
+
+# The sheets of one workbook version as a read-only mapping {sheet_name: frozen DataFrame}, each loaded on first access:
+# - 'snapshot' mode: only the snapshot files of the requested sheets are read. When there is no snapshot for these
+#   bytes yet, the whole workbook is parsed once (and snapshotted), and all its sheets are kept.
+# - 'excel' mode: only the requested sheets are parsed.
+# The bytes the hash was taken from are kept, so a sheet parsed later still matches the version.
+# `load_times` has the seconds every loaded sheet took, sheet_hash() the content hash of a sheet.
+class WorkbookSheets(Mapping):
+
+    # sheet_hash() has to load the sheet (see _compare_versions)
+    hash_needs_sheets = True
+
+    def __init__(self, path, file_hash, data):
+        self.path = path
+        self.file_hash = file_hash
+        self.load_times = {}
+        self._data = data
+        self._names = None
+        self._sheets = {}
+        self._hashes = {}
+        self._lock = threading.RLock()   # the lock is held while loading so concurrent sessions wait for one load
+
+    @property
+    def sheet_names(self):
+        with self._lock:
+            if self._names is None:
+                entry = read_manifest().get(self.file_hash) if DATA_LOADER_MODE == 'snapshot' else None
+                if entry is not None:
+                    self._names = [sheet_entry['name'] for sheet_entry in entry['sheets']]
+                elif DATA_LOADER_MODE == 'snapshot':
+                    self._parse_all()
+                else:
+                    with pd.ExcelFile(io.BytesIO(self._data), engine = 'openpyxl') as workbook:
+                        self._names = workbook.sheet_names
+            return self._names
+
+    @property
+    def load_time(self):
+        return sum(self.load_times.values())
+
+    def loaded_sheets(self):
+        with self._lock:
+            return list(self._sheets)
+
+    def sheet_hash(self, sheet_name):
+        with self._lock:
+            if sheet_name not in self._hashes:
+                self._hashes[sheet_name] = frame_hash(self[sheet_name])
+            return self._hashes[sheet_name]
+
+    def _store(self, sheets, seconds):
+        for sheet_name, sheet_df in sheets.items():
+            self._sheets[sheet_name] = freeze_frame(sheet_df)
+            self.load_times[sheet_name] = seconds / len(sheets)
+
+    # The xlsx is only parsed as a whole when there is no snapshot for exactly these bytes
+    def _parse_all(self):
+        start = time.perf_counter()
+        sheets = parse_workbook(io.BytesIO(self._data))
+
+        if DATA_LOADER_MODE == 'snapshot':
+            try:
+                write_snapshot(self.path, self.file_hash, sheets)
+            except OSError:
+                pass  # A read-only data folder only costs us the snapshot, the parsed sheets are still fine
+
+        self._names = list(sheets)
+        self._store({sheet_name: sheet_df for sheet_name, sheet_df in sheets.items() if sheet_name not in self._sheets}, time.perf_counter() - start)
+
+    # Loads the given sheets (every sheet when None) that aren't loaded yet, in one go
+    def load(self, sheet_names = None):
+        with self._lock:
+            if sheet_names is None:
+                sheet_names = self.sheet_names
+
+            missing = [sheet_name for sheet_name in sheet_names if sheet_name not in self._sheets and sheet_name in self.sheet_names]
+            if not missing:
+                return
+
+            start = time.perf_counter()
+            if DATA_LOADER_MODE == 'snapshot':
+                sheets = load_snapshot(self.file_hash, sheet_names = missing)
+                if sheets is None:
+                    self._parse_all()
+                    return
             else:
-                counts[col] = 0
-                new_columns.append(col)
-        return new_columns
-
-    # Duplicate columns in Finance Report (count):
-    # - Operating profit - Indirect cost - Handling costs - Permanent employees (2)
-    # - Operating profit - Indirect cost - Handling costs - Flexible manpower (2)
-    # - Operating profit - Indirect cost - Administration costs - Order lines (2)
-    # - Operating profit - Indirect cost - Administration costs - Orders (2)
-
-    base_names = [
-        "Operating profit - Indirect cost - Handling costs - Permanent employees",
-        "Operating profit - Indirect cost - Handling costs - Flexible manpower",
-        "Operating profit - Indirect cost - Administration costs - Order lines",
-        "Operating profit - Indirect cost - Administration costs - Orders"
-    ]
+                sheets = parse_workbook(io.BytesIO(self._data), missing)
+
+            self._store(sheets, time.perf_counter() - start)
+
+    # The pieces a view can be built from one by one (see partitioned_view): [(key, load() -> DataFrame)].
+    # A workbook is a single piece, the whole sheet of this version.
+    def partitions(self, sheet_name):
+        return [(f"{self.file_hash}:{sheet_name}", lambda: self[sheet_name])]
+
+    # Only the rows (or round columns) of `rounds`; a workbook has to filter the loaded sheet (see query_rounds)
+    def select_rounds(self, sheet_name, rounds):
+        return filter_rounds(self[sheet_name], rounds)
+
+    def sheet_rounds(self, sheet_name):
+        return sheet_round_labels(self[sheet_name])
+
+    def __getitem__(self, sheet_name):
+        with self._lock:
+            if sheet_name not in self._sheets:
+                if sheet_name not in self.sheet_names:
+                    raise KeyError(sheet_name)
+                self.load([sheet_name])
+            return self._sheets[sheet_name]
+
+    def __contains__(self, sheet_name):
+        return sheet_name in self.sheet_names
 
-    # Function to add suffixes to specific columns
-    def add_specific_inbound_outbound_suffixes(columns):
-        new_columns = []
-        for col in columns:
-            # Check if the base of the column name (without '_1' if it exists) is in the list of base names
-            base_col = col.replace('_1', '')
-            if base_col in base_names:
-                # If the original column name ends with '_1', add ' (Outbound)'
-                if col.endswith("_1"):
-                    new_columns.append(base_col + " (Outbound)")
-                # Otherwise, if it doesn't have '_1', add ' (Inbound)'
+    def __iter__(self):
+        return iter(self.sheet_names)
+
+    def __len__(self):
+        return len(self.sheet_names)
+
+# The sheets of a workbook that lives in the round store (utils.round_store), the same mapping as WorkbookSheets.
+# A sheet is put together from its round partitions the first time it is asked for; its hash comes from the partition
+# hashes in the manifest, so telling versions apart never needs the data. partitions() hands out the rounds one by
+# one, so an aggregate only has to be computed for the rounds it hasn't seen (see partitioned_view).
+class RoundStoreSheets(WorkbookSheets):
+
+    hash_needs_sheets = False
+
+    def __init__(self, path, entry):
+        self.entry = entry
+        partition_hashes = [
+            (round_number, sheet_name, partition['hash'])
+            for round_number, round_entry in sorted(entry['rounds'].items())
+            for sheet_name, partition in sorted(round_entry['sheets'].items())
+        ]
+        super().__init__(path, _hash_bytes(repr(partition_hashes).encode()), None)
+        self._names = list(entry['order'])
+
+    @property
+    def rounds(self):
+        return store_rounds(self.entry)
+
+    def sheet_hash(self, sheet_name):
+        with self._lock:
+            if sheet_name not in self._hashes:
+                if sheet_name not in self._names:
+                    raise KeyError(sheet_name)
+                hashes = [partition_hash for _, partition_hash, _ in sheet_partitions(self.entry, sheet_name)]
+                self._hashes[sheet_name] = _hash_bytes(repr((sheet_name, hashes)).encode())
+            return self._hashes[sheet_name]
+
+    def partitions(self, sheet_name):
+        if sheet_name not in self._names:
+            raise KeyError(sheet_name)
+        return [(partition_hash, load) for _, partition_hash, load in sheet_partitions(self.entry, sheet_name)]
+
+    # Reads the partitions of `rounds` only; the rest of the sheet is never opened
+    def select_rounds(self, sheet_name, rounds):
+        if sheet_name not in self._names:
+            raise KeyError(sheet_name)
+        if sheet_name in self._sheets:
+            return filter_rounds(self._sheets[sheet_name], rounds)
+        return read_store_sheet(self.entry, sheet_name, rounds = rounds)
+
+    def sheet_rounds(self, sheet_name):
+        if sheet_name not in self._names:
+            raise KeyError(sheet_name)
+        return [round_number for round_number, _, _ in sheet_partitions(self.entry, sheet_name)]
+
+    def load(self, sheet_names = None):
+        with self._lock:
+            for sheet_name in self._names if sheet_names is None else sheet_names:
+                if sheet_name in self._names and sheet_name not in self._sheets:
+                    start = time.perf_counter()
+                    sheet_df = read_store_sheet(self.entry, sheet_name)
+                    self._store({sheet_name: sheet_df}, time.perf_counter() - start)
+
+# Recording view of a WorkbookSheets: cached_view hands it to the build so the entry knows which sheets the view
+# depends on. A view that survives a reload is pointed at the new version, so what it reads later is current too.
+class _SheetAccess(Mapping):
+
+    def __init__(self, sheets):
+        self.sheets = sheets
+        self.used = set()
+
+    def __getitem__(self, sheet_name):
+        value = self.sheets[sheet_name]
+        self.used.add(sheet_name)
+        return value
+
+    def partitions(self, sheet_name):
+        partitions = self.sheets.partitions(sheet_name)
+        self.used.add(sheet_name)
+        return partitions
+
+    def select_rounds(self, sheet_name, rounds):
+        value = self.sheets.select_rounds(sheet_name, rounds)
+        self.used.add(sheet_name)
+        return value
+
+    def sheet_rounds(self, sheet_name):
+        value = self.sheets.sheet_rounds(sheet_name)
+        self.used.add(sheet_name)
+        return value
+
+    def __iter__(self):
+        return iter(self.sheets)
+
+    def __len__(self):
+        return len(self.sheets)
+
+    def __getattr__(self, name):
+        return getattr(self.sheets, name)
+
+def read_workbook(path):
+    stat_key = _source_stat_key(path)
+
+    with _WORKBOOK_CACHE_LOCK:
+        entry = _WORKBOOK_CACHE.get(path)
+
+        if entry is not None and (entry['stat'] == stat_key or path in _RELOADING):
+            _CACHE_STATS['hits'] += 1
+            return entry['sheets']
+
+    return reload_workbook(path)
+
+# ::::::::: INCREMENTAL RELOAD :::::::::
+# The round store's version of the workbook when it has one, else the file. The store stands in for the version of
+# the file it was seeded from: a file replaced since then goes into the store again (its rounds replace the ones
+# the old version had, ingested rounds stay), or, when it doesn't fit the stored schema anymore, the store is
+# dropped and the new file is served as it is.
+def _open_source(path):
+    # Hash and load the same bytes so the cached version always matches what was loaded
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        data = None
+
+    entry = store_entry(path)
+    if entry is not None and data is not None and entry.get('seed') != _hash_bytes(data):
+        entry = _reseed_store(path, data)
+
+    if entry is not None:
+        return RoundStoreSheets(path, entry)
+    if data is None:
+        raise FileNotFoundError(path)
+    return WorkbookSheets(path, _hash_bytes(data), data)
+
+def _reseed_store(path, data):
+    try:
+        write_rounds(path, os.path.basename(path), parse_workbook(io.BytesIO(data)), seed_hash = _hash_bytes(data), replace = True)
+    except SchemaError:
+        drop_store_entry(path)
+        return None
+    return store_entry(path)
+
+# Reads the file again when its (mtime, size) moved (read_workbook, or utils.data_watcher as soon as a file changes).
+# A plain touch only updates the stat. New bytes become a new WorkbookSheets, and every sheet the old version had
+# loaded is loaded again and compared by content hash:
+# - views (cached_view) that only read unchanged sheets are kept and point at the new version
+# - views that read a changed sheet are dropped, and built again the next time they are asked for
+# - a reload event says what changed (see reload_events / on_reload)
+# A file that can't be read yet (an export that is still being written) leaves the cached version in place. Its stat
+# and hash are kept, so it is tried once per change (a touch doesn't try it again), and the event has the 'error'.
+_RELOAD_EVENTS = deque(maxlen = 100)
+_RELOAD_LISTENERS = []
+_RELOAD_EVENT_IDS = itertools.count(1)
+
+def reload_workbook(path):
+    with _RELOAD_LOCK:
+        stat_key = _source_stat_key(path)
+
+        with _WORKBOOK_CACHE_LOCK:
+            entry = _WORKBOOK_CACHE.get(path)
+
+            # Someone else reloaded it while we waited
+            if entry is not None and entry['stat'] == stat_key:
+                _CACHE_STATS['hits'] += 1
+                return entry['sheets']
+
+            _RELOADING.add(path)
+
+        try:
+            sheets = _open_source(path)
+            file_hash = sheets.file_hash
+
+            if entry is not None and file_hash in (entry['hash'], entry.get('failed_hash')):
+                with _WORKBOOK_CACHE_LOCK:
+                    entry['stat'] = stat_key
+                    _CACHE_STATS['hits'] += 1
+                return entry['sheets']
+
+            event = None
+
+            if entry is not None:
+                start = time.perf_counter()
+                try:
+                    event = _compare_versions(entry['sheets'], sheets)
+                except (zipfile.BadZipFile, ValueError, KeyError, OSError) as error:
+                    event = _failed_reload(entry['sheets'], file_hash, error)
+                event['seconds'] = time.perf_counter() - start
+
+            with _WORKBOOK_CACHE_LOCK:
+                if event is not None and event['error'] is not None:
+                    entry['stat'] = stat_key
+                    entry['failed_hash'] = file_hash
+                    sheets = entry['sheets']
                 else:
-                    new_columns.append(col + " (Inbound)")
+                    _CACHE_STATS['misses'] += 1
+                    _WORKBOOK_CACHE[path] = {'stat': stat_key, 'hash': file_hash, 'sheets': sheets}
+                    if event is not None:
+                        _CACHE_STATS['reloads'] += 1
+                        _keep_unchanged_views(path, sheets, event)
+        finally:
+            with _WORKBOOK_CACHE_LOCK:
+                _RELOADING.discard(path)
+
+    if event is not None:
+        _emit_reload(event)
+
+    return sheets
+
+def _compare_versions(old_sheets, new_sheets):
+    # Store versions know every sheet's hash without loading it, and views may have read them round by round
+    loaded = old_sheets.loaded_sheets() if old_sheets.hash_needs_sheets else list(old_sheets.sheet_names)
+    if new_sheets.hash_needs_sheets:
+        new_sheets.load([sheet_name for sheet_name in loaded if sheet_name in new_sheets])
+
+    changed = [
+        sheet_name for sheet_name in loaded
+        if sheet_name not in new_sheets or old_sheets.sheet_hash(sheet_name) != new_sheets.sheet_hash(sheet_name)
+    ]
+
+    return {
+        'path': old_sheets.path,
+        'hash': new_sheets.file_hash,
+        'previous_hash': old_sheets.file_hash,
+        'changed': changed,
+        'unchanged': [sheet_name for sheet_name in loaded if sheet_name not in changed],
+        'added': [sheet_name for sheet_name in new_sheets.sheet_names if sheet_name not in old_sheets.sheet_names],
+        'removed': [sheet_name for sheet_name in old_sheets.sheet_names if sheet_name not in new_sheets.sheet_names],
+        # Versions nothing should be cached under anymore (see utils.figure_cache)
+        'stale_versions': [old_sheets.file_hash] + [old_sheets.sheet_hash(sheet_name) for sheet_name in changed],
+        'error': None,
+    }
+
+# The event of a new version that couldn't be read: nothing changed, the old version stays
+def _failed_reload(old_sheets, file_hash, error):
+    return {
+        'path': old_sheets.path,
+        'hash': file_hash,
+        'previous_hash': old_sheets.file_hash,
+        'changed': [],
+        'unchanged': [],
+        'added': [],
+        'removed': [],
+        'stale_versions': [],
+        'error': f"{type(error).__name__}: {error}",
+    }
+
+# A view whose build didn't read any sheet (e.g. it got its data some other way) can't be vouched for, so it goes too
+def _keep_unchanged_views(path, sheets, event):
+    changed = set(event['changed'])
+    event['views_kept'] = []
+    event['views_dropped'] = []
+
+    for key, entry in list(_DERIVED_CACHE.items()):
+        if key[0] != path:
+            continue
+
+        used = entry['access'].used
+        if used and not used & changed:
+            entry['access'].sheets = sheets
+            entry['hash'] = sheets.file_hash
+            event['views_kept'].append(key[1])
+        else:
+            del _DERIVED_CACHE[key]
+            event['views_dropped'].append(key[1])
+
+def _emit_reload(event):
+    with _WORKBOOK_CACHE_LOCK:
+        event['id'] = next(_RELOAD_EVENT_IDS)
+        event['time'] = time.time()
+        _RELOAD_EVENTS.append(event)
+        listeners = list(_RELOAD_LISTENERS)
+
+    for listener in listeners:
+        listener(event)
+
+# listener(event) is called after every reload that changed a workbook
+def on_reload(listener):
+    with _WORKBOOK_CACHE_LOCK:
+        _RELOAD_LISTENERS.append(listener)
+    return listener
+
+# The reload events (oldest first) with an id above `after`; the last 100 are kept
+def reload_events(after = 0):
+    with _WORKBOOK_CACHE_LOCK:
+        return [event for event in _RELOAD_EVENTS if event['id'] > after]
+
+def last_reload_id():
+    with _WORKBOOK_CACHE_LOCK:
+        return _RELOAD_EVENTS[-1]['id'] if _RELOAD_EVENTS else 0
+
+# Build step for the snapshot store: returns {path: True (written) | None (already up to date) | False (not snapshottable)}
+def build_snapshots(paths = None):
+    if paths is None:
+        paths = sorted(glob.glob(os.path.join(DATA_DIR, '*.xlsx')))
+
+    manifest = read_manifest()
+
+    results = {}
+    for path in paths:
+        file_hash = _file_hash(path)
+
+        if file_hash in manifest:
+            results[path] = None
+            continue
+
+        results[path] = write_snapshot(path, file_hash, parse_workbook(path))
+
+    return results
+
+def workbook_version(path):
+    return read_workbook(path).file_hash
+
+# Changes only when the values of that one sheet change
+def sheet_version(path, sheet_name):
+    return read_workbook(path).sheet_hash(sheet_name)
+
+# build(sheets) is called once per workbook version (or less, see reload_workbook); everyone else gets a shared
+# copy of the frozen result
+def cached_view(path, view_name, build):
+    sheets = read_workbook(path)
+
+    entry = _DERIVED_CACHE.get((path, view_name))
+    if entry is None or entry['hash'] != sheets.file_hash:
+        access = _SheetAccess(sheets)
+        entry = {'hash': sheets.file_hash, 'access': access, 'view': freeze(build(access))}
+        _DERIVED_CACHE[(path, view_name)] = entry
+
+    return share(entry['view'])
+
+# ::::::::: ROUND PARTITIONED VIEWS :::::::::
+# For views that can be computed per round and combined afterwards (sums per entity and round, ...): build(part) runs
+# on every partition of the sheet (see WorkbookSheets.partitions) and the frozen results are kept per partition:
+#   { (path, view_name): {partition key: result} }
+# so when a new round lands in the round store only that round is built. For a plain workbook the whole sheet is one
+# partition. Returns the results in round order. Use it inside a cached_view build, with the sheets it got.
+_PARTITION_CACHE = {}
+_PARTITION_CACHE_LOCK = threading.Lock()
+
+def partitioned_view(sheets, sheet_name, view_name, build):
+    partitions = sheets.partitions(sheet_name)
+    cache_key = (sheets.path, view_name)
+
+    with _PARTITION_CACHE_LOCK:
+        cached = _PARTITION_CACHE.get(cache_key, {})
+
+    results = {key: cached[key] if key in cached else freeze(build(load())) for key, load in partitions}
+
+    # Only the current partitions are kept, the results of replaced ones go
+    with _PARTITION_CACHE_LOCK:
+        _PARTITION_CACHE[cache_key] = results
+
+    return [share(result) for result in results.values()]
+
+# ::::::::: ROUND QUERIES :::::::::
+# A sheet restricted to some rounds: `rounds` is a (first, last) range (both included) or a collection of rounds;
+# None is the whole sheet. Only a workbook in the round store pushes the selection down: it reads the partitions of
+# those rounds, so showing the latest round of a long season doesn't load the others. A plain workbook loads (and
+# caches) the whole sheet and filters it.
+# Every selection is cached like a view of its workbook version, but only for the GSC_SELECTION_CACHE_SIZE selections
+# used last: a season of R rounds has R * (R + 1) / 2 windows, and each would otherwise stay in memory for good.
+#   { selection: {(path, view_name), ...} }, least recently used first
+SELECTION_CACHE_SIZE = int(os.environ.get('GSC_SELECTION_CACHE_SIZE', '8'))
+_SELECTION_VIEWS = OrderedDict()
+
+def _selection_view(path, view_name, selection, build):
+    view = cached_view(path, view_name, build)
+
+    with _WORKBOOK_CACHE_LOCK:
+        _SELECTION_VIEWS.setdefault(selection, set()).add((path, view_name))
+        _SELECTION_VIEWS.move_to_end(selection)
+        while len(_SELECTION_VIEWS) > SELECTION_CACHE_SIZE:
+            _, keys = _SELECTION_VIEWS.popitem(last = False)
+            for key in keys:
+                _DERIVED_CACHE.pop(key, None)
+
+    return view
+
+def round_selection(rounds):
+    if rounds is None:
+        return None
+    if isinstance(rounds, tuple) and len(rounds) == 2:
+        return range(rounds[0], rounds[1] + 1)
+    return sorted(set(rounds))
+
+def query_rounds(path, sheet_name = 0, rounds = None):
+    if rounds is None:
+        return read_workbook_sheet(path, sheet_name)
+
+    if isinstance(sheet_name, int):
+        sheet_name = list(read_workbook(path))[sheet_name]
+
+    selection = tuple(round_selection(rounds))
+    return _selection_view(
+        path,
+        f"rounds:{sheet_name}:{selection}",
+        selection,
+        lambda sheets: sheets.select_rounds(sheet_name, selection)
+    )
+
+# The rounds any sheet of the workbooks (all of them when `paths` is None) has data for, in order
+def available_rounds(paths = None):
+    rounds = set()
+    for path in paths or (FINANCE_DATA_DIR, SUPPLIERS_DATA_DIR, MAIN_DATA_DIR):
+        rounds.update(cached_view(path, 'rounds', _workbook_rounds))
+    return sorted(rounds)
+
+def _workbook_rounds(sheets):
+    rounds = set()
+    for sheet_name in sheets:
+        try:
+            rounds.update(sheets.sheet_rounds(sheet_name))
+        except SchemaError:
+            pass  # A sheet without rounds
+    return sorted(rounds)
+
+# ::::::::: ROUND INGESTION :::::::::
+# Adds the rounds of a new export to the round store of the workbook it belongs to (by default the workbook with the
+# same sheets). The first time, the workbook itself goes into the store as the history. The export is checked against
+# the workbook's schema (SchemaError), and only rounds whose content is new are written. A round that another export
+# (or the workbook) stored with other content is only overwritten with `replace` (else RoundConflict). A running
+# dashboard picks the new version up like any other reload: only the views and figures of the changed sheets are
+# rebuilt, and the partitioned views only for the new rounds.
+# Returns {round: [sheet names written]}.
+def ingest_round_export(export_path, workbook_path = None, replace = False):
+    export_sheets = parse_workbook(export_path)
+
+    if workbook_path is None:
+        workbook_path = next(
+            (path for path in (FINANCE_DATA_DIR, SUPPLIERS_DATA_DIR, MAIN_DATA_DIR) if list(read_workbook(path)) == list(export_sheets)),
+            None
+        )
+        if workbook_path is None:
+            raise SchemaError(f"{export_path}: no workbook has the sheets {list(export_sheets)}")
+
+    if store_entry(workbook_path) is None:
+        history = read_workbook(workbook_path)
+        write_rounds(workbook_path, os.path.basename(workbook_path), {sheet_name: history[sheet_name] for sheet_name in history}, seed_hash = history.file_hash)
+
+    written = write_rounds(workbook_path, os.path.basename(export_path), export_sheets, replace = replace)
+
+    if written:
+        read_workbook(workbook_path)
+
+    return written
+
+def cache_stats():
+    with _WORKBOOK_CACHE_LOCK:
+        return {**_CACHE_STATS, 'workbooks': len(_WORKBOOK_CACHE), 'views': len(_DERIVED_CACHE)}
+
+# {path: {sheet_name: seconds}} for every sheet loaded so far
+def workbook_load_times():
+    with _WORKBOOK_CACHE_LOCK:
+        return {path: dict(entry['sheets'].load_times) for path, entry in _WORKBOOK_CACHE.items()}
+
+def clear_cache():
+    with _WORKBOOK_CACHE_LOCK:
+        _WORKBOOK_CACHE.clear()
+        _DERIVED_CACHE.clear()
+        _PARTITION_CACHE.clear()
+        _SELECTION_VIEWS.clear()
+        _CACHE_STATS.update({'hits': 0, 'misses': 0, 'reloads': 0})
+
+# Every caller gets its own (copy-on-write) copy so one page (or session) can never change what another one sees
+def read_workbook_sheet(path, sheet_name = 0):
+    sheets = read_workbook(path)
+
+    if isinstance(sheet_name, int):
+        sheet_name = list(sheets)[sheet_name]
+
+    return sheets[sheet_name].copy(deep = False)
+
+
+# ::::::::: READING THE DATAFRAME ALSO PREPROCSSING IT :::::::::::
+
+# ::::::::: FINANCE DATA :::::::::
+
+# Function to rename duplicates. For each duplicate, it appends an underscore and a counter to the name.
+def rename_duplicates( old_columns ):
+    counts = {}
+    new_columns = []
+    for col in old_columns:
+        if col in counts:
+            counts[col] += 1
+            new_name = f"{col}_{counts[col]}"
+            new_columns.append(new_name)
+        else:
+            counts[col] = 0
+            new_columns.append(col)
+    return new_columns
+
+# Duplicate columns in Finance Report (count):
+# - Operating profit - Indirect cost - Handling costs - Permanent employees (2)
+# - Operating profit - Indirect cost - Handling costs - Flexible manpower (2)
+# - Operating profit - Indirect cost - Administration costs - Order lines (2)
+# - Operating profit - Indirect cost - Administration costs - Orders (2)
+
+base_names = [
+    "Operating profit - Indirect cost - Handling costs - Permanent employees",
+    "Operating profit - Indirect cost - Handling costs - Flexible manpower",
+    "Operating profit - Indirect cost - Administration costs - Order lines",
+    "Operating profit - Indirect cost - Administration costs - Orders"
+]
+
+# Function to add suffixes to specific columns
+def add_specific_inbound_outbound_suffixes(columns):
+    new_columns = []
+    for col in columns:
+        # Check if the base of the column name (without '_1' if it exists) is in the list of base names
+        base_col = col.replace('_1', '')
+        if base_col in base_names:
+            # If the original column name ends with '_1', add ' (Outbound)'
+            if col.endswith("_1"):
+                new_columns.append(base_col + " (Outbound)")
+            # Otherwise, if it doesn't have '_1', add ' (Inbound)'
             else:
-                # If the column is not one of the specified columns, leave it as is
-                new_columns.append(col)
-        return new_columns
+                new_columns.append(col + " (Inbound)")
+        else:
+            # If the column is not one of the specified columns, leave it as is
+            new_columns.append(col)
+    return new_columns
+
+def process_finance_data(RAW_FINANCE_DF):
 
     PROCESSED_FINANCE_DF = RAW_FINANCE_DF.copy().T.reset_index()
     PROCESSED_FINANCE_DF.columns = PROCESSED_FINANCE_DF.iloc[0]
@@ -62,19 +775,172 @@ def load_and_process_finance_data():
     PROCESSED_FINANCE_DF.columns = add_specific_inbound_outbound_suffixes(PROCESSED_FINANCE_DF.columns)
     PROCESSED_FINANCE_DF.rename(columns = {"Unnamed: 0": "Round"}, inplace = True)
 
-    return RAW_FINANCE_DF, PROCESSED_FINANCE_DF
+    return PROCESSED_FINANCE_DF
+
+# One version of the finance report with its views computed on first access and then kept:
+# - raw:       the report as read from FinanceReport_r1.xlsx
+# - processed: transposed, one row per round, duplicate line items renamed (Inbound)/(Outbound)
+# - tidy:      build_tidy_finance result ('wide', 'long', 'line_items')
+# The object is shared by every session, so it cannot be modified and its views are frozen (see freeze_frame);
+# `timings` has the seconds each stage took.
+class FinanceData:
+    __slots__ = ('_sheets', '_views', '_timings', '_lock')
+
+    def __init__(self, sheets):
+        self._sheets = sheets
+        self._views = {}
+        self._timings = {}
+        self._lock = threading.RLock()   # views are built from other views, e.g. tidy from raw
+
+    def _view(self, name, build):
+        with self._lock:
+            if name not in self._views:
+                start = time.perf_counter()
+                self._views[name] = freeze(build())
+                self._timings[name] = time.perf_counter() - start
+            return share(self._views[name])
+
+    @property
+    def raw(self):
+        return self._view('raw', lambda: next(iter(self._sheets.values())))
+
+    @property
+    def processed(self):
+        return self._view('processed', lambda: process_finance_data(self.raw))
+
+    @property
+    def tidy(self):
+        return self._view('tidy', self._build_tidy)
+
+    def _build_tidy(self):
+        # Only the renamed line-item names are needed from the processing, not the (expensive) transposed frame
+        line_item_names = add_specific_inbound_outbound_suffixes(rename_duplicates(self.raw['Round']))
+        return build_tidy_finance(self.raw, line_item_names)
+
+    @property
+    def timings(self):
+        # The report is loaded by the first view that reads it (see WorkbookSheets)
+        return {'load': getattr(self._sheets, 'load_time', None), **self._timings}
+
+def load_and_process_finance_data():
+
+    return cached_view(
+        FINANCE_DATA_DIR,
+        'finance_data',
+        FinanceData
+    )
+
+# The processed report of some rounds only: just those round columns are read and transposed (see query_rounds)
+def processed_finance_rounds(rounds = None):
+    if rounds is None:
+        return load_and_process_finance_data().processed
+
+    selection = tuple(round_selection(rounds))
+    return _selection_view(
+        FINANCE_DATA_DIR,
+        f"processed:{selection}",
+        selection,
+        lambda sheets: process_finance_data(sheets.select_rounds(next(iter(sheets)), selection))
+    )
+
+# ::::::::: TIDY FINANCE TABLE :::::::::
+# The finance report has one row per line item and one column per round. The pages want the opposite, so instead
+# of every plot transposing the object-dtype report again, it is reshaped once into:
+# - 'wide': index Round (int), one float column per line item. Repeated line-item names keep their first
+#           occurrence, which is what the plots selected before.
+# - 'long': one row per (line item, round). The index is hierarchical, one level per " - " separated part of the
+#           name ('Level 1' .. 'Level N') plus 'Round'. 'Line item' holds the unique (Inbound/Outbound) name.
+# - 'line_items': build_line_item_index over the wide columns, for prefix/subtree lookups of columns.
+def build_tidy_finance(raw_finance_df, line_item_names):
+    line_items = raw_finance_df['Round']
+    round_columns = raw_finance_df.columns[1:]
+
+    rounds = pd.Index([int(round_col) for round_col in round_columns], name = 'Round')
+    values = raw_finance_df[round_columns].to_numpy(dtype = float)   # (line items x rounds)
+
+    is_first = ~line_items.duplicated().to_numpy()
+    wide = pd.DataFrame(
+        values[is_first].T,
+        index = rounds,
+        columns = pd.Index(line_items[is_first].to_numpy(), name = 'Line item'),
+    )
+
+    levels = line_items.str.split(' - ', expand = True).fillna('')
+    levels.columns = [f"Level {i + 1}" for i in range(levels.shape[1])]
+
+    n_items, n_rounds = values.shape
+    long = pd.DataFrame({
+        **{level: np.repeat(levels[level].to_numpy(), n_rounds) for level in levels.columns},
+        'Round': np.tile(rounds.to_numpy(), n_items),
+        'Line item': np.repeat(np.asarray(line_item_names, dtype = object), n_rounds),
+        'Value': values.ravel(),
+    })
+    long = long.set_index(list(levels.columns) + ['Round'])
+
+    return {'wide': wide, 'long': long, 'line_items': build_line_item_index(wide.columns)}
+
+# ::::::::: FINANCE LINE-ITEM INDEX :::::::::
+# Trie over the " - " separated line-item names. Every node stores the column position of the line item it names
+# (if any) and the positions of its whole subtree in report order, so a query only walks the depth of the name
+# (4 levels at most) no matter how many line items the report has.
+#   'Operating profit' -> 'Indirect cost' -> 'Handling costs' -> 'Inbound handling'
+def build_line_item_index(line_items):
+    def new_node():
+        return {'children': {}, 'position': None, 'subtree': []}
+
+    index = new_node()
+    index['labels'] = [line_item.split(' - ')[-1] for line_item in line_items]
+
+    for position, line_item in enumerate(line_items):
+        node = index
+        node['subtree'].append(position)
+        for part in line_item.split(' - '):
+            node = node['children'].setdefault(part, new_node())
+            node['subtree'].append(position)
+        node['position'] = position
+
+    return index
+
+def _find_line_item_node(index, prefix):
+    node = index
+    for part in prefix.split(' - '):
+        node = node['children'].get(part)
+        if node is None:
+            raise KeyError(prefix)
+    return node
+
+# Exact lookup: (column position, leaf label) of one line item
+def find_line_item(index, line_item):
+    position = _find_line_item_node(index, line_item)['position']
+    if position is None:
+        raise KeyError(line_item)
+    return position, index['labels'][position]
+
+# Subtree lookup: column positions and leaf labels of the line item `prefix` and everything below it
+def line_item_subtree(index, prefix):
+    positions = _find_line_item_node(index, prefix)['subtree']
+    return positions, [index['labels'][position] for position in positions]
 
 # ::::::::: SUPPLIERS DATA :::::::::
-def load_suppliers_data():
+# `rounds`: only those rounds (see query_rounds)
+def load_suppliers_data(rounds = None):
 
-    MANUAL_SUPPLIER_DF = pd.read_excel('data/Suppliers_NEW.xlsx')
+    MANUAL_SUPPLIER_DF = query_rounds(SUPPLIERS_DATA_DIR, 0, rounds)
 
     return MANUAL_SUPPLIER_DF
 
 # ::::::::: MAIN DATA :::::::::
-def read_main_table_tabs(tab_name):
-    MAIN_DATA_DIR = 'data/TFC_MAIN_DATA_R-2to1.xlsx'
-    
-    tab_df = pd.read_excel(MAIN_DATA_DIR, sheet_name = tab_name)
+def read_main_table_tabs(tab_name, rounds = None):
+
+    tab_df = query_rounds(MAIN_DATA_DIR, tab_name, rounds)
+
+    return tab_df
+
+# Bulk version of read_main_table_tabs: all requested tabs (every tab when names is None) from one workbook pass
+def load_main_tables(names = None):
+    sheets = read_workbook(MAIN_DATA_DIR)
+
+    if names is None:
+        names = list(sheets)
 
-    return tab_df 
\ No newline at end of file
+    return {name: sheets[name].copy(deep = False) for name in names}
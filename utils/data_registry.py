@@ -0,0 +1,183 @@
+import contextlib
+import functools
+import os
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+from utils.data_loader import FINANCE_DATA_DIR, load_and_process_finance_data, load_suppliers_data, processed_finance_rounds
+from utils.data_loader import query_rounds, read_main_table_tabs, round_selection, workbook_load_times
+
+
+# ::::::::: DATA REGISTRY :::::::::
+# Every table and derived view a page section can ask for, by name:
+#   { name: {'load': load(data) -> value, 'needs': names of the sources load() finds in `data`} }
+# Names that aren't registered are TFC_MAIN_DATA tabs ('Component', 'Customer - Product', ...).
+# The loaders go through the data_loader caches, so a source is only read or built once per workbook version; a
+# workbook sheet nobody asks for is never loaded at all (see WorkbookSheets).
+# Loaders that can be restricted to some rounds look at current_rounds() (the dashboard's round window, see
+# utils.round_window, or the rounds given to load_data) and only get those rounds (see query_rounds).
+_SOURCES = {}
+
+def register_source(name, load, needs = ()):
+    _SOURCES[name] = {'load': load, 'needs': tuple(needs)}
+
+def _source(name):
+    if name in _SOURCES:
+        return _SOURCES[name]
+    return {'load': lambda data: read_main_table_tabs(name, current_rounds()), 'needs': ()}
+
+def _finance_raw(data):
+    rounds = current_rounds()
+    return data['finance'].raw if rounds is None else query_rounds(FINANCE_DATA_DIR, 0, rounds)
+
+def _finance_processed(data):
+    rounds = current_rounds()
+    return data['finance'].processed if rounds is None else processed_finance_rounds(rounds)
+
+def _finance_wide(data):
+    rounds = current_rounds()
+    wide = data['finance'].tidy['wide']
+    return wide if rounds is None else wide[wide.index.isin(round_selection(rounds))]
+
+register_source('finance', lambda data: load_and_process_finance_data())
+register_source('finance raw', _finance_raw, needs = ['finance'])
+register_source('finance processed', _finance_processed, needs = ['finance'])
+register_source('finance wide', _finance_wide, needs = ['finance'])
+register_source('finance line items', lambda data: data['finance'].tidy['line_items'], needs = ['finance'])
+register_source('manual suppliers', lambda data: load_suppliers_data(current_rounds()))
+
+# `names` and everything they need, in load order (needs first)
+def dependency_set(names):
+    ordered = []
+
+    def visit(name, chain):
+        if name in ordered:
+            return
+        if name in chain:
+            raise ValueError(f"Circular data dependency: {' -> '.join(chain + (name,))}")
+        for need in _source(name)['needs']:
+            visit(need, chain + (name,))
+        ordered.append(name)
+
+    for name in names:
+        visit(name, ())
+
+    return ordered
+
+# ::::::::: DEPENDENCY REPORT :::::::::
+# What every page declared (per section) and what loading it cost:
+#   _DECLARED: { page: { section: [names] } }
+#   _LOADS:    { page: { name: {'seconds': last load, 'total_seconds', 'calls'} } }
+_DECLARED = {}
+_LOADS = {}
+_REPORT_LOCK = threading.Lock()
+
+# The page whose section runs in this thread (see page_section) and the rounds it shows (None: all of them);
+# loads that don't name a page are reported with it
+_CURRENT = threading.local()
+
+def current_rounds():
+    return getattr(_CURRENT, 'rounds', None)
+
+def declare_data(page, section, names):
+    with _REPORT_LOCK:
+        _DECLARED.setdefault(page, {})[section] = list(names)
+
+def _record_load(page, name, seconds):
+    with _REPORT_LOCK:
+        record = _LOADS.setdefault(page, {}).setdefault(name, {'seconds': 0.0, 'total_seconds': 0.0, 'calls': 0})
+        record['seconds'] = seconds
+        record['total_seconds'] += seconds
+        record['calls'] += 1
+
+# ::::::::: EMPTY ROUND WINDOWS :::::::::
+# The window covers the rounds of every workbook together, so it can hold rounds some sources don't have (e.g. a round
+# ingested into the main data that the finance report doesn't have yet). Sections and helpers skip their charts for a
+# source the window left empty and show NO_DATA_MESSAGE instead.
+NO_DATA_MESSAGE = "No data for the selected rounds"
+
+# A frame without rows, a cube (dict of frames) without rows or a tensor without rounds
+def _has_no_rows(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.empty
+    if isinstance(value, dict) and isinstance(value.get('rounds'), list):
+        return not value['rounds']
+    if isinstance(value, dict) and value and all(isinstance(view, pd.DataFrame) for view in value.values()):
+        return all(view.empty for view in value.values())
+    return False
+
+# The names in `data` ({name: value} from load_data) that the current round window left empty; none without a window
+def missing_in_window(data, names = None):
+    if current_rounds() is None:
+        return []
+    return [name for name in (data if names is None else names) if _has_no_rows(data[name])]
+
+# Loads the sources (and what they need) and returns {name: value} with all of them. `rounds` narrows the sources
+# that can be narrowed down to those rounds (a (first, last) range or a collection); by default the current ones.
+def load_data(names, page = None, rounds = None):
+    if page is None:
+        page = getattr(_CURRENT, 'page', None)
+    if rounds is None:
+        rounds = current_rounds()
+
+    data = {}
+    with running_page(page, rounds):
+        for name in dependency_set(names):
+            start = time.perf_counter()
+            data[name] = _source(name)['load'](data)
+            _record_load(page, name, time.perf_counter() - start)
+
+    return data
+
+@contextlib.contextmanager
+def running_page(page, rounds = None):
+    previous = (getattr(_CURRENT, 'page', None), getattr(_CURRENT, 'rounds', None))
+    _CURRENT.page, _CURRENT.rounds = page, rounds
+    try:
+        yield
+    finally:
+        _CURRENT.page, _CURRENT.rounds = previous
+
+# For helpers outside a section (sections declare theirs in page_section): the function gets the loaded
+# {name: value} as its first argument, and isn't called when the round window left one of them empty
+def uses_data(*names):
+    def decorator(function):
+        page = os.path.basename(function.__code__.co_filename)
+        declare_data(page, function.__name__, names)
+
+        @functools.wraps(function)
+        def with_data(*args, **kwargs):
+            data = load_data(names, page)
+            if missing_in_window(data, names):
+                st.info(NO_DATA_MESSAGE)
+                return None
+            return function(data, *args, **kwargs)
+
+        return with_data
+
+    return decorator
+
+# Per page: the declared sources per section (with everything they need) and the seconds each source took the
+# last time it was loaded; 'seconds' adds those up, i.e. what one run of the page spends getting its data.
+# 'sheets' shows which workbook sheets the process has loaded so far and how long each took.
+def dependency_report(page = None):
+    with _REPORT_LOCK:
+        report = {}
+        for page_name in sorted(set(_DECLARED) | set(_LOADS)):
+            if page is not None and page_name != page:
+                continue
+
+            loads = {name: dict(record) for name, record in _LOADS.get(page_name, {}).items()}
+            report[page_name] = {
+                'sections': {
+                    section: dependency_set(names)
+                    for section, names in _DECLARED.get(page_name, {}).items()
+                },
+                'sources': loads,
+                'seconds': sum(record['seconds'] for record in loads.values()),
+            }
+
+    return {'pages': report, 'sheets': workbook_load_times()}
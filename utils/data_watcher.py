@@ -0,0 +1,117 @@
+import os
+import threading
+
+import streamlit as st
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+from utils.data_loader import DATA_DIR, FINANCE_DATA_DIR, MAIN_DATA_DIR, SUPPLIERS_DATA_DIR
+from utils.data_loader import last_reload_id, reload_events, reload_workbook
+from utils.round_store import ROUND_STORE_DIR, manifest_path
+
+
+# ::::::::: HOT RELOAD OF THE DATA FOLDER :::::::::
+# A watchdog observer (one per process) follows the data folder. When one of the workbooks is written, it waits
+# until the file has been quiet for GSC_WATCH_DEBOUNCE seconds (an export is written in several steps, and Excel
+# saves through a temporary file) and reloads it in the background with reload_workbook: only the views and
+# figures of the sheets whose content changed are thrown away, the rest of the caches stay warm.
+# Ingesting a round (utils.round_store) rewrites the store's manifest, which reloads every workbook the same way.
+# Set GSC_WATCH_DATA=0 to turn it off; the workbooks are then still checked on every rerun (see read_workbook).
+WATCH_DATA = os.environ.get('GSC_WATCH_DATA', '1') != '0'
+WATCH_DEBOUNCE = float(os.environ.get('GSC_WATCH_DEBOUNCE', '1.0'))
+
+WATCHED_FILES = [FINANCE_DATA_DIR, SUPPLIERS_DATA_DIR, MAIN_DATA_DIR]
+
+_OBSERVER = None
+_OBSERVER_LOCK = threading.Lock()
+
+class _WorkbookChanges(FileSystemEventHandler):
+
+    def __init__(self, paths, debounce):
+        self.paths = {os.path.abspath(path): [path] for path in paths}
+        self.paths[os.path.abspath(manifest_path())] = list(paths)
+        self.debounce = debounce
+        self._timers = {}
+        self._lock = threading.Lock()
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+
+        # A save through a temporary file ends with a move onto the workbook
+        for changed_path in (event.src_path, getattr(event, 'dest_path', '')):
+            for path in self.paths.get(os.path.abspath(changed_path), []) if changed_path else []:
+                self._schedule(path)
+
+    def _schedule(self, path):
+        with self._lock:
+            timer = self._timers.get(path)
+            if timer is not None:
+                timer.cancel()
+
+            timer = threading.Timer(self.debounce, self._reload, args = (path,))
+            timer.daemon = True
+            self._timers[path] = timer
+            timer.start()
+
+    def _reload(self, path):
+        with self._lock:
+            self._timers.pop(path, None)
+
+        try:
+            reload_workbook(path)
+        except OSError:
+            pass  # Deleted or moved away; the pages keep the last version they had
+
+def start_data_watcher(data_dir = DATA_DIR, paths = None, debounce = WATCH_DEBOUNCE):
+    global _OBSERVER
+
+    with _OBSERVER_LOCK:
+        if _OBSERVER is None and os.path.isdir(data_dir):
+            observer = Observer()
+            observer.daemon = True
+            handler = _WorkbookChanges(paths or WATCHED_FILES, debounce)
+            # Recursive, so the round store is followed even when the first ingestion creates it after the start
+            # (it lives in the data folder, unless another data_dir is given)
+            observer.schedule(handler, data_dir, recursive = True)
+            data_root = os.path.abspath(data_dir)
+            store_parent = os.path.dirname(os.path.abspath(ROUND_STORE_DIR))
+            if os.path.commonpath([store_parent, data_root]) != data_root and os.path.isdir(store_parent):
+                observer.schedule(handler, store_parent, recursive = True)
+            observer.start()
+            _OBSERVER = observer
+
+        return _OBSERVER
+
+def stop_data_watcher():
+    global _OBSERVER
+
+    with _OBSERVER_LOCK:
+        if _OBSERVER is not None:
+            _OBSERVER.stop()
+            _OBSERVER.join()
+            _OBSERVER = None
+
+# ::::::::: RELOAD NOTICE :::::::::
+# Called at the top of every page: makes sure the watcher runs and tells the session which workbooks changed since
+# its last run (or couldn't be read). A new session starts at the latest event, it already gets the current data.
+def data_reload_notice(key = 'data_reload_seen'):
+    if WATCH_DATA:
+        start_data_watcher()
+
+    if key not in st.session_state:
+        st.session_state[key] = last_reload_id()
+        return []
+
+    events = reload_events(after = st.session_state[key])
+    for event in events:
+        if event['error'] is not None:
+            st.toast(f"⚠️ {os.path.basename(event['path'])} couldn't be read, showing the last version ({event['error']})")
+            continue
+        changed = ', '.join(event['changed'] + event['added'] + event['removed']) or 'no loaded sheets'
+        st.toast(f"🔄 {os.path.basename(event['path'])} was updated ({changed})")
+
+    if events:
+        st.session_state[key] = events[-1]['id']
+
+    return events
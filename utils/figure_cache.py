@@ -0,0 +1,126 @@
+import functools
+import json
+import threading
+from collections import OrderedDict
+
+import plotly.io
+import streamlit as st
+
+try:
+    from streamlit.proto.PlotlyChart_pb2 import PlotlyChart as PlotlyChartProto
+except ImportError:
+    PlotlyChartProto = None  # See plotly_chart
+
+from utils.data_loader import on_reload, sheet_version, workbook_version
+from utils.data_registry import current_rounds
+
+
+# ::::::::: PLOTLY FIGURE CACHE :::::::::
+# Pure figure builders (same arguments + same data = same figure) decorated with figure_cache(*data_sources) return
+# the serialized figure instead of a go.Figure. A data source is a workbook path, or a (path, sheet_name) pair when
+# the figure only depends on that sheet. The JSON is cached under
+#   (builder, arguments, round window, version of every data source)
+# so a rerun that doesn't touch a chart (e.g. moving a slider elsewhere on the page) doesn't rebuild it, and a new
+# version of its data builds it again; a new workbook that leaves the sheet alone keeps the figure. The arguments
+# have to be hashable. Figures cached under a version a reload replaced are dropped right away.
+# The cache is shared by every page and session; the least recently used figures are dropped once there are more
+# than FIGURE_CACHE_MAX_ENTRIES of them or they take more than FIGURE_CACHE_MAX_BYTES.
+FIGURE_CACHE_MAX_ENTRIES = 256
+FIGURE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+_FIGURE_CACHE = OrderedDict()
+_FIGURE_CACHE_LOCK = threading.Lock()
+_FIGURE_CACHE_STATS = {'hits': 0, 'misses': 0, 'evictions': 0, 'bytes': 0}
+
+def _cache_get(key):
+    with _FIGURE_CACHE_LOCK:
+        spec = _FIGURE_CACHE.get(key)
+        if spec is None:
+            _FIGURE_CACHE_STATS['misses'] += 1
+            return None
+
+        _FIGURE_CACHE.move_to_end(key)
+        _FIGURE_CACHE_STATS['hits'] += 1
+        return spec
+
+def _cache_put(key, spec):
+    with _FIGURE_CACHE_LOCK:
+        old_spec = _FIGURE_CACHE.pop(key, None)
+        if old_spec is not None:
+            _FIGURE_CACHE_STATS['bytes'] -= len(old_spec)
+
+        _FIGURE_CACHE[key] = spec
+        _FIGURE_CACHE_STATS['bytes'] += len(spec)
+
+        # Never drop the figure that was just built, even if it's bigger than the cap on its own
+        while len(_FIGURE_CACHE) > 1 and (
+            len(_FIGURE_CACHE) > FIGURE_CACHE_MAX_ENTRIES or _FIGURE_CACHE_STATS['bytes'] > FIGURE_CACHE_MAX_BYTES
+        ):
+            _, evicted_spec = _FIGURE_CACHE.popitem(last = False)
+            _FIGURE_CACHE_STATS['bytes'] -= len(evicted_spec)
+            _FIGURE_CACHE_STATS['evictions'] += 1
+
+def _data_version(source):
+    if isinstance(source, tuple):
+        return sheet_version(*source)
+    return workbook_version(source)
+
+@on_reload
+def _drop_stale_figures(event):
+    stale_versions = set(event['stale_versions'])
+
+    with _FIGURE_CACHE_LOCK:
+        for key in [key for key in _FIGURE_CACHE if stale_versions.intersection(key[-1])]:
+            _FIGURE_CACHE_STATS['bytes'] -= len(_FIGURE_CACHE.pop(key))
+
+def figure_cache(*data_sources):
+    def decorator(build):
+        @functools.wraps(build)
+        def cached_build(*args, **kwargs):
+            # Pages are all run as __main__, so the file tells builders with the same name apart, and the code
+            # object makes an edited builder miss the cache
+            key = (
+                build.__code__.co_filename,
+                build.__code__,
+                args,
+                tuple(sorted(kwargs.items())),
+                tuple(current_rounds() or ()),
+                tuple(_data_version(source) for source in data_sources),
+            )
+
+            spec = _cache_get(key)
+            if spec is None:
+                spec = plotly.io.to_json(build(*args, **kwargs), validate = False)
+                _cache_put(key, spec)
+
+            return spec
+
+        return cached_build
+
+    return decorator
+
+# st.plotly_chart for a figure_cache result: the cached JSON goes to the frontend as it is, without turning it
+# back into a validated go.Figure first (that takes longer than building most of the figures). Sending the proto
+# ourselves goes through Streamlit internals (pinned in requirements.txt); when a Streamlit version doesn't have
+# them, the chart takes the regular st.plotly_chart path.
+def plotly_chart(spec, use_container_width = False, theme = "streamlit"):
+    enqueue = getattr(getattr(st, '_main', None), '_enqueue', None)
+    if PlotlyChartProto is None or enqueue is None:
+        return st.plotly_chart(json.loads(spec), use_container_width = use_container_width, theme = theme)
+
+    proto = PlotlyChartProto()
+    proto.use_container_width = use_container_width
+    proto.figure.spec = spec
+    proto.figure.config = json.dumps({'showLink': False, 'linkText': False})
+    proto.theme = theme or ""
+
+    return enqueue("plotly_chart", proto)
+
+def figure_cache_stats():
+    with _FIGURE_CACHE_LOCK:
+        return {**_FIGURE_CACHE_STATS, 'figures': len(_FIGURE_CACHE)}
+
+def clear_figure_cache():
+    with _FIGURE_CACHE_LOCK:
+        _FIGURE_CACHE.clear()
+        _FIGURE_CACHE_STATS.update({'hits': 0, 'misses': 0, 'evictions': 0, 'bytes': 0})
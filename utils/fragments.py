@@ -0,0 +1,80 @@
+import collections
+import functools
+import json
+import os
+import threading
+import time
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from utils.data_registry import NO_DATA_MESSAGE, declare_data, load_data, missing_in_window, running_page
+from utils.round_window import selected_rounds
+
+
+# ::::::::: PAGE SECTIONS :::::::::
+# Every section of a page (a function drawing a subheader and its charts) is decorated with page_section(name), which
+# times it (see the interaction log below). Sections run as normal functions: a widget still reruns the whole page,
+# and the data and figure caches keep the sections it didn't touch cheap.
+# page_section(name, data = [...]) declares the tables and views (see utils.data_registry) the section uses: they are
+# loaded when the section runs, for the rounds of the round window (utils.round_window), and passed to it as its
+# first argument, {name: value}. When the window leaves one of them without rows, a notice is shown instead.
+
+# ::::::::: INTERACTION TIMING LOG :::::::::
+# Each time a section runs it logs {'time', 'session', 'page', 'section', 'seconds'}, so every rerun shows which
+# sections took the time. The last INTERACTION_LOG_SIZE records are kept in memory (interaction_log());
+# GSC_INTERACTION_LOG=<path> also appends them to a JSON lines file.
+INTERACTION_LOG_SIZE = 1000
+INTERACTION_LOG_PATH = os.environ.get('GSC_INTERACTION_LOG')
+
+_INTERACTION_LOG = collections.deque(maxlen = INTERACTION_LOG_SIZE)
+_INTERACTION_LOG_LOCK = threading.Lock()
+
+def _log_section_run(page, section, seconds):
+    ctx = get_script_run_ctx()
+
+    record = {
+        'time': time.time(),
+        'session': ctx.session_id if ctx is not None else None,
+        'page': page,
+        'section': section,
+        'seconds': seconds,
+    }
+
+    with _INTERACTION_LOG_LOCK:
+        _INTERACTION_LOG.append(record)
+
+        if INTERACTION_LOG_PATH:
+            with open(INTERACTION_LOG_PATH, 'a', encoding = 'utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+
+def page_section(name, data = ()):
+    def decorator(section):
+        # Every page runs as __main__, the file name tells them apart
+        page = os.path.basename(section.__code__.co_filename)
+        if data:
+            declare_data(page, name, data)
+
+        @functools.wraps(section)
+        def timed_section(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                with running_page(page, selected_rounds()):
+                    if not data:
+                        return section(*args, **kwargs)
+
+                    loaded = load_data(data, page)
+                    if missing_in_window(loaded, data):
+                        st.info(f"{name.capitalize()}: {NO_DATA_MESSAGE.lower()}")
+                        return None
+                    return section(loaded, *args, **kwargs)
+            finally:
+                _log_section_run(page, name, time.perf_counter() - start)
+
+        return timed_section
+
+    return decorator
+
+def interaction_log(session = None):
+    with _INTERACTION_LOG_LOCK:
+        return [record for record in _INTERACTION_LOG if session is None or record['session'] == session]
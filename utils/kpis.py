@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+
+# ::::::::: DERIVED RATIO KPI's :::::::::
+# Ratios between two columns of a tab, computed with column arithmetic instead of a row-wise apply:
+#   kpi name: (numerator column, denominator column)
+KPI_RATIOS = {
+    'Transport%': ('Transport costs previous round', 'Purchase value previous round'),
+    'Delivery cost': ('Transport costs previous round', 'Order lines previous round'),
+    'Demand units per orderline': ('Demand per week (units)', 'Order lines per week'),
+}
+
+# numerator / denominator, with `fill` where the denominator is 0 (a round without purchases costs 0%, not inf).
+# Missing values stay missing.
+def safe_divide(numerator, denominator, fill = 0.0):
+    numerator = np.asarray(numerator, dtype = float)
+    denominator = np.asarray(denominator, dtype = float)
+
+    result = np.full(numerator.shape, fill, dtype = float)
+    np.divide(numerator, denominator, out = result, where = denominator != 0)
+
+    return result
+
+def compute_kpi(df, kpi_name, fill = 0.0):
+    numerator_col, denominator_col = KPI_RATIOS[kpi_name]
+    return pd.Series(safe_divide(df[numerator_col], df[denominator_col], fill), index = df.index, name = kpi_name)
+
+# Returns df with the kpi columns added (df itself is not changed)
+def add_kpis(df, kpi_names, fill = 0.0):
+    return df.assign(**{kpi_name: compute_kpi(df, kpi_name, fill) for kpi_name in kpi_names})
@@ -0,0 +1,42 @@
+import streamlit as st
+
+from utils.data_registry import load_data
+
+
+# ::::::::: LAZY TABS :::::::::
+# st.tabs sends the content of every tab to the browser, so a page computes every round (or customer) on each
+# rerun while only one of them is visible. lazy_tabs shows the same row of labels as a horizontal radio and only
+# calls render(option) for the selected one; picking another tab reruns the page and renders just that one.
+# Whatever render builds should come from a cache (cached_view and friends), so a tab that has been shown before
+# is not computed again. With index = None nothing is selected (or rendered) until the user picks a tab.
+def lazy_tabs(options, render, key, format_func = str, index = 0):
+    options = list(options)
+
+    if not options:
+        return None
+
+    selected = st.radio(
+        key,
+        options,
+        index = index,
+        format_func = format_func,
+        horizontal = True,
+        key = key,
+        label_visibility = 'collapsed',
+    )
+
+    if selected is not None:
+        render(selected)
+
+    return selected
+
+# ::::::::: TABLE PREVIEWS :::::::::
+# The raw tables a page is built from, {label: data source name (see utils.data_registry)}, in one expander. A
+# collapsed expander still runs and sends its content, so the tables are behind lazy tabs with nothing selected:
+# a table is only loaded and sent once it is picked.
+def table_previews(tables, key, title = "Tables utilized"):
+    def show_table(label):
+        st.write(load_data([tables[label]])[tables[label]])
+
+    with st.expander(title):
+        lazy_tabs(list(tables), show_table, key = key, index = None)
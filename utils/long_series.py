@@ -0,0 +1,131 @@
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+
+# ::::::::: LONG SERIES MODE :::::::::
+# A handful of rounds is drawn as usual. Once a line trace has more than LONG_SERIES_POINTS points (e.g. a
+# week-level simulation log) long_series_figure() switches it to WebGL (go.Scattergl) and keeps only
+# LONG_SERIES_POINTS of its points, picked with largest-triangle-three-buckets so the shape of the line stays.
+# The kept points are real data points, so every hover value is exact. Per-point text labels, annotations on
+# dropped points and explicit tick lists go too; they would cost more than the line itself.
+LONG_SERIES_POINTS = int(os.environ.get('GSC_LONG_SERIES_POINTS', 2000))
+
+# Per-point trace properties that have to be thinned out together with x and y
+_POINT_PROPERTIES = ['x', 'y', 'text', 'hovertext', 'customdata', 'ids']
+_MARKER_POINT_PROPERTIES = ['color', 'size', 'symbol', 'opacity']
+
+def _numeric_positions(values):
+    values = pd.Series(values)
+
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype = float)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype('int64').to_numpy(dtype = float)
+
+    # Categories: only their order counts
+    return np.arange(len(values), dtype = float)
+
+# Indices of the n_out points that largest-triangle-three-buckets keeps (always the first and the last)
+def lttb_indices(x, y, n_out):
+    x = np.asarray(x, dtype = float)
+    y = np.asarray(y, dtype = float)
+    n = len(y)
+
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 buckets between the first and the last point
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+
+    indices = np.empty(n_out, dtype = int)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    selected = 0
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN buckets
+
+        for bucket in range(n_out - 2):
+            start, end = edges[bucket], edges[bucket + 1]
+
+            # The third corner of the triangle: the average of the next bucket (the last point for the last one)
+            if bucket == n_out - 3:
+                next_x, next_y = x[-1], y[-1]
+            else:
+                next_end = edges[bucket + 2]
+                next_x, next_y = np.nanmean(x[end:next_end]), np.nanmean(y[end:next_end])
+
+            area = np.abs(
+                (x[selected] - next_x) * (y[start:end] - y[selected])
+                - (x[selected] - x[start:end]) * (next_y - y[selected])
+            )
+            selected = start + int(np.argmax(np.nan_to_num(area, nan = -1.0)))
+            indices[bucket + 1] = selected
+
+    return indices
+
+def _take_points(props, indices, n_points):
+    for key in _POINT_PROPERTIES:
+        values = props.get(key)
+        if values is not None and not isinstance(values, str) and len(values) == n_points:
+            props[key] = np.asarray(values, dtype = object if key != 'y' else None)[indices]
+
+    marker = props.get('marker') or {}
+    for key in _MARKER_POINT_PROPERTIES:
+        values = marker.get(key)
+        if values is not None and not isinstance(values, (str, int, float)) and len(values) == n_points:
+            marker[key] = np.asarray(values)[indices]
+
+def _long_trace(trace, max_points):
+    props = trace.to_plotly_json()
+    props.pop('type', None)
+
+    n_points = len(props['y'])
+
+    # A trace with only y is drawn at x0, x0 + dx, ...; the thinned out points have to keep those positions
+    if props.get('x') is None:
+        props['x'] = props.pop('x0', 0) + props.pop('dx', 1) * np.arange(n_points)
+
+    indices = lttb_indices(_numeric_positions(props['x']), props['y'], max_points)
+    _take_points(props, indices, n_points)
+
+    # No per-point text labels on thousands of points
+    mode = props.get('mode')
+    if mode:
+        props['mode'] = '+'.join(part for part in mode.split('+') if part != 'text') or 'lines'
+    props.pop('texttemplate', None)
+    props.pop('textposition', None)
+
+    return go.Scattergl(**props)
+
+def _is_long_line(trace, max_points):
+    # plotly express already makes long lines Scattergl by itself, they still need thinning out
+    return trace.type in ('scatter', 'scattergl') and trace.y is not None and len(trace.y) > max_points
+
+def long_series_figure(fig, max_points = None):
+    if max_points is None:
+        max_points = LONG_SERIES_POINTS
+
+    if not any(_is_long_line(trace, max_points) for trace in fig.data):
+        return fig
+
+    traces = [_long_trace(trace, max_points) if _is_long_line(trace, max_points) else trace for trace in fig.data]
+
+    # Only keep the annotations of points that are still drawn (filtered before plotly validates them)
+    kept_x = set()
+    for trace in traces:
+        if trace.x is not None:
+            kept_x.update(trace.x)
+
+    layout = fig.layout.to_plotly_json()
+    layout['annotations'] = [annotation for annotation in layout.get('annotations', []) if annotation.get('x') in kept_x]
+    for axis_name, axis in layout.items():
+        if axis_name.startswith('xaxis'):
+            axis.pop('tickvals', None)
+            axis.pop('ticktext', None)
+
+    return go.Figure(data = traces, layout = layout)
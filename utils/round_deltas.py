@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from utils.data_loader import cached_view
+
+
+# ::::::::: ROUND OVER ROUND DELTAS :::::::::
+# Colours the cells of an entity x round table (rows: entities or measures, columns: rounds in order) by how much
+# they changed since the previous round, for the whole table at once:
+# - up more than threshold %   -> red
+# - down more than threshold % -> green
+# - previous round was 0       -> green
+# The first round and cells after an empty one stay uncoloured.
+INCREASE_CSS = 'background-color: rgba(255, 77, 109, 0.4)'  # Red color
+DECREASE_CSS = 'background-color: rgba(0, 255, 0, 0.4)'  # Green color
+
+def round_over_round_change(values):
+    values = np.asarray(values, dtype = float)
+
+    change = np.full(values.shape, np.nan)
+    previous = values[:, :-1]
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        change[:, 1:] = (values[:, 1:] - previous) / previous * 100
+
+    return change
+
+def round_delta_css(values, threshold):
+    values = np.asarray(values, dtype = float)
+    change = round_over_round_change(values)
+
+    css = np.full(values.shape, '', dtype = object)
+    css[change > threshold] = INCREASE_CSS
+    css[change < -threshold] = DECREASE_CSS
+    css[:, 1:][values[:, :-1] == 0] = DECREASE_CSS
+
+    return css
+
+def round_delta_frame(table_df, threshold):
+    return pd.DataFrame(round_delta_css(table_df, threshold), index = table_df.index, columns = table_df.columns)
+
+# build_table(sheets) gives the entity x round table; its colours are kept per threshold and workbook version
+def cached_round_deltas(path, table_name, build_table, threshold):
+    return cached_view(
+        path,
+        f"round_deltas:{table_name}:{threshold}",
+        lambda sheets: round_delta_frame(build_table(sheets), threshold)
+    )
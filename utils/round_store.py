@@ -0,0 +1,337 @@
+import os
+import io
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from utils.data_dirs import ROUND_STORE_DIR
+from utils.snapshot_store import column_labels, read_sheet_table, sheet_table, write_json, write_sheet_table
+
+
+# ::::::::: ROUND-PARTITIONED STORE :::::::::
+# The exports come in per round, so instead of one workbook that is parsed again as a whole every time a round is
+# added, every sheet of a workbook is kept as one Feather file per round:
+#   <data dir>/.rounds/<workbook>/r<round>/<nn>-<hash>.feather
+# Sheets with a numeric 'Round' column are split by rows (main tables, suppliers); sheets with one column per round
+# are split by columns (the finance report: the line item column(s) once, plus one column per round).
+# The manifest is keyed by the path of the workbook the store stands in for:
+#   { workbook path: {
+#       'order': [sheet names],
+#       'sheets': {sheet_name: {'layout': 'rows' | 'columns', 'columns': [...], 'template': file, 'labels': file | None}},
+#       'rounds': {round: {'export': file name, 'sheets': {sheet_name: {'file': file, 'hash': sha1}}}},
+#       'seed': sha1 of the workbook file the history came from,
+#   } }
+# 'template' is the sheet without rows (its columns and dtypes, which new exports are checked against) and 'labels'
+# the line item column(s) of a column-split sheet. Every partition has the hash of its content, so the loader knows
+# which rounds of which sheets changed without reading them (see utils.data_loader.RoundStoreSheets).
+MANIFEST_FILE = 'manifest.json'
+
+# An export that doesn't fit the workbook it is ingested into
+class SchemaError(ValueError):
+    pass
+
+# An export with other content for rounds that another export stored: {round: the export that stored it}
+class RoundConflict(SchemaError):
+    def __init__(self, conflicts):
+        self.conflicts = conflicts
+        rounds = ', '.join(f"round {round_number} (from {export})" for round_number, export in sorted(conflicts.items()))
+        super().__init__(f"other content for rounds already stored: {rounds}")
+
+def manifest_path(store_dir = ROUND_STORE_DIR):
+    return os.path.join(store_dir, MANIFEST_FILE)
+
+def read_store_manifest(store_dir = ROUND_STORE_DIR):
+    try:
+        with open(manifest_path(store_dir), encoding = 'utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_store_manifest(manifest, store_dir):
+    write_json(manifest_path(store_dir), manifest)
+
+def store_entry(workbook_path, store_dir = ROUND_STORE_DIR):
+    return read_store_manifest(store_dir).get(workbook_path)
+
+def _table_hash(table):
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return hashlib.sha1(sink.getvalue()).hexdigest()
+
+# ::::::::: SPLITTING A SHEET INTO ROUNDS :::::::::
+def _is_round_label(col):
+    return isinstance(col, (int, np.integer)) and not isinstance(col, bool)
+
+def sheet_layout(sheet_df):
+    if 'Round' in sheet_df.columns and (pd.api.types.is_numeric_dtype(sheet_df['Round']) or sheet_df.empty):
+        return 'rows'
+    if any(_is_round_label(col) for col in sheet_df.columns):
+        return 'columns'
+    raise SchemaError("no 'Round' column and no round columns")
+
+# The sheet's rows (or round columns) of the given rounds, for sheets that are not in the store
+def filter_rounds(sheet_df, rounds):
+    if sheet_layout(sheet_df) == 'rows':
+        return sheet_df[sheet_df['Round'].isin(rounds)].reset_index(drop = True)
+    return sheet_df[[col for col in sheet_df.columns if not _is_round_label(col) or col in rounds]]
+
+# The rounds a sheet has data for, in order
+def sheet_round_labels(sheet_df):
+    if sheet_layout(sheet_df) == 'rows':
+        return sorted(int(round_number) for round_number in sheet_df['Round'].dropna().unique())
+    return sorted(int(col) for col in sheet_df.columns if _is_round_label(col))
+
+# {round: the sheet's part for that round}
+def split_rounds(sheet_df, layout):
+    if layout == 'rows':
+        if sheet_df['Round'].isna().any():
+            raise SchemaError("rows without a round")
+        return {
+            int(round_number): round_df.reset_index(drop = True)
+            for round_number, round_df in sheet_df.groupby('Round', sort = True)
+        }
+
+    label_cols = [col for col in sheet_df.columns if not _is_round_label(col)]
+    return {int(col): sheet_df[label_cols + [col]] for col in sorted(col for col in sheet_df.columns if _is_round_label(col))}
+
+def _label_columns(sheet_df):
+    return [col for col in sheet_df.columns if not _is_round_label(col)]
+
+# ::::::::: SCHEMA CHECK :::::::::
+def _check_columns(sheet_name, columns, expected_columns):
+    if columns == expected_columns:
+        return
+
+    missing = [col for col in expected_columns if col not in columns]
+    unknown = [col for col in columns if col not in expected_columns]
+    if missing or unknown:
+        raise SchemaError(f"{sheet_name}: columns don't match the workbook (missing: {missing}, unknown: {unknown})")
+    raise SchemaError(f"{sheet_name}: the columns are in another order than in the workbook")
+
+# An export has to have the workbook's sheets, each with the same columns (a column-split sheet: the same line items
+# and any rounds), and no text where the workbook has numbers
+def validate_export(entry, sheets, store_dir = ROUND_STORE_DIR):
+    missing = [sheet_name for sheet_name in entry['order'] if sheet_name not in sheets]
+    extra = [sheet_name for sheet_name in sheets if sheet_name not in entry['sheets']]
+    if missing or extra:
+        raise SchemaError(f"sheets don't match the workbook (missing: {missing}, unknown: {extra})")
+
+    for sheet_name in entry['order']:
+        sheet_entry = entry['sheets'][sheet_name]
+        sheet_df = sheets[sheet_name]
+        template = _read_store_file(store_dir, sheet_entry['template'], sheet_entry['columns'])
+
+        if sheet_entry['layout'] == 'rows':
+            _check_columns(sheet_name, column_labels(sheet_df), sheet_entry['columns'])
+            if not sheet_df.empty and not pd.api.types.is_numeric_dtype(sheet_df['Round']):
+                raise SchemaError(f"{sheet_name}: 'Round' is not numeric")
+        else:
+            label_cols = _label_columns(sheet_df)
+            _check_columns(sheet_name, column_labels(sheet_df[label_cols]), sheet_entry['columns'])
+            labels = _read_store_file(store_dir, sheet_entry['labels'], sheet_entry['columns'])
+            if not sheet_df[label_cols].reset_index(drop = True).equals(labels):
+                raise SchemaError(f"{sheet_name}: the line items differ from the workbook's")
+            continue
+
+        for col in template.columns[template.dtypes != object]:
+            values = sheet_df[col]
+            if not pd.api.types.is_numeric_dtype(values) and values.notna().any():
+                raise SchemaError(f"{sheet_name}: '{col}' has text where the workbook has numbers")
+
+# ::::::::: WRITING :::::::::
+def _store_key(workbook_path):
+    return os.path.splitext(os.path.basename(workbook_path))[0]
+
+def _read_store_file(store_dir, file, columns):
+    return read_sheet_table(os.path.join(store_dir, file), columns)
+
+def _write_store_file(store_dir, file, table):
+    path = os.path.join(store_dir, file)
+    os.makedirs(os.path.dirname(path), exist_ok = True)
+    write_sheet_table(table, path)
+
+def _new_entry(workbook_path, sheets, store_dir):
+    key = _store_key(workbook_path)
+    entry = {'order': list(sheets), 'sheets': {}, 'rounds': {}}
+
+    for i, (sheet_name, sheet_df) in enumerate(sheets.items()):
+        layout = sheet_layout(sheet_df)
+        schema_df = sheet_df[_label_columns(sheet_df)] if layout == 'columns' else sheet_df
+
+        sheet_entry = {
+            'layout': layout,
+            'columns': column_labels(schema_df),
+            'template': f"{key}/{i:02d}-template.feather",
+            'labels': f"{key}/{i:02d}-labels.feather" if layout == 'columns' else None,
+        }
+        _write_store_file(store_dir, sheet_entry['template'], sheet_table(schema_df.iloc[:0]))
+        if layout == 'columns':
+            _write_store_file(store_dir, sheet_entry['labels'], sheet_table(schema_df.reset_index(drop = True)))
+
+        entry['sheets'][sheet_name] = sheet_entry
+
+    return entry
+
+# Stores every round of `sheets` (parsed sheets of a workbook or of an export) as partitions of `workbook_path`.
+# The first call takes the schema from the sheets; later ones are checked against it (SchemaError).
+# A round that is already stored only has the sheets rewritten whose content changed. A round another export stored
+# is only overwritten with other content when `replace` is set, else nothing is written (RoundConflict).
+# `seed_hash` is given when `sheets` are the workbook itself (the history the store stands in for) and kept as the
+# entry's 'seed'. A new version of the workbook replaces the rounds that came from the old one: the sheets it doesn't
+# have a round for anymore are dropped from that round, rounds that came from exports stay.
+# Returns {round: [sheet names written]} for the rounds that changed.
+def write_rounds(workbook_path, export_name, sheets, store_dir = ROUND_STORE_DIR, seed_hash = None, replace = False):
+    manifest = read_store_manifest(store_dir)
+    entry = manifest.get(workbook_path)
+
+    if entry is None:
+        entry = _new_entry(workbook_path, sheets, store_dir)
+    else:
+        validate_export(entry, sheets, store_dir)
+
+    # Every partition is hashed (and checked for conflicts) before the first one is written
+    partitions = []
+    conflicts = {}
+    for i, sheet_name in enumerate(entry['order']):
+        for round_number, round_df in split_rounds(sheets[sheet_name], entry['sheets'][sheet_name]['layout']).items():
+            try:
+                table = sheet_table(round_df)
+            except (pa.ArrowInvalid, pa.ArrowTypeError, ValueError) as error:
+                raise SchemaError(f"{sheet_name}: round {round_number} can't be stored ({error})")
+
+            partition_hash = _table_hash(table)
+            partitions.append((i, sheet_name, round_number, round_df, table, partition_hash))
+
+            round_entry = entry['rounds'].get(str(round_number))
+            old_partition = round_entry['sheets'].get(sheet_name) if round_entry is not None else None
+            if old_partition is not None and old_partition['hash'] != partition_hash and round_entry['export'] != export_name:
+                conflicts.setdefault(round_number, round_entry['export'])
+
+    if conflicts and not replace:
+        raise RoundConflict(conflicts)
+
+    key = _store_key(workbook_path)
+    written = {}
+    replaced_files = []
+    seen = set()
+
+    for i, sheet_name, round_number, round_df, table, partition_hash in partitions:
+        seen.add((str(round_number), sheet_name))
+        round_entry = entry['rounds'].setdefault(str(round_number), {'export': export_name, 'sheets': {}})
+        old_partition = round_entry['sheets'].get(sheet_name)
+        if old_partition is not None and old_partition['hash'] == partition_hash:
+            continue
+
+        # A new name for new content: readers that still have the old file mapped keep their version
+        file = f"{key}/r{round_number}/{i:02d}-{partition_hash[:12]}.feather"
+        _write_store_file(store_dir, file, table)
+
+        if old_partition is not None:
+            replaced_files.append(old_partition['file'])
+        round_entry['sheets'][sheet_name] = {'file': file, 'hash': partition_hash, 'columns': column_labels(round_df)}
+        round_entry['export'] = export_name
+        written.setdefault(round_number, []).append(sheet_name)
+
+    if seed_hash is not None:
+        for round_key, round_entry in list(entry['rounds'].items()):
+            if round_entry['export'] != export_name:
+                continue
+            for sheet_name in [sheet_name for sheet_name in round_entry['sheets'] if (round_key, sheet_name) not in seen]:
+                replaced_files.append(round_entry['sheets'].pop(sheet_name)['file'])
+            if not round_entry['sheets']:
+                del entry['rounds'][round_key]
+        entry['seed'] = seed_hash
+
+    manifest[workbook_path] = entry
+    os.makedirs(store_dir, exist_ok = True)
+    _write_store_manifest(manifest, store_dir)
+
+    for file in replaced_files:
+        try:
+            os.remove(os.path.join(store_dir, file))
+        except OSError:
+            pass
+
+    return written
+
+# Takes the workbook out of the store, e.g. when a new version of it doesn't fit the stored schema anymore
+def drop_store_entry(workbook_path, store_dir = ROUND_STORE_DIR):
+    manifest = read_store_manifest(store_dir)
+    if manifest.pop(workbook_path, None) is None:
+        return
+
+    _write_store_manifest(manifest, store_dir)
+    shutil.rmtree(os.path.join(store_dir, _store_key(workbook_path)), ignore_errors = True)
+
+# ::::::::: READING :::::::::
+def store_rounds(entry):
+    return sorted(int(round_number) for round_number in entry['rounds'])
+
+# [(round, partition hash, load() -> DataFrame)] of one sheet, by round; only the `rounds` ones when given
+def sheet_partitions(entry, sheet_name, store_dir = ROUND_STORE_DIR, rounds = None):
+    partitions = []
+    for round_number in store_rounds(entry):
+        if rounds is not None and round_number not in rounds:
+            continue
+        partition = entry['rounds'][str(round_number)]['sheets'].get(sheet_name)
+        if partition is not None:
+            partitions.append((
+                round_number,
+                partition['hash'],
+                lambda partition = partition: _read_store_file(store_dir, partition['file'], partition['columns']),
+            ))
+    return partitions
+
+# The whole sheet again: the rounds one after the other (row-split) or next to the line items (column-split).
+# Row-split sheets come back sorted by round, the order of the rows inside a round is kept.
+# With `rounds` only those rounds' files are read.
+def read_store_sheet(entry, sheet_name, store_dir = ROUND_STORE_DIR, rounds = None):
+    sheet_entry = entry['sheets'][sheet_name]
+    parts = [load() for _, _, load in sheet_partitions(entry, sheet_name, store_dir, rounds)]
+
+    if sheet_entry['layout'] == 'rows':
+        if not parts:
+            return _read_store_file(store_dir, sheet_entry['template'], sheet_entry['columns'])
+        return pd.concat(parts, ignore_index = True)
+
+    labels = _read_store_file(store_dir, sheet_entry['labels'], sheet_entry['columns'])
+    return pd.concat([labels] + [part.drop(columns = sheet_entry['columns']) for part in parts], axis = 1)
+
+# ::::::::: INGESTION :::::::::
+# Adds round exports to the store (see utils.data_loader.ingest_round_export):
+#   python -m utils.round_store data/TFC_MAIN_DATA_R2.xlsx [--into data/TFC_MAIN_DATA_R-2to1.xlsx] [--replace]
+# An export with other content for rounds that another export stored is reported, and none of it is written.
+def main():
+    from utils.data_loader import ingest_round_export
+    # Run with -m this module is __main__, and the loader raises the RoundConflict of utils.round_store
+    from utils.round_store import RoundConflict
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('exports', nargs = '+')
+    parser.add_argument('--into', help = 'workbook the rounds belong to (default: the one with the same sheets)')
+    parser.add_argument('--replace', action = 'store_true', help = 'overwrite rounds another export stored')
+    args = parser.parse_args()
+
+    conflicts = 0
+    for export_path in args.exports:
+        try:
+            written = ingest_round_export(export_path, args.into, replace = args.replace)
+        except RoundConflict as error:
+            conflicts += 1
+            print(f"{export_path}: nothing written, {error} (--replace to overwrite)")
+            continue
+        changes = ', '.join(f"round {round_number} ({len(sheet_names)} sheets)" for round_number, sheet_names in sorted(written.items()))
+        print(f"{export_path}: {changes or 'nothing new'}")
+
+    if conflicts:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
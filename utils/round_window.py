@@ -0,0 +1,34 @@
+import streamlit as st
+
+from utils.data_loader import available_rounds
+
+
+# ::::::::: ROUND WINDOW :::::::::
+# One (first, last) range of rounds for the whole dashboard, picked in the sidebar of every page. The sections get
+# their tables for those rounds only (see page_section and utils.data_registry.current_rounds), which in the round
+# store means only those rounds are read at all.
+# The choice is kept in the session (not in the widget, whose state Streamlit drops when the page changes), so it
+# follows the user from page to page. A window over every round is stored as None, so rounds that come in later
+# show up without touching the slider.
+ROUND_WINDOW_KEY = 'round_window'
+
+def round_window_selector(label = "Rounds"):
+    rounds = available_rounds()
+    if len(rounds) < 2:
+        return None
+
+    window = st.session_state.get(ROUND_WINDOW_KEY)
+    if window is None or window[0] not in rounds or window[1] not in rounds:
+        window = (rounds[0], rounds[-1])
+
+    first, last = st.sidebar.select_slider(label, options = rounds, value = window)
+
+    st.session_state[ROUND_WINDOW_KEY] = None if (first, last) == (rounds[0], rounds[-1]) else (first, last)
+    return selected_rounds()
+
+# The rounds of the window, or None for all of them
+def selected_rounds():
+    window = st.session_state.get(ROUND_WINDOW_KEY)
+    if window is None:
+        return None
+    return [round_number for round_number in available_rounds() if window[0] <= round_number <= window[1]]
@@ -0,0 +1,184 @@
+import os
+import json
+import shutil
+import contextlib
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows: no lock, a dashboard per team there is rare enough
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from utils.data_dirs import SNAPSHOT_DIR
+
+
+# ::::::::: COLUMNAR SNAPSHOTS OF THE EXCEL INPUTS :::::::::
+# Every sheet of a parsed workbook is written as an uncompressed Feather (Arrow IPC) file, so it can be
+# memory-mapped back without parsing. The manifest is keyed by the sha1 of the source xlsx:
+#   { sha1: {'source': 'data/X.xlsx', 'sheets': [{'name': sheet_name, 'file': '00.feather', 'columns': [...]}]} }
+# (plus 'sources': [paths] when several workbooks have exactly these bytes, see register_snapshots)
+# 'columns' keeps the original column labels, because Arrow only allows string names (the finance report has
+# integer round numbers as headers).
+# Next to the workbooks they come from, or shared by all teams (see utils.data_dirs)
+MANIFEST_FILE = 'manifest.json'
+
+def _manifest_path(snapshot_dir):
+    return os.path.join(snapshot_dir, MANIFEST_FILE)
+
+def read_manifest(snapshot_dir = SNAPSHOT_DIR):
+    try:
+        with open(_manifest_path(snapshot_dir), encoding = 'utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+# Writes to a temporary file first so a reader never sees a half written file (the manifests here and in
+# utils.round_store, the team index of utils.team_ingest)
+def write_json(path, value):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding = 'utf-8') as f:
+        json.dump(value, f, indent = 2, ensure_ascii = False)
+    os.replace(tmp_path, path)
+
+def _write_manifest(manifest, snapshot_dir):
+    write_json(_manifest_path(snapshot_dir), manifest)
+
+# The sheet as an Arrow table with string column names (raises for mixed-type columns, see write_snapshot)
+def sheet_table(sheet_df):
+    table_df = sheet_df.copy(deep = False)
+    table_df.columns = [str(col) for col in table_df.columns]
+    return pa.Table.from_pandas(table_df, preserve_index = False)
+
+# JSON-safe original column labels of the sheet, for read_sheet_table
+def column_labels(sheet_df):
+    return [col.item() if hasattr(col, 'item') else col for col in sheet_df.columns]
+
+def write_sheet_table(table, path):
+    feather.write_feather(table, path, compression = 'uncompressed')
+
+def read_sheet_table(path, columns):
+    # memory_map + split_blocks lets numeric columns be used straight from the mapped file without a copy
+    sheet_df = feather.read_table(path, memory_map = True).to_pandas(split_blocks = True)
+    sheet_df.columns = columns
+
+    # Arrow hands empty cells of text columns back as None, pd.read_excel gives NaN; keep it NaN
+    for col in sheet_df.columns[sheet_df.dtypes == object]:
+        if sheet_df[col].hasnans:
+            sheet_df[col] = sheet_df[col].where(sheet_df[col].notna(), np.nan)
+
+    return sheet_df
+
+# Writes the sheet files of a snapshot without touching the manifest and returns its manifest entry, or None when
+# a sheet can't be snapshotted: Arrow needs one type per column, a sheet with mixed-type cells stays on the Excel
+# path. The files go to a temporary folder that is moved in place, so processes writing the same workbook at the
+# same time (see utils.team_ingest) never see each other's half written files.
+def write_snapshot_files(source_path, file_hash, sheets, snapshot_dir = SNAPSHOT_DIR):
+    try:
+        tables = [sheet_table(sheet_df) for sheet_df in sheets.values()]
+    except (pa.ArrowInvalid, pa.ArrowTypeError, ValueError):
+        return None
+
+    hash_dir = os.path.join(snapshot_dir, file_hash)
+    tmp_dir = f"{hash_dir}.{os.getpid()}.tmp"
+    os.makedirs(tmp_dir, exist_ok = True)
+
+    sheet_entries = []
+    for i, (sheet_name, table) in enumerate(zip(sheets, tables)):
+        file_name = f"{i:02d}.feather"
+        write_sheet_table(table, os.path.join(tmp_dir, file_name))
+        sheet_entries.append({'name': sheet_name, 'file': file_name, 'columns': column_labels(sheets[sheet_name])})
+
+    # The same bytes give the same files: a complete snapshot that is already there is kept
+    if all(os.path.exists(os.path.join(hash_dir, sheet_entry['file'])) for sheet_entry in sheet_entries):
+        shutil.rmtree(tmp_dir, ignore_errors = True)
+    else:
+        shutil.rmtree(hash_dir, ignore_errors = True)
+        try:
+            os.rename(tmp_dir, hash_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors = True)  # Another process moved its copy in first
+
+    return {'source': source_path, 'sheets': sheet_entries}
+
+# Every process that writes snapshots (dashboards of several teams, an ingest run) updates the one manifest; the
+# read-modify-write is done under an exclusive lock where the platform has one
+@contextlib.contextmanager
+def manifest_lock(snapshot_dir):
+    os.makedirs(snapshot_dir, exist_ok = True)
+    with open(_manifest_path(snapshot_dir) + '.lock', 'w') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+# The sources on the version of a snapshot: identical workbooks (e.g. the same export in two team folders) share it
+def snapshot_sources(entry):
+    return entry.get('sources', [entry['source']])
+
+# Adds snapshots to the manifest: [(source_path, file_hash, entry)], where entry comes from write_snapshot_files, or
+# is None for a source that is on a version whose snapshot is already there. The snapshot a source was on before
+# is deleted once no source is on that version anymore.
+def register_snapshots(snapshots, snapshot_dir = SNAPSHOT_DIR):
+    with manifest_lock(snapshot_dir):
+        manifest = read_manifest(snapshot_dir)
+
+        for source_path, file_hash, entry in snapshots:
+            for old_hash, old_entry in list(manifest.items()):
+                if old_hash == file_hash or source_path not in snapshot_sources(old_entry):
+                    continue
+                sources = [source for source in snapshot_sources(old_entry) if source != source_path]
+                if sources:
+                    old_entry.update({'source': sources[0], 'sources': sources})
+                else:
+                    shutil.rmtree(os.path.join(snapshot_dir, old_hash), ignore_errors = True)
+                    del manifest[old_hash]
+
+            if file_hash not in manifest:
+                if entry is None:
+                    continue
+                manifest[file_hash] = entry
+            elif source_path not in snapshot_sources(manifest[file_hash]):
+                manifest[file_hash]['sources'] = snapshot_sources(manifest[file_hash]) + [source_path]
+
+        _write_manifest(manifest, snapshot_dir)
+
+def write_snapshot(source_path, file_hash, sheets, snapshot_dir = SNAPSHOT_DIR):
+    entry = write_snapshot_files(source_path, file_hash, sheets, snapshot_dir)
+    if entry is None:
+        return False
+
+    register_snapshots([(source_path, file_hash, entry)], snapshot_dir)
+    return True
+
+# All sheets of the snapshot, or only `sheet_names` (each sheet is its own file, the others are never opened)
+def load_snapshot(file_hash, snapshot_dir = SNAPSHOT_DIR, sheet_names = None):
+    entry = read_manifest(snapshot_dir).get(file_hash)
+
+    if entry is None:
+        return None
+
+    sheets = {}
+    try:
+        for sheet_entry in entry['sheets']:
+            if sheet_names is not None and sheet_entry['name'] not in sheet_names:
+                continue
+            path = os.path.join(snapshot_dir, file_hash, sheet_entry['file'])
+            sheets[sheet_entry['name']] = read_sheet_table(path, sheet_entry['columns'])
+    except (OSError, pa.ArrowInvalid):
+        return None
+
+    return sheets
+
+# ::::::::: BUILD STEP :::::::::
+# Compiles every <data dir>/*.xlsx into snapshots ahead of time, so even the first page load skips Excel parsing:
+#   python -m utils.snapshot_store
+def main():
+    from utils.data_loader import build_snapshots
+
+    for source_path, built in build_snapshots().items():
+        print(f"{source_path}: {'snapshot written' if built else 'up to date' if built is None else 'kept on Excel (mixed-type columns)'}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+import pandas as pd
+
+from utils.data_loader import SUPPLIERS_DATA_DIR, cached_view
+
+
+# ::::::::: ROUND SUPPLIER REPORT :::::::::
+# HTML table of a round's suppliers, grouped by trade unit:
+#   Trade unit
+#       Supply | Order size | Purchases | Purchase value | Transport costs
+# Every row is formatted column-wise, each trade unit is visited once and the output is joined once at the end.
+CSS_STYLES = """
+                <style>
+                    .column1 {
+                        background-color: rgb(244, 245, 247);
+                        text-align: left;
+                        border-radius: 10px;
+                        padding-left: 20px;
+                        margin-top: 40px;
+                        padding-bottom: 10px;
+                    }
+
+                    .column1 h4 {
+                        color: rgb(0, 0, 0, 1);
+                        padding-top: 10px;
+                    }
+
+                    table {
+                        width: 100%;
+                        border: none!important;
+                    }
+
+
+                    th {
+                        text-align: center;
+                        font-size: 14px;
+                    }
+
+                    tr {
+                        height: 10px;
+                        font-size: 14px;
+                    }
+
+                    table, td, th{
+                        border: none!important;
+                    }
+
+                    td, th {
+                        border: none;
+                        padding-top: 1px!important;
+
+                    }
+
+                    p {
+                        margin: 0;
+                    }
+
+                    .right-align {
+                        text-align: right;
+                    }
+
+                    .left-align {
+                        text-align: left;
+                    }
+
+                    .center-align {
+                        text-align: center;
+                    }
+
+                    .bold {
+                        font-weight: bold;
+                    }
+
+                    .monospace {
+                        font-family: 'Consolas', monospace;
+                    }
+
+                </style>
+            """
+
+TABLE_HEADER = "<div class='column1'><div style='margin-bottom: -35px;'><h4 class='bold monospace'>Round supplier report</h4></div><br><div style='margin-bottom:-10px; margin-top: -4px; padding-right: 20px; padding-top: -5px;'><table cellspacing='0' cellpadding='0'><tr><th class='bold left-align'>Trade unit</th><th class='bold right-align'>Order size</th><th class='bold right-align'>Purchases</th><th class='bold right-align'>Purchase value</th><th class='bold right-align'>Transport costs</th></tr>"
+
+TRADE_UNIT_TEMPLATE = "<tr><th class='bold left-align'>{trade_unit}</th></tr>"
+
+TABLE_FOOTER = "</table></div></div>"
+
+UNKNOWN_TRADE_UNIT = "Unknown"
+
+SUPPLY_COLORS = {
+    'Pack1L': 'rgb(135, 110, 168)',
+    'PET': 'rgb(92, 154, 207)',
+    'Orange': 'rgb(245, 158, 52)',
+    'Mango': 'rgb(165, 213, 89)',
+    'Vitamin C': 'rgb(249, 121, 125)',
+    'Açaí': 'rgb(199, 146, 234)'
+}
+
+# Adds the "," to the numbers for better readability, like f"{x:,}" but for a whole column at once
+def format_thousands(values):
+    parts = values.astype(str).str.partition('.')
+    integer_part = parts[0].str.replace(r'(\d)(?=(\d{3})+$)', r'\1,', regex = True)
+
+    return integer_part + parts[1] + parts[2]
+
+def _cell(values, style = ''):
+    return "<td class='right-align monospace'" + style + ">" + values + "</td>"
+
+def render_supplier_report(df):
+    colors = df['Supply'].map(SUPPLY_COLORS).fillna('black')  # Default color if not found in the mapping
+
+    rows = (
+        "<tr>"
+        + _cell(df['Supply'].astype(str), " style='font-weight: bold; color: " + colors + ";'")
+        + _cell(format_thousands(df['AVG_order_size']))
+        + _cell(format_thousands(df['Deliveries']))
+        + _cell(format_thousands(df['Purchase value']))
+        + _cell(format_thousands(df['Transport costs']))
+        + "</tr>"
+    )
+
+    # Trade units in order of first appearance, each with all of its suppliers; suppliers without one are kept too
+    parts = [CSS_STYLES, TABLE_HEADER]
+    for trade_unit, trade_unit_rows in rows.groupby(df['Trade_unit'], sort = False, dropna = False):
+        parts.append(TRADE_UNIT_TEMPLATE.format(trade_unit = UNKNOWN_TRADE_UNIT if pd.isna(trade_unit) else trade_unit))
+        parts.extend(trade_unit_rows)
+    parts.append(TABLE_FOOTER)
+
+    return "".join(parts)
+
+def _round_rows(suppliers_df, round_number):
+    return suppliers_df[suppliers_df['Round'] == round_number]
+
+# Rendered once per round and version of the suppliers workbook
+def supplier_report_html(round_number):
+    return cached_view(
+        SUPPLIERS_DATA_DIR,
+        f"supplier_report:{round_number}",
+        lambda sheets: render_supplier_report(_round_rows(next(iter(sheets.values())), round_number))
+    )
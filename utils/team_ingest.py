@@ -0,0 +1,223 @@
+import os
+import io
+import sys
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utils.data_dirs import TEAMS_DIR, team_dir, team_snapshot_dir
+from utils.data_loader import FINANCE_DATA_DIR, MAIN_DATA_DIR, SUPPLIERS_DATA_DIR, parse_workbook
+from utils.snapshot_store import manifest_lock, load_snapshot, read_manifest, register_snapshots, write_json, write_snapshot_files
+
+
+# ::::::::: MULTI-TEAM INGESTION :::::::::
+# A teams folder has one sub folder per team with that team's exports, under the same file names as data/:
+#   <teams dir>/<team>/FinanceReport_r1.xlsx, Suppliers_NEW.xlsx, TFC_MAIN_DATA_R-2to1.xlsx
+# ingest_teams() parses every workbook that changed since the last run in a pool of processes (openpyxl parsing is
+# pure Python, one core per workbook) and writes it to the snapshot store all teams share (see utils.data_dirs), so
+# a dashboard started for any team (GSC_TEAMS_DIR + GSC_TEAM) never parses Excel. Workers only write the snapshot
+# files of their workbook; the manifest and the team index are updated once, by the parent, at the end.
+# The team index, next to the manifest, is keyed by team:
+#   { team: { file name: {'path': xlsx, 'stat': [mtime_ns, size], 'hash': sha1, 'status': ...} } }
+# Run from the repository root:
+#   python -m utils.team_ingest TEAMS_DIR [--team NAME ...] [--workers N]
+WORKBOOK_FILES = [os.path.basename(path) for path in (FINANCE_DATA_DIR, SUPPLIERS_DATA_DIR, MAIN_DATA_DIR)]
+TEAM_INDEX_FILE = 'teams.json'
+
+# GSC_INGEST_WORKERS caps the pool (default: one process per core)
+INGEST_WORKERS = int(os.environ.get('GSC_INGEST_WORKERS', '0')) or os.cpu_count() or 1
+
+# {team: [workbook paths]} for every sub folder with at least one of the workbooks, teams sorted by name
+def discover_teams(teams_dir = TEAMS_DIR):
+    teams = {}
+    for team in sorted(os.listdir(teams_dir)):
+        if team.startswith('.') or not os.path.isdir(team_dir(team, teams_dir)):
+            continue
+        paths = [os.path.join(team_dir(team, teams_dir), file_name) for file_name in WORKBOOK_FILES]
+        paths = [path for path in paths if os.path.isfile(path)]
+        if paths:
+            teams[team] = paths
+    return teams
+
+def _team_index_path(teams_dir):
+    return os.path.join(team_snapshot_dir(teams_dir), TEAM_INDEX_FILE)
+
+def read_team_index(teams_dir = TEAMS_DIR):
+    try:
+        with open(_team_index_path(teams_dir), encoding = 'utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_team_index(index, teams_dir):
+    write_json(_team_index_path(teams_dir), index)
+
+def _stat_key(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+# ::::::::: WORKER :::::::::
+# Runs in a pool process: hashes one workbook and, unless the shared store already has these bytes, parses it and
+# writes its snapshot files. Returns the result with the timing of every step:
+#   {'team', 'file', 'path', 'stat', 'hash', 'entry', 'status': 'parsed' | 'cached' | 'excel only' | 'failed',
+#    'error', 'read_seconds', 'parse_seconds', 'write_seconds', 'seconds'}
+def ingest_workbook(team, path, snapshot_dir):
+    start = time.perf_counter()
+    result = {
+        'team': team, 'file': os.path.basename(path), 'path': path, 'stat': None, 'hash': None, 'entry': None,
+        'status': 'failed', 'error': None, 'read_seconds': 0.0, 'parse_seconds': 0.0, 'write_seconds': 0.0,
+    }
+
+    try:
+        result['stat'] = _stat_key(path)
+        with open(path, 'rb') as f:
+            data = f.read()
+        result['hash'] = hashlib.sha1(data).hexdigest()
+        result['read_seconds'] = time.perf_counter() - start
+
+        if result['hash'] in read_manifest(snapshot_dir):
+            result['status'] = 'cached'
+        else:
+            parse_start = time.perf_counter()
+            sheets = parse_workbook(io.BytesIO(data))
+            result['parse_seconds'] = time.perf_counter() - parse_start
+
+            write_start = time.perf_counter()
+            result['entry'] = write_snapshot_files(path, result['hash'], sheets, snapshot_dir)
+            result['write_seconds'] = time.perf_counter() - write_start
+            result['status'] = 'parsed' if result['entry'] is not None else 'excel only'
+    except Exception as error:
+        # Whatever a malformed workbook makes openpyxl or pandas raise, it fails this workbook only
+        result['error'] = f"{type(error).__name__}: {error}"
+
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+def _unchanged_result(team, path, known):
+    return {
+        'team': team, 'file': os.path.basename(path), 'path': path, 'stat': known['stat'], 'hash': known['hash'],
+        'entry': None, 'status': 'cached', 'error': None, 'read_seconds': 0.0, 'parse_seconds': 0.0,
+        'write_seconds': 0.0, 'seconds': 0.0,
+    }
+
+# ::::::::: INGESTION :::::::::
+# Ingests the workbooks of all teams (or of `teams`). Workbooks whose (mtime, size) match the team index aren't even
+# read. `workers` <= 1 runs everything in this process. progress(done, total, result) is called after every workbook.
+# Returns {'teams': [names], 'files': [results without 'entry'], 'workers': n, 'seconds': wall clock}.
+def ingest_teams(teams_dir = TEAMS_DIR, teams = None, workers = INGEST_WORKERS, progress = None):
+    found = discover_teams(teams_dir)
+    if teams is not None:
+        unknown = sorted(set(teams) - set(found))
+        if unknown:
+            raise ValueError(f"{teams_dir}: no workbooks for {', '.join(unknown)}")
+        found = {team: paths for team, paths in found.items() if team in teams}
+
+    snapshot_dir = team_snapshot_dir(teams_dir)
+    os.makedirs(snapshot_dir, exist_ok = True)
+    index = read_team_index(teams_dir)
+    manifest = read_manifest(snapshot_dir)
+
+    start = time.perf_counter()
+    results = []
+    tasks = []
+    for team, paths in found.items():
+        for path in paths:
+            known = index.get(team, {}).get(os.path.basename(path))
+            if known is not None and known['stat'] == _stat_key(path) and known['hash'] in manifest:
+                results.append(_unchanged_result(team, path, known))
+            else:
+                tasks.append((team, path))
+
+    total = len(results) + len(tasks)
+    if progress is not None:
+        for done, result in enumerate(results, 1):
+            progress(done, total, result)
+
+    # Biggest workbooks first, so the pool doesn't end up waiting on one big workbook that started last
+    tasks.sort(key = lambda task: os.path.getsize(task[1]), reverse = True)
+    workers = max(1, min(workers, len(tasks)))
+
+    def collect(result):
+        results.append(result)
+        if progress is not None:
+            progress(len(results), total, result)
+
+    if workers == 1:
+        for team, path in tasks:
+            collect(ingest_workbook(team, path, snapshot_dir))
+    else:
+        with ProcessPoolExecutor(max_workers = workers) as pool:
+            futures = [pool.submit(ingest_workbook, team, path, snapshot_dir) for team, path in tasks]
+            for future in as_completed(futures):
+                collect(future.result())
+
+    register_snapshots([(result['path'], result['hash'], result['entry']) for result in results if result['status'] in ('parsed', 'cached')], snapshot_dir)
+
+    with manifest_lock(snapshot_dir):
+        index = read_team_index(teams_dir)
+        for result in results:
+            if result['status'] != 'failed':
+                index.setdefault(result['team'], {})[result['file']] = {
+                    'path': result['path'], 'stat': result['stat'], 'hash': result['hash'], 'status': result['status'],
+                }
+        _write_team_index(index, teams_dir)
+
+    return {
+        'teams': list(found),
+        'files': [{key: value for key, value in result.items() if key != 'entry'} for result in results],
+        'workers': workers,
+        'seconds': time.perf_counter() - start,
+    }
+
+# The sheets of one team's workbook from the shared store ({sheet_name: DataFrame}, only `sheet_names` if given),
+# e.g. to compare teams outside the dashboard. A workbook that changed since the last ingestion is ingested first.
+def read_team_workbook(team, file_name, sheet_names = None, teams_dir = TEAMS_DIR):
+    path = os.path.join(team_dir(team, teams_dir), file_name)
+
+    known = read_team_index(teams_dir).get(team, {}).get(file_name)
+    if known is None or known['stat'] != _stat_key(path):
+        ingest_teams(teams_dir, teams = [team], workers = 1)
+        known = read_team_index(teams_dir).get(team, {}).get(file_name)
+
+    sheets = None
+    if known is not None and known['status'] != 'excel only':
+        sheets = load_snapshot(known['hash'], team_snapshot_dir(teams_dir), sheet_names)
+
+    return sheets if sheets is not None else parse_workbook(path, sheet_names)
+
+# ::::::::: COMMAND LINE :::::::::
+def _print_progress(done, total, result):
+    timing = f"parsed in {result['parse_seconds']:.2f}s" if result['status'] == 'parsed' else result['status']
+    print(f"[{done:>{len(str(total))}}/{total}] {result['team']}/{result['file']}: {result['error'] or timing}", file = sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('teams_dir')
+    parser.add_argument('--team', action = 'append', dest = 'teams', help = 'only this team (repeatable)')
+    parser.add_argument('--workers', type = int, default = INGEST_WORKERS)
+    args = parser.parse_args()
+
+    summary = ingest_teams(args.teams_dir, args.teams, args.workers, progress = _print_progress)
+
+    files = summary['files']
+    print(f"{'team':<20}{'file':<30}{'status':<12}{'read':>8}{'parse':>8}{'write':>8}")
+    for result in sorted(files, key = lambda result: (result['team'], result['file'])):
+        print(
+            f"{result['team']:<20}{result['file']:<30}{result['status']:<12}"
+            f"{result['read_seconds']:>7.2f}s{result['parse_seconds']:>7.2f}s{result['write_seconds']:>7.2f}s"
+        )
+
+    busy = sum(result['seconds'] for result in files)
+    failed = sum(result['status'] == 'failed' for result in files)
+    print(
+        f"{len(summary['teams'])} teams, {len(files)} workbooks ({failed} failed) in {summary['seconds']:.1f}s "
+        f"with {summary['workers']} workers ({busy:.1f}s of work)"
+    )
+
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+
+# ::::::::: VALUE LABELS :::::::::
+# The bold value written above every point of a line chart. The texts are formatted for a whole array at once
+# and all labels go into the layout in a single update, instead of a format call and fig.add_annotation() per row
+# (which validates the whole annotation list again every time).
+
+# 1234567 -> '1.2M', -4321 -> '-4.3k', 12.34 -> '12.3'
+def format_compact(values, decimals = 1):
+    values = np.asarray(values, dtype = float)
+    if values.size == 0:
+        return np.array([], dtype = str)  # np.char.mod has no string result type for an empty float array
+
+    abs_values = np.abs(values)
+
+    is_million = abs_values >= 1_000_000
+    is_thousand = ~is_million & (abs_values >= 1_000)
+
+    scaled = np.select([is_million, is_thousand], [abs_values / 1_000_000, abs_values / 1_000], abs_values)
+    suffix = np.select([is_million, is_thousand], ['M', 'k'], '')
+    sign = np.where(values < 0, '-', '')
+
+    return np.char.add(np.char.add(sign, np.char.mod(f'%.{decimals}f', scaled)), suffix)
+
+# Always `decimals` decimals: 12.3456 -> '12.3' (decimals = 1)
+def format_fixed(values, decimals = 1):
+    values = np.asarray(values, dtype = float)
+    if values.size == 0:
+        return np.array([], dtype = str)
+
+    return np.char.mod(f'%.{decimals}f', values)
+
+# Rounded, without trailing zeros: 12.3456 -> '12.35', 12.4 -> '12.4' (decimals = 2)
+def format_rounded(values, decimals = 2):
+    return np.round(np.asarray(values, dtype = float), decimals).astype(str)
+
+# As str() gives them, e.g. for the hard-coded values in constants_passer
+def format_plain(values):
+    return pd.Series(list(values), dtype = object).astype(str).to_numpy()
+
+def value_annotations(x, y, texts, suffix = ''):
+    return [
+        dict(
+            x=x_value,
+            y=y_value,
+            xref='x',
+            yref='y',
+            text=f'<b>{text}{suffix}</b>',
+            showarrow=False,
+            font=dict(size=12),
+            xanchor='center',  # Center text horizontally on marker
+            yanchor='bottom',  # Position text above the marker
+            yshift=10  # Adjust vertical position
+        )
+        for x_value, y_value, text in zip(x, y, texts)
+    ]
+
+# Puts the labels on the figure in one layout update
+def add_value_labels(fig, x, y, texts, suffix = ''):
+    fig.update_layout(annotations = list(fig.layout.annotations) + value_annotations(x, y, texts, suffix))
+    return fig
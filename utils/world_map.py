@@ -0,0 +1,145 @@
+import numpy as np
+import plotly.graph_objects as go
+
+from utils.constants_passer import COMPONENT_COLORS
+from utils.data_loader import SUPPLIERS_DATA_DIR, cached_view
+
+
+# ::::::::: SUPPLIER WORLD MAP :::::::::
+# Every supplier gets a dashed route to the factory in the Netherlands and a marker coloured by what it supplies.
+# The map is built from a fixed number of traces, however many suppliers there are:
+# - one trace for the factory
+# - one trace holding every route, the segments separated by None
+# - one marker trace per supply category (which is also its legend entry)
+DESTINATION_NAME = "Netherlands"
+DESTINATION_LON = 4.8952
+DESTINATION_LAT = 52.3676
+
+HOVER_FIELDS = [
+    ('Name', 'Name'),
+    ('Supply', 'Supply'),
+    ('Country', 'Country'),
+    ('Qlty', 'Qlty'),
+    ('Deliveries', 'Deliveries'),
+    ('AVG order size', 'AVG_order_size'),
+    ('TansP mode', 'TransP_mode'),
+    ('Trade unit', 'Trade_unit'),
+]
+
+def route_segments(map_df):
+    # One row per route: supplier, destination, None (the gap up to the next route)
+    n_routes = len(map_df)
+
+    lon = np.empty((n_routes, 3), dtype = object)
+    lon[:, 0] = map_df['Longitude'].to_numpy()
+    lon[:, 1] = DESTINATION_LON
+
+    lat = np.empty((n_routes, 3), dtype = object)
+    lat[:, 0] = map_df['Latitude'].to_numpy()
+    lat[:, 1] = DESTINATION_LAT
+
+    return lon.ravel().tolist(), lat.ravel().tolist()
+
+def hover_text(map_df):
+    text = ""
+    for label, col in HOVER_FIELDS:
+        # Qlty keeps the space before the line break it always had
+        text = text + f"{label}: " + map_df[col].astype(str) + (" <br>" if col == 'Qlty' else "<br>")
+    return text
+
+def build_world_map_figure(map_df, supply_colors):
+    fig = go.Figure()
+
+    # Update geos and layout
+    fig.update_geos(
+        showcountries=True,
+        projection_type="equirectangular",
+        showcoastlines=True,
+        countrycolor="rgba(0, 0, 0, 0.2)",
+        coastlinecolor="rgba(0, 0, 0, 0.2)",
+        showland=True,
+        landcolor = "rgba(218, 223, 233, 0.4)"
+    )
+    fig.update_layout(height=500, margin={"r": 0, "t": 0, "l": 0, "b": 10})
+
+    fig.update_layout(
+        legend=dict(
+            orientation='h',    # Horizontal orientation
+            yanchor='bottom',   # Anchor to bottom of the plot
+            y=0,                # Adjust this value to position the legend further down
+            xanchor='left',     # Anchor to left side
+            x=0                 # Anchor to left side of the plot
+        )
+    )
+
+    # Add a dot for the Netherlands
+    fig.add_trace(
+        go.Scattergeo(
+            lon=[DESTINATION_LON],
+            lat=[DESTINATION_LAT],
+            text=DESTINATION_NAME,
+            mode="markers",
+            marker=dict(
+                size=10,
+                color='blue',  # Color of the Netherlands dot
+                opacity=0.7,
+                symbol="circle"
+            ),
+            name=DESTINATION_NAME
+        )
+    )
+
+    if map_df.empty:
+        return fig
+
+    # All routes to the Netherlands in a single trace
+    route_lon, route_lat = route_segments(map_df)
+    fig.add_trace(
+        go.Scattergeo(
+            lon=route_lon,
+            lat=route_lat,
+            mode='lines',
+            line=dict(
+                width=2,
+                color='rgb(249, 190, 71, 0.5)',
+                dash='dashdot'
+            ),
+            hoverinfo='skip',
+            showlegend=False
+        )
+    )
+
+    # One marker trace per supply, in order of first appearance like the legend always had
+    map_df = map_df.assign(hover_text = hover_text(map_df))
+
+    for supply, supply_df in map_df.groupby('Supply', sort = False, dropna = False):
+        # The first supplier of a supply is drawn slightly stronger than the rest
+        opacity = np.full(len(supply_df), 0.7)
+        opacity[0] = 0.8
+
+        fig.add_trace(
+            go.Scattergeo(
+                lon=supply_df['Longitude'],
+                lat=supply_df['Latitude'],
+                text=supply_df['hover_text'],
+                mode="markers",
+                marker=dict(
+                    size=10,
+                    color=supply_colors.get(supply, "grey"),
+                    opacity=opacity,
+                    symbol="circle",
+                    line=dict(color='black', width=1)
+                ),
+                name=supply
+            )
+        )
+
+    return fig
+
+# Built once per round and version of the suppliers workbook
+def world_map_figure(round_number):
+    def build(sheets):
+        suppliers_df = next(iter(sheets.values()))
+        return build_world_map_figure(suppliers_df[suppliers_df['Round'] == round_number], COMPONENT_COLORS)
+
+    return cached_view(SUPPLIERS_DATA_DIR, f"world_map:{round_number}", build)